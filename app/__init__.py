@@ -1,11 +1,12 @@
 import os
-from flask import Flask
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from config import Config
+from app.database import RoutingSession
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 def create_app(config_class=Config):
@@ -13,6 +14,14 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Client IP and scheme from X-Forwarded-* when behind a reverse proxy
+    app.config.setdefault('PROXY_FIX_X_FOR', 0)
+    app.config.setdefault('PROXY_FIX_X_PROTO', 0)
+    if app.config['PROXY_FIX_X_FOR'] or app.config['PROXY_FIX_X_PROTO']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'],
+                                x_proto=app.config['PROXY_FIX_X_PROTO'])
+    
     # Ensure instance directory exists for SQLite
     if config_class.DATABASE_TYPE == 'sqlite':
         db_path = config_class.SQLITE_DB_PATH
@@ -21,8 +30,54 @@ def create_app(config_class=Config):
             os.makedirs(db_dir, exist_ok=True)
     
     # Initialize extensions
+    from app.database import prepare_engine_options
+    prepare_engine_options(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_migrations(app)
+    
+    # Per-backend connection tuning (SQLite PRAGMAs)
+    from app.database import configure_engines
+    configure_engines(app, db)
+    
+    # Bounded pool for login password verification
+    from app.passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    # Sliding-window login rate limits (per IP and per username)
+    from app.throttling import login_throttle
+    login_throttle.init_app(app)
+    
+    # JSON encoding with orjson/msgspec when installed (JSON_ENCODER)
+    from app.json_provider import init_json
+    init_json(app)
+    
+    # Per-request SQL/serialization/template timings (Server-Timing header)
+    from app.instrumentation import instrumentation
+    instrumentation.init_app(app, db)
+    
+    # Prometheus metrics at /metrics
+    from app.metrics import init_metrics
+    init_metrics(app)
+    
+    # Pre-encoded JSON of users and groups for the read endpoints
+    from app.fragments import init_fragments
+    init_fragments(app)
+    
+    # Change log and delta sync (GET /api/changes)
+    from app.changes import init_changes
+    init_changes(app)
+    
+    # Server-Sent Events fan-out of the change log (GET /api/events)
+    from app.events import event_hub
+    event_hub.init_app(app)
+    
+    # Bearer API tokens (defaults for the lookup cache)
+    from app.tokens import init_tokens
+    init_tokens(app)
+    
+    # Refuse requests until the database is bootstrapped to SCHEMA_VERSION
+    from app.bootstrap import init_schema_check
+    init_schema_check(app)
     
     # Register blueprints
     from app.routes.web import web_bp
@@ -31,20 +86,34 @@ def create_app(config_class=Config):
     app.register_blueprint(web_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     
-    # Create tables and default groups
-    with app.app_context():
-        db.create_all()
-        from app.models import Group
-        
-        # Create default groups if they don't exist
-        default_groups = ['Administradores', 'Visualizadores', 'Editores']
-        for group_name in default_groups:
-            if not Group.query.filter_by(name=group_name).first():
-                group = Group(name=group_name, description=f'Grupo de {group_name}')
-                db.session.add(group)
-        
-        db.session.commit()
+    # Tables and default groups are created by `flask init-db` (or the
+    # scripts), not here: building the app must not touch the database
+    app.cli.add_command(init_db_command)
     
     return app
 
 
+def init_migrations(app):
+    """
+    Set up Flask-Migrate only when running under the flask CLI.
+
+    Alembic is only used by the `flask db` commands and is one of the
+    slowest imports, so web workers skip it.
+    """
+    if click.get_current_context(silent=True) is None:
+        return None
+    from flask_migrate import Migrate
+    return Migrate(app, db)
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create tables, search index and default groups if needed"""
+    from app.bootstrap import bootstrap_database
+    if bootstrap_database(current_app):
+        print('Banco de dados inicializado.')
+    else:
+        print('Banco de dados já está atualizado.')
+
+
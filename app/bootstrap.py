@@ -0,0 +1,163 @@
+from flask import current_app, jsonify
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app import db
+
+
+# Bump when the schema or the seed data changes; bootstrap_database()
+# re-runs (idempotently) on databases stamped with an older version.
+# 1: users, groups, search index, default groups; 2: api_tokens; 3: changes;
+# 4: indexes added to tables that already existed (see create_missing_indexes);
+# 5: NOCASE username/email indexes (SQLite);
+# 6: microsecond updated_at columns (MySQL, see widen_datetime_columns)
+SCHEMA_VERSION = 6
+
+DEFAULT_GROUPS = [
+    {
+        'name': 'Administradores',
+        'description': 'Grupo de administradores do sistema com privilégios totais'
+    },
+    {
+        'name': 'Visualizadores',
+        'description': 'Grupo de usuários com permissão apenas para visualização'
+    },
+    {
+        'name': 'Editores',
+        'description': 'Grupo de usuários com permissão para edição de conteúdo'
+    }
+]
+
+
+def current_schema_version():
+    """Version stamped by the last bootstrap, 0 for an uninitialized database"""
+    from app.models import DataVersion
+    try:
+        row = db.session.query(DataVersion.version).filter(DataVersion.name == 'schema').first()
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return 0
+    return row[0] if row else 0
+
+
+def create_default_groups():
+    """Create default groups if they don't exist; returns the names created"""
+    from app.models import Group
+    existing = {name for (name,) in db.session.query(Group.name)
+                .filter(Group.name.in_([group['name'] for group in DEFAULT_GROUPS]))}
+    created = []
+    for group_data in DEFAULT_GROUPS:
+        if group_data['name'] not in existing:
+            db.session.add(Group(name=group_data['name'], description=group_data['description']))
+            created.append(group_data['name'])
+    return created
+
+
+def create_missing_indexes():
+    """
+    Create the model indexes missing from tables that already existed.
+
+    create_all() skips existing tables entirely, so indexes added to a
+    model later (users.is_active, user_groups.group_id, ...) never reach
+    databases created before them. Returns the names of the indexes
+    created.
+    """
+    connection = db.session.connection()
+    inspector = db.inspect(connection)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+def widen_datetime_columns():
+    """
+    Bring existing MySQL DATETIME columns to the precision of the model.
+
+    Like indexes, column types changed in a model (updated_at became
+    DATETIME(6)) are not applied to existing tables by create_all().
+    Returns the altered columns as 'table.column'.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect
+    if dialect.name not in ('mysql', 'mariadb'):
+        return []
+    inspector = db.inspect(connection)
+    quote = dialect.identifier_preparer.quote
+    altered = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        current = {column['name']: column['type'].compile(dialect=dialect)
+                   for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            wanted = column.type.compile(dialect=dialect)
+            if not wanted.startswith('DATETIME') or current.get(column.name, wanted) == wanted:
+                continue
+            connection.exec_driver_sql(
+                f'ALTER TABLE {quote(table.name)} MODIFY {quote(column.name)} {wanted} '
+                f'{"NULL" if column.nullable else "NOT NULL"}'
+            )
+            altered.append(f'{table.name}.{column.name}')
+    return altered
+
+
+def bootstrap_database(app, force=False):
+    """
+    Create tables, search index and default groups once per schema version.
+
+    Must run inside an app context. When the database is already stamped
+    with SCHEMA_VERSION this costs a single SELECT and writes nothing, so
+    it is safe to call from every CLI entry point. Returns True when the
+    bootstrap actually ran.
+    """
+    from app.models import DataVersion
+    from app.search import init_search_index
+
+    if not force and current_schema_version() >= SCHEMA_VERSION:
+        return False
+
+    db.create_all()
+    create_missing_indexes()
+    widen_datetime_columns()
+    db.session.commit()
+    init_search_index(app)
+    create_default_groups()
+
+    stamp = db.session.get(DataVersion, 'schema')
+    if stamp is None:
+        db.session.add(DataVersion(name='schema', version=SCHEMA_VERSION))
+    else:
+        stamp.version = SCHEMA_VERSION
+    db.session.commit()
+    return True
+
+
+def init_schema_check(app):
+    """
+    Answer 503 until the database is bootstrapped to SCHEMA_VERSION.
+
+    Building the app must not touch the database, so the stamp is read on
+    the first request instead: a worker started against a database that
+    missed an upgrade reports "run init-db" rather than failing later on
+    a missing table or column. Once the stamp is current the check is
+    skipped for the life of the process.
+    """
+    state = {'ready': False}
+
+    @app.before_request
+    def _require_current_schema():
+        if state['ready']:
+            return None
+        version = current_schema_version()
+        if version >= SCHEMA_VERSION:
+            state['ready'] = True
+            return None
+        message = (f'Database schema is at version {version}, expected {SCHEMA_VERSION}: '
+                   'run `flask init-db` or scripts/init_db.py')
+        current_app.logger.error(message)
+        return jsonify({'error': message}), 503
@@ -0,0 +1,185 @@
+import csv
+import io
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import User, Group, user_groups, bump_versions
+from app.passwords import hash_passwords, hashing_pool
+from app.changes import record_changes, record_selected
+
+
+# Rows validated, hashed and inserted per transaction
+BULK_IMPORT_CHUNK_SIZE = 1000
+
+CSV_TRUE_VALUES = ('1', 'true', 'yes', 'sim', 's')
+CSV_FALSE_VALUES = ('0', 'false', 'no', 'nao', 'não', 'n')
+
+
+def parse_csv(text):
+    """
+    Parse import rows from CSV text.
+
+    Expected header: username,email,password[,is_admin,is_active,group_ids]
+    where group_ids is a ';'-separated list of group ids.
+    """
+    rows = []
+    for record in csv.DictReader(io.StringIO(text)):
+        row = {key.strip(): (value or '').strip() for key, value in record.items() if key}
+        for flag in ('is_admin', 'is_active'):
+            if not row.get(flag):
+                row.pop(flag, None)
+        if 'group_ids' in row:
+            row['group_ids'] = [gid for gid in row['group_ids'].split(';') if gid.strip()]
+        rows.append(row)
+    return rows
+
+
+def _parse_flag(value, default):
+    """Parse is_admin/is_active: a boolean, 0/1 or a yes/no string, raising ValueError otherwise"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in CSV_TRUE_VALUES:
+            return True
+        if lowered in CSV_FALSE_VALUES:
+            return False
+    raise ValueError(f'invalid boolean value: {value!r}')
+
+
+def _validate_row(row, valid_group_ids):
+    """Return an error message for an invalid row, or None"""
+    if not isinstance(row, dict):
+        return 'Row must be an object'
+    if not row.get('username') or not row.get('email') or not row.get('password'):
+        return 'Username, email and password are required'
+    for field in ('username', 'email', 'password'):
+        if not isinstance(row[field], str):
+            return f'{field} must be a string'
+    for flag in ('is_admin', 'is_active'):
+        try:
+            _parse_flag(row.get(flag), None)
+        except ValueError:
+            return f'{flag} must be true or false'
+    raw_group_ids = row.get('group_ids') or []
+    if not isinstance(raw_group_ids, list) or any(isinstance(gid, (bool, float)) for gid in raw_group_ids):
+        return 'group_ids must be a list of integers'
+    try:
+        group_ids = {int(gid) for gid in raw_group_ids}
+    except (TypeError, ValueError):
+        return 'group_ids must be a list of integers'
+    missing = group_ids - valid_group_ids
+    if missing:
+        return f'Unknown group ids: {sorted(missing)}'
+    return None
+
+
+def _insert_chunk(candidates, hashes):
+    """Insert validated rows and their memberships in a single transaction"""
+    db.session.execute(db.insert(User), [
+        {
+            'username': row['username'],
+            'email': row['email'],
+            'password_hash': password_hash,
+            'is_admin': _parse_flag(row.get('is_admin'), False),
+            'is_active': _parse_flag(row.get('is_active'), True),
+        }
+        for (_, row), password_hash in zip(candidates, hashes)
+    ])
+    # Bulk INSERTs bypass the flush events, so log the new rows here
+    record_selected(db.session.connection(), 'user', 'upsert',
+                    db.select(User.id).where(User.username.in_([row['username'] for _, row in candidates])))
+
+    memberships = [row for _, row in candidates if row.get('group_ids')]
+    if memberships:
+        user_ids = dict(db.session.query(User.username, User.id)
+                        .filter(User.username.in_([row['username'] for row in memberships])))
+        pairs = [(user_ids[row['username']], group_id)
+                 for row in memberships
+                 for group_id in {int(gid) for gid in row['group_ids']}]
+        db.session.execute(user_groups.insert(), [
+            {'user_id': user_id, 'group_id': group_id} for user_id, group_id in pairs
+        ])
+        bump_versions(db.session.connection(), {'memberships'})
+        record_changes(db.session.connection(),
+                       [('membership', user_id, group_id, 'add') for user_id, group_id in pairs])
+
+    db.session.commit()
+
+
+def import_users(rows, chunk_size=BULK_IMPORT_CHUNK_SIZE):
+    """
+    Create many users at once.
+
+    Rows are processed in chunks: each chunk is validated, checked for
+    duplicates (within the batch and against the database) with two IN
+    queries, has its passwords hashed in parallel and is written with bulk
+    INSERTs in one commit. Invalid rows are reported, not fatal.
+
+    Returns {'created': int, 'errors': [{'index', 'username', 'error'}]}.
+    """
+    errors = []
+    created = 0
+    seen_usernames = set()
+    seen_emails = set()
+    valid_group_ids = {group_id for (group_id,) in db.session.query(Group.id)}
+
+    def reject(index, row, message):
+        username = row.get('username') if isinstance(row, dict) else None
+        errors.append({'index': index, 'username': username, 'error': message})
+
+    with hashing_pool() as pool:
+        for start in range(0, len(rows), chunk_size):
+            candidates = []
+            for index, row in enumerate(rows[start:start + chunk_size], start):
+                error = _validate_row(row, valid_group_ids)
+                if error:
+                    reject(index, row, error)
+                elif row['username'] in seen_usernames:
+                    reject(index, row, 'Duplicate username in batch')
+                elif row['email'] in seen_emails:
+                    reject(index, row, 'Duplicate email in batch')
+                else:
+                    seen_usernames.add(row['username'])
+                    seen_emails.add(row['email'])
+                    candidates.append((index, row))
+
+            if not candidates:
+                continue
+
+            taken_usernames = {value for (value,) in db.session.query(User.username)
+                               .filter(User.username.in_([row['username'] for _, row in candidates]))}
+            taken_emails = {value for (value,) in db.session.query(User.email)
+                            .filter(User.email.in_([row['email'] for _, row in candidates]))}
+            unique = []
+            for index, row in candidates:
+                if row['username'] in taken_usernames:
+                    reject(index, row, 'Username already exists')
+                elif row['email'] in taken_emails:
+                    reject(index, row, 'Email already exists')
+                else:
+                    unique.append((index, row))
+
+            if not unique:
+                continue
+
+            hashes = hash_passwords([row['password'] for _, row in unique], pool)
+            try:
+                _insert_chunk(unique, hashes)
+                created += len(unique)
+            except IntegrityError:
+                # A concurrent writer took some of the names; retry row by row
+                db.session.rollback()
+                for candidate, password_hash in zip(unique, hashes):
+                    try:
+                        _insert_chunk([candidate], [password_hash])
+                        created += 1
+                    except IntegrityError:
+                        db.session.rollback()
+                        reject(candidate[0], candidate[1], 'Username or email already exists')
+
+    errors.sort(key=lambda error: error['index'])
+    return {'created': created, 'errors': errors}
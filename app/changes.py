@@ -0,0 +1,200 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+from app import db
+from app.models import User, Group, Change, DataVersion, user_groups, bump_versions
+from app.fragments import RENDERERS, LOAD_CHUNK_SIZE
+
+
+# Change log writes per process between two prunes of old entries
+PRUNE_EVERY = 1000
+
+# Entries returned per GET /api/changes page
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+
+_lock = threading.Lock()
+_writes = {'count': 0}
+
+
+class ChangeTokenExpired(Exception):
+    """The token predates the retained change log; the client must reload everything"""
+
+
+def _lock_log(connection):
+    """
+    Bump the 'changes' counter before appending to the log.
+
+    The UPDATE holds its row lock until commit, so writers append one
+    transaction at a time and ids become visible in increasing order: a
+    client that has read up to token N never misses an entry below N.
+    """
+    bump_versions(connection, {'changes'})
+
+
+def _count_write(connection):
+    with _lock:
+        _writes['count'] += 1
+        due = _writes['count'] % PRUNE_EVERY == 0
+    if due and has_app_context():
+        days = current_app.config['CHANGE_LOG_RETENTION_DAYS']
+        if days:
+            prune_changes(connection, datetime.utcnow() - timedelta(days=days))
+
+
+def record_changes(connection, entries):
+    """Append (kind, object_id, group_id, action) entries to the change log"""
+    if not entries:
+        return
+    _lock_log(connection)
+    now = datetime.utcnow()
+    connection.execute(Change.__table__.insert(), [
+        {'kind': kind, 'object_id': object_id, 'group_id': group_id, 'action': action, 'created_at': now}
+        for kind, object_id, group_id, action in entries
+    ])
+    _count_write(connection)
+
+
+def record_selected(connection, kind, action, select_stmt):
+    """
+    Append one entry per row of select_stmt with INSERT ... SELECT.
+
+    The statement yields object ids, plus group ids for memberships, so
+    set-based writes are logged without reading the ids into Python.
+    """
+    _lock_log(connection)
+    columns = list(select_stmt.subquery().c)
+    group_id = columns[1] if len(columns) > 1 else db.null()
+    connection.execute(Change.__table__.insert().from_select(
+        ['kind', 'object_id', 'group_id', 'action', 'created_at'],
+        db.select(db.literal(kind), columns[0], group_id, db.literal(action),
+                  db.literal(datetime.utcnow(), db.DateTime))
+    ))
+    _count_write(connection)
+
+
+def prune_changes(connection, before):
+    """Delete entries older than `before`, remembering the newest id removed"""
+    table = Change.__table__
+    newest = connection.execute(
+        db.select(db.func.max(table.c.id)).where(table.c.created_at < before)).scalar()
+    if newest is None:
+        return 0
+    deleted = connection.execute(table.delete().where(table.c.id <= newest)).rowcount
+    versions = DataVersion.__table__
+    result = connection.execute(versions.update().where(versions.c.name == 'changes_pruned')
+                                .values(version=newest, updated_at=datetime.utcnow()))
+    if result.rowcount == 0:
+        connection.execute(versions.insert().values(name='changes_pruned', version=newest,
+                                                    updated_at=datetime.utcnow()))
+    return deleted
+
+
+def current_token():
+    """Id of the newest change log entry (0 for an empty log)"""
+    return db.session.query(db.func.coalesce(db.func.max(Change.id), 0)).scalar()
+
+
+def _render(model, ids):
+    """Full dicts of the rows that still exist, and the ids that are gone"""
+    include = ('groups',) if model is User else ()
+    rendered = {}
+    for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+        rendered.update(RENDERERS[model](ids[start:start + LOAD_CHUNK_SIZE], None, include))
+    found = [rendered[object_id] for object_id in ids if object_id in rendered]
+    gone = [object_id for object_id in ids if object_id not in rendered]
+    return found, gone
+
+
+def changes_since(since, limit=DEFAULT_CHANGES_LIMIT):
+    """
+    Fold the log entries after token `since` into a delta.
+
+    Users and groups are returned in their current full representation
+    (users with their groups, groups with user_count); any row touched by
+    a membership change is included too. Rows that no longer exist are
+    listed under 'deleted', and 'memberships' holds the last action per
+    (user_id, group_id) pair. Raises ChangeTokenExpired when entries after
+    `since` have already been pruned.
+    """
+    pruned = db.session.query(DataVersion.version).filter(DataVersion.name == 'changes_pruned').scalar()
+    if pruned is not None and since < pruned:
+        raise ChangeTokenExpired(since)
+
+    entries = db.session.query(Change.id, Change.kind, Change.object_id, Change.group_id, Change.action) \
+        .filter(Change.id > since).order_by(Change.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    touched = {'user': {}, 'group': {}}
+    memberships = {}
+    for _, kind, object_id, group_id, action in entries:
+        if kind == 'membership':
+            memberships[(object_id, group_id)] = action
+            touched['user'][object_id] = None
+            touched['group'][group_id] = None
+        else:
+            touched[kind][object_id] = None
+
+    users, deleted_users = _render(User, sorted(touched['user']))
+    groups, deleted_groups = _render(Group, sorted(touched['group']))
+    return {
+        'token': entries[-1].id if entries else since,
+        'has_more': has_more,
+        'users': users,
+        'groups': groups,
+        'memberships': [{'user_id': user_id, 'group_id': group_id, 'action': action}
+                        for (user_id, group_id), action in memberships.items()],
+        'deleted': {'users': deleted_users, 'groups': deleted_groups},
+    }
+
+
+def init_changes(app):
+    app.config.setdefault('CHANGE_LOG_RETENTION_DAYS', 7)
+
+
+def _membership_history(obj):
+    """(user_id, group_id, action) for the collection edits pending on a User or Group"""
+    is_user = isinstance(obj, User)
+    history = attributes.get_history(obj, 'groups' if is_user else 'users',
+                                     passive=attributes.PASSIVE_NO_INITIALIZE)
+    changes = []
+    for action, others in (('add', history.added), ('remove', history.deleted)):
+        for other in others or ():
+            changes.append((obj.id, other.id, action) if is_user else (other.id, obj.id, action))
+    return changes
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_deleted_memberships(session, flush_context, instances):
+    # The flush removes the user_groups rows of deleted users and groups,
+    # so log them while they can still be selected
+    user_ids = [obj.id for obj in session.deleted if isinstance(obj, User)]
+    group_ids = [obj.id for obj in session.deleted if isinstance(obj, Group)]
+    if user_ids or group_ids:
+        record_selected(session.connection(), 'membership', 'remove',
+                        db.select(user_groups.c.user_id, user_groups.c.group_id)
+                        .where(db.or_(user_groups.c.user_id.in_(user_ids),
+                                      user_groups.c.group_id.in_(group_ids))))
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_changes(session, flush_context):
+    """Log the users, groups and memberships written by this flush, in the same transaction"""
+    entries = []
+    memberships = {}
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, (User, Group)):
+            continue
+        kind = 'user' if isinstance(obj, User) else 'group'
+        if obj in session.new or session.is_modified(obj, include_collections=False):
+            entries.append((kind, obj.id, None, 'upsert'))
+        for user_id, group_id, action in _membership_history(obj):
+            memberships[(user_id, group_id)] = action
+    for obj in session.deleted:
+        if isinstance(obj, (User, Group)):
+            entries.append(('user' if isinstance(obj, User) else 'group', obj.id, None, 'delete'))
+    entries += [('membership', user_id, group_id, action) for (user_id, group_id), action in memberships.items()]
+    record_changes(session.connection(), entries)
@@ -0,0 +1,156 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, make_response
+from werkzeug.http import is_resource_modified
+from app import db
+from app.models import User, Group, DataVersion, user_groups
+from app.fieldsets import parse_fieldset
+
+
+def _table_state(model):
+    """(row count, max(updated_at)) for a table - both served by indexes"""
+    return tuple(db.session.query(db.func.count(model.id), db.func.max(model.updated_at)).one())
+
+
+def _version_state(*names):
+    """Sorted (name, version, updated_at) rows for the given DataVersion counters"""
+    return tuple(tuple(row) for row in db.session.query(
+        DataVersion.name, DataVersion.version, DataVersion.updated_at
+    ).filter(DataVersion.name.in_(names)).order_by(DataVersion.name))
+
+
+def _flatten(parts):
+    for part in parts:
+        if isinstance(part, tuple):
+            yield from _flatten(part)
+        else:
+            yield part
+
+
+def _validators(*parts):
+    """
+    Build (etag, last_modified) from state tuples.
+
+    The ETag is a digest of the whole state; Last-Modified is the newest
+    timestamp found in it.
+    """
+    etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+    stamps = [value for value in _flatten(parts) if isinstance(value, datetime)]
+    return etag, max(stamps) if stamps else None
+
+
+def _representation(fields, include):
+    """
+    What selects the body besides the rows: the parsed fieldset and every
+    other query argument (filters, sort, cursor, limit), so two
+    representations never share a strong ETag.
+    """
+    args = tuple(sorted((key, value) for key, value in request.args.items(multi=True)
+                        if key not in ('fields', 'include')))
+    return fields, include, args
+
+
+def _members_state(group_id):
+    """(count, max(updated_at)) of a group's members"""
+    return tuple(db.session.query(db.func.count(User.id), db.func.max(User.updated_at))
+                 .join(user_groups, user_groups.c.user_id == User.id)
+                 .filter(user_groups.c.group_id == group_id).one())
+
+
+def _is_modified(etag, last_modified):
+    """
+    Whether the client's copy is outdated.
+
+    If-None-Match decides when the client sends it. If-Modified-Since only
+    has whole seconds while updated_at keeps microseconds, so a write later
+    in the same second as the client's copy compares equal to it: without
+    an ETag, only a date past the last modified second means unmodified.
+    """
+    if request.if_none_match or last_modified is None:
+        return is_resource_modified(request.environ, etag=etag)
+    since = request.if_modified_since
+    if since is None:
+        return True
+    return last_modified.replace(microsecond=0, tzinfo=timezone.utc) >= since
+
+
+# ============= STATE PER ENDPOINT =============
+
+def users_collection_state(fields, include, **kwargs):
+    """User list bodies embed group names, so group changes count too"""
+    return (_table_state(User), _table_state(Group),
+            _version_state('users', 'groups', 'memberships'))
+
+
+def user_state(fields, include, user_id, **kwargs):
+    row = db.session.query(User.updated_at).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return tuple(row), (user_id,), _table_state(Group), _version_state('groups', 'memberships')
+
+
+def groups_collection_state(fields, include, **kwargs):
+    """With ?include=users the bodies embed member usernames, so user changes count too"""
+    if 'users' in include:
+        return _table_state(Group), _table_state(User), _version_state('users', 'groups', 'memberships')
+    return _table_state(Group), _version_state('groups', 'memberships')
+
+
+def group_state(fields, include, group_id, **kwargs):
+    row = db.session.query(Group.updated_at).filter(Group.id == group_id).first()
+    if row is None:
+        return None
+    if 'users' in include:
+        return tuple(row), (group_id,), _members_state(group_id), _version_state('users', 'memberships')
+    return tuple(row), (group_id,), _version_state('memberships')
+
+
+def group_users_state(fields, include, group_id, **kwargs):
+    """Members' dicts embed all of their groups, so group changes count too"""
+    row = db.session.query(Group.updated_at).filter(Group.id == group_id).first()
+    if row is None:
+        return None
+    return (tuple(row), (group_id,), _members_state(group_id), _table_state(Group),
+            _version_state('users', 'groups', 'memberships'))
+
+
+def conditional(state, model, default_include=()):
+    """
+    Decorator adding ETag/Last-Modified validation to a GET view.
+
+    The request's ?fields= and ?include= are parsed for `model` (an
+    invalid fieldset goes straight to the view, which answers 400) and
+    `state(fields, include, **view_kwargs)` must return tuples of cheap
+    aggregates describing every row the body reads, or None to skip
+    validation (e.g. missing row). Validators are built from that state
+    and the requested representation; when the request's If-None-Match /
+    If-Modified-Since still match, a 304 is returned before the view loads
+    or serializes any row.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                fields, include = parse_fieldset(request.args, model, default_include)
+            except ValueError:
+                return f(*args, **kwargs)
+            parts = state(fields, include, **kwargs)
+            if parts is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = _validators(_representation(fields, include), *parts)
+            if not _is_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
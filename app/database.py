@@ -0,0 +1,181 @@
+import os
+import random
+import threading
+import time
+from functools import wraps
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long callers wait for a connection.
+
+    Waits include time spent queued behind other requests when the pool and
+    its overflow are exhausted, which is what pool_size/max_overflow tuning
+    is about. Counters are per process.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def pool_stats(engine):
+    """Live pool state plus wait-time counters (when the pool records them)"""
+    pool = engine.pool
+    stats = {
+        'pid': os.getpid(),
+        'pool_class': type(pool).__name__,
+        'status': pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'avg_wait_ms': round(pool.total_wait / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                'max_wait_ms': round(pool.max_wait * 1000, 3),
+            })
+    return stats
+
+
+def prepare_engine_options(app):
+    """
+    Finalize SQLALCHEMY_ENGINE_OPTIONS before the engines are created.
+
+    Pooled backends (MySQL, file-based SQLite) get TimedQueuePool so that
+    pool_stats() can report wait times.
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    in_memory = uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+    if not in_memory:
+        options.setdefault('poolclass', TimedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def sqlite_pragmas(config):
+    """
+    PRAGMA statements for the configured SQLite profile.
+
+    The 'production' profile enables WAL (readers no longer block the
+    writer), synchronous=NORMAL (no fsync per commit in WAL mode), a busy
+    timeout instead of immediate 'database is locked' errors, memory-mapped
+    reads and a larger page cache. Any other profile leaves SQLite defaults.
+    """
+    if config.get('SQLITE_PROFILE', 'production') != 'production':
+        return []
+    return [
+        f"PRAGMA journal_mode={config.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT', 5000))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"PRAGMA cache_size={int(config.get('SQLITE_CACHE_SIZE', -64000))}",
+        f"PRAGMA temp_store={config.get('SQLITE_TEMP_STORE', 'MEMORY')}",
+    ]
+
+
+def apply_sqlite_pragmas(engine, config):
+    """Run the profile's PRAGMAs on every new connection of a SQLite engine"""
+    pragmas = sqlite_pragmas(config)
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def configure_engines(app, db):
+    """Apply per-backend engine tuning to the app's engines (primary and replicas)"""
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config)
+
+
+# ============= READ REPLICAS =============
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when the view opted in.
+
+    Views decorated with @use_replica mark the request's session; its
+    SELECTs then go to one replica bind (picked once per session). Flushes,
+    DML statements and every statement after the first write in the session
+    go to the primary, so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and self.info.get('use_replica')
+                and not self.info.get('wrote')):
+            replica = self._replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_engine(self):
+        if 'replica' not in self.info:
+            keys = [key for key in self._db.engines
+                    if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+            self.info['replica'] = random.choice(keys) if keys else None
+        key = self.info['replica']
+        return self._db.engines[key] if key is not None else None
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _route_writes_to_primary(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _pin_to_primary_on_flush(session, flush_context, instances):
+    session.info['wrote'] = True
+
+
+def use_replica(f):
+    """Decorator letting a read-only view run its queries on a replica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        current_app.extensions['sqlalchemy'].session.info['use_replica'] = True
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,247 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.changes import changes_since, current_token, ChangeTokenExpired, MAX_CHANGES_LIMIT
+from app.json_provider import dumps_bytes
+from app.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Reconnection delay suggested to EventSource clients (milliseconds)
+RETRY_MS = 3000
+
+# A delta folding the change entries after token `since` up to `token`,
+# encoded once as an SSE message and shared by every subscriber
+Message = namedtuple('Message', 'since token data')
+
+# Queued instead of messages: the subscriber must catch up from the log
+CATCH_UP = object()
+# Queued when the hub's own position was pruned away: clients must reload
+RESET = object()
+
+
+def _format(delta):
+    data = dumps_bytes(delta, separators=(',', ':'))
+    return b'id: %d\nevent: changes\ndata: %s\n\n' % (delta['token'], data)
+
+
+class Subscriber:
+    """
+    Bounded message buffer of one SSE connection.
+
+    When a slow client lets maxsize messages pile up, the buffer is
+    dropped instead of growing or blocking the hub, and the connection
+    catches up from the change log on its next read.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._messages = deque()
+        self._condition = threading.Condition()
+        self._lagging = False
+        self._reset = False
+
+    def put(self, message):
+        with self._condition:
+            if message is RESET:
+                self._reset = True
+            elif len(self._messages) >= self.maxsize:
+                self._messages.clear()
+                self._lagging = True
+            else:
+                self._messages.append(message)
+            self._condition.notify()
+
+    def get(self, timeout):
+        """Next message, CATCH_UP, RESET, or None after `timeout` seconds"""
+        with self._condition:
+            if not (self._messages or self._lagging or self._reset):
+                self._condition.wait(timeout)
+            if self._reset:
+                return RESET
+            if self._lagging:
+                self._lagging = False
+                return CATCH_UP
+            return self._messages.popleft() if self._messages else None
+
+
+class EventHub:
+    """
+    In-process fan-out of committed changes to SSE subscribers.
+
+    While anyone is subscribed, one thread per process tails the change
+    log (see app.changes): commits made by this process wake it at once,
+    and it polls every EVENTS_POLL_INTERVAL seconds for those of other
+    workers, so any number of processes share the log instead of a
+    broker. Each batch of new entries is folded into a delta, encoded
+    once and queued to every subscriber (EVENTS_BUFFER_SIZE messages at
+    most per connection).
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._wake = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_ENABLED', False)
+        app.config.setdefault('EVENTS_POLL_INTERVAL', 1.0)
+        app.config.setdefault('EVENTS_BUFFER_SIZE', 100)
+        app.config.setdefault('EVENTS_MAX_SUBSCRIBERS', 8)
+        app.config.setdefault('EVENTS_KEEPALIVE', 15)
+        app.config.setdefault('EVENTS_STREAM_TIMEOUT', 300)
+        app.extensions['event_hub'] = self
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """Register a subscriber, or return None when EVENTS_MAX_SUBSCRIBERS is reached"""
+        config = current_app.config
+        with self._lock:
+            if len(self._subscribers) >= config['EVENTS_MAX_SUBSCRIBERS']:
+                return None
+            subscriber = Subscriber(config['EVENTS_BUFFER_SIZE'])
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(current_app._get_current_object(),),
+                                                name='event-hub', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def wake(self):
+        """Make the tailing thread read the log now (after a local commit)"""
+        self._wake.set()
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def _read(self, last):
+        while True:
+            delta = changes_since(last, MAX_CHANGES_LIMIT)
+            if delta['token'] == last:
+                return last
+            self.publish(Message(last, delta['token'], _format(delta)))
+            last = delta['token']
+            if not delta['has_more']:
+                return last
+
+    def _run(self, app):
+        with app.app_context():
+            last = current_token()
+            db.session.remove()
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            self._wake.wait(app.config['EVENTS_POLL_INTERVAL'])
+            self._wake.clear()
+            with app.app_context():
+                try:
+                    last = self._read(last)
+                except ChangeTokenExpired:
+                    self.publish(RESET)
+                    last = current_token()
+                except Exception:
+                    logger.exception('Failed to read the change log')
+                    time.sleep(app.config['EVENTS_POLL_INTERVAL'])
+                finally:
+                    db.session.remove()
+
+
+event_hub = EventHub()
+
+
+def threaded_server(environ):
+    """
+    Whether the WSGI server runs requests concurrently within a process.
+
+    gunicorn's gthread, gevent and eventlet workers and the threaded
+    development server set wsgi.multithread; a sync worker does not, and
+    there a stream would hold the worker's only request slot.
+    """
+    return bool(environ.get('wsgi.multithread'))
+
+
+def _catch_up(last):
+    """Deltas from the log after `last`, as (token, message bytes)"""
+    try:
+        while True:
+            delta = changes_since(last, MAX_CHANGES_LIMIT)
+            if delta['token'] == last:
+                return
+            last = delta['token']
+            yield last, _format(delta)
+            if not delta['has_more']:
+                return
+    finally:
+        # Return the connection to the pool while the stream idles
+        db.session.close()
+
+
+def iter_events(subscriber, since):
+    """
+    Body of GET /api/events for one subscriber.
+
+    Starts with the deltas after `since` (Last-Event-ID on reconnection),
+    then relays hub messages. A message that starts after what this
+    connection has sent, or a buffer overflow, is covered by reading the
+    log again, so nothing is lost. Ends after EVENTS_STREAM_TIMEOUT
+    seconds (the client reconnects with Last-Event-ID), or with a
+    'reset' event when the token predates the retained log.
+    """
+    config = current_app.config
+    deadline = time.monotonic() + config['EVENTS_STREAM_TIMEOUT']
+    try:
+        yield b'retry: %d\n\n' % RETRY_MS
+        if since is None:
+            last = current_token()
+            db.session.close()
+            yield b'id: %d\nevent: ready\ndata: {"token":%d}\n\n' % (last, last)
+        else:
+            last = since
+            for last, data in _catch_up(since):
+                yield data
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = subscriber.get(min(config['EVENTS_KEEPALIVE'], remaining))
+            if message is None:
+                yield b': keepalive\n\n'
+            elif message is RESET:
+                raise ChangeTokenExpired(last)
+            elif message is CATCH_UP or message.since > last:
+                metrics.inc('userkit_event_catchups_total', reason='overflow' if message is CATCH_UP else 'gap')
+                for last, data in _catch_up(last):
+                    yield data
+            elif message.token > last:
+                last = message.token
+                yield message.data
+    except ChangeTokenExpired:
+        yield b'event: reset\ndata: {}\n\n'
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session):
+    if len(event_hub):
+        event_hub.wake()
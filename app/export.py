@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+from itertools import groupby
+from app import db
+from app.models import User, Group, user_groups
+
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_COLUMNS = ['id', 'username', 'email', 'is_admin', 'is_active',
+               'created_at', 'updated_at', 'group_ids', 'groups']
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _iter_user_rows():
+    """
+    Yield (user_columns, [(group_id, group_name), ...]) per user.
+
+    Users and memberships come from one LEFT JOIN ordered by user id and read
+    through a streaming cursor, so only EXPORT_CHUNK_SIZE rows are held in
+    memory at a time and a user's memberships arrive as consecutive rows.
+    """
+    stmt = db.select(
+        User.id, User.username, User.email, User.is_admin, User.is_active,
+        User.created_at, User.updated_at, Group.id, Group.name
+    ).select_from(User) \
+        .outerjoin(user_groups, user_groups.c.user_id == User.id) \
+        .outerjoin(Group, Group.id == user_groups.c.group_id) \
+        .order_by(User.id, Group.id) \
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+    result = db.session.execute(stmt)
+    try:
+        for _, rows in groupby(result, key=lambda row: row[0]):
+            rows = list(rows)
+            groups = [(row[7], row[8]) for row in rows if row[7] is not None]
+            yield rows[0][:7], groups
+    finally:
+        result.close()
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def iter_ndjson():
+    """Yield the export as newline-delimited JSON, one user per line"""
+    buffer = []
+    for (user_id, username, email, is_admin, is_active, created_at, updated_at), groups \
+            in _iter_user_rows():
+        buffer.append(json.dumps({
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'is_admin': is_admin,
+            'is_active': is_active,
+            'groups': [{'id': gid, 'name': name} for gid, name in groups],
+            'created_at': _isoformat(created_at),
+            'updated_at': _isoformat(updated_at)
+        }, ensure_ascii=False))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def iter_csv():
+    """Yield the export as CSV with a header row; groups are ';'-separated"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    pending = 0
+    for (user_id, username, email, is_admin, is_active, created_at, updated_at), groups \
+            in _iter_user_rows():
+        writer.writerow([
+            user_id, username, email, int(bool(is_admin)), int(bool(is_active)),
+            _isoformat(created_at) or '', _isoformat(updated_at) or '',
+            ';'.join(str(gid) for gid, _ in groups),
+            ';'.join(name for _, name in groups)
+        ])
+        pending += 1
+        if pending >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_export(fmt):
+    """Return the chunk generator for an export format (see EXPORT_FORMATS)"""
+    return iter_csv() if fmt == 'csv' else iter_ndjson()
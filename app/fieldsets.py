@@ -0,0 +1,59 @@
+from sqlalchemy.orm import load_only, selectinload, raiseload
+from app.models import User, Group
+
+
+def parse_fieldset(args, model, default_include=()):
+    """
+    Read ?fields= and ?include= for a model, raising ValueError when invalid.
+
+    Returns (fields, include): fields is None for "all fields", include is
+    a tuple of relationship names. Without ?fields= the default includes
+    apply, so existing clients keep receiving the full payload; once fields
+    are narrowed, relationships must be requested explicitly.
+    """
+    fields = None
+    raw_fields = args.get('fields')
+    if raw_fields:
+        fields = tuple(dict.fromkeys(f.strip() for f in raw_fields.split(',') if f.strip()))
+        unknown = set(fields) - set(model.API_FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+
+    if 'include' in args:
+        include = tuple(i.strip() for i in args['include'].split(',') if i.strip())
+        unknown = set(include) - set(model.API_INCLUDES)
+        if unknown:
+            raise ValueError(f'Unknown includes: {", ".join(sorted(unknown))}')
+    else:
+        include = default_include if fields is None else ()
+
+    return fields, include
+
+
+def _column_options(model, fields, extra_columns):
+    columns = [getattr(model, name) for name in fields
+               if name in model.__table__.columns.keys()]
+    # The primary key is always loaded so rows can be identified
+    return [load_only(model.id, *columns, *extra_columns)]
+
+
+def user_load_options(fields, include, extra_columns=()):
+    """
+    Loader options fetching only what the requested payload reads
+
+    extra_columns are loaded even when not requested (e.g. a sort key
+    the pagination cursor is built from). Relationships left out of
+    include raise on access instead of loading lazily.
+    """
+    options = _column_options(User, fields, extra_columns) if fields is not None else []
+    options.append(selectinload(User.groups).load_only(Group.id, Group.name)
+                   if 'groups' in include else raiseload(User.groups))
+    return options
+
+
+def group_load_options(fields, include):
+    """Loader options fetching only what the requested payload reads"""
+    options = _column_options(Group, fields, ()) if fields is not None else []
+    options.append(selectinload(Group.users).load_only(User.id, User.username)
+                   if 'users' in include else raiseload(Group.users))
+    return options
@@ -0,0 +1,176 @@
+import threading
+from collections import OrderedDict
+from flask import current_app, Response, abort
+from app import db
+from app.models import User, Group, DataVersion
+from app.fieldsets import user_load_options, group_load_options
+from app.json_provider import dumps_bytes
+
+
+# Ids bound per statement when loading cache misses
+LOAD_CHUNK_SIZE = 500
+
+# Fragments joined per chunk of a streamed list body
+STREAM_CHUNK_SIZE = 1000
+
+
+class FragmentCache:
+    """
+    Bounded LRU of pre-encoded JSON objects (UTF-8 bytes), one per entity
+    and version.
+
+    Keys carry everything the encoded object depends on (row id and
+    updated_at, requested fieldset and the stamps of embedded data), so a
+    change produces new keys instead of needing to find and delete the old
+    ones; outdated entries simply fall off the end of the LRU. This also
+    keeps every worker process correct without any cross-process signal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+            return fragment
+
+    def put(self, key, fragment, maxsize):
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+fragment_cache = FragmentCache()
+
+
+def _memberships_version():
+    return db.select(DataVersion.version).where(DataVersion.name == 'memberships').scalar_subquery()
+
+
+def _table_stamp(model, prefix):
+    """Row count and newest updated_at of a table, as two scalar subqueries"""
+    return [
+        db.select(db.func.count(model.id)).scalar_subquery().label(f'{prefix}_count'),
+        db.select(db.func.max(model.updated_at)).scalar_subquery().label(f'{prefix}_updated'),
+    ]
+
+
+def stamp_columns(model, fields, include):
+    """
+    Columns to select next to each row id for its fragment cache key.
+
+    Users embed the id and name of their groups, so their key includes the
+    memberships counter and the groups table state (a rename bumps its
+    updated_at); groups embed user_count, and member usernames with
+    ?include=users. Being scalar subqueries, they cost no extra statement.
+    """
+    columns = [model.id, model.updated_at]
+    if model is User and 'groups' in include:
+        columns += [_memberships_version().label('memberships_version'), *_table_stamp(Group, 'groups')]
+    elif model is Group:
+        if fields is None or 'user_count' in fields or 'users' in include:
+            columns.append(_memberships_version().label('memberships_version'))
+        if 'users' in include:
+            columns += _table_stamp(User, 'users')
+    return columns
+
+
+def _render_users(ids, fields, include):
+    users = User.query.options(*user_load_options(fields, include)).filter(User.id.in_(ids)).all()
+    return {user.id: user.to_dict(fields, include) for user in users}
+
+
+def _render_groups(ids, fields, include):
+    groups = Group.query.options(*group_load_options(fields, include)).filter(Group.id.in_(ids)).all()
+    counts = Group.member_counts(ids) if fields is None or 'user_count' in fields else {}
+    return {group.id: group.to_dict(user_count=counts.get(group.id, 0), fields=fields, include=include)
+            for group in groups}
+
+
+RENDERERS = {User: _render_users, Group: _render_groups}
+
+
+def _dump_args():
+    """Encoding options jsonify would use (pretty-printed only in debug)"""
+    provider = current_app.json
+    if (provider.compact is None and current_app.debug) or provider.compact is False:
+        return {'indent': 2}
+    return {'separators': (',', ':')}
+
+
+def fragments(model, rows, fields, include):
+    """
+    Encoded JSON objects for rows selected with stamp_columns, in row order.
+
+    Rows may carry extra trailing columns (e.g. a sort key), which are not
+    part of the cache key. Cached fragments are reused as they are; the
+    misses are loaded in chunks of LOAD_CHUNK_SIZE, serialized with the
+    app's JSON provider and stored. Rows deleted between the two queries
+    are skipped.
+    """
+    maxsize = current_app.config['FRAGMENT_CACHE_SIZE']
+    width = len(stamp_columns(model, fields, include))
+    dump_args = _dump_args()
+    encoding = (getattr(current_app.json, 'encoder', 'stdlib'), 'indent' in dump_args)
+    keys = [(model.__tablename__, fields, include, encoding, *tuple(row)[:width]) for row in rows]
+    found = [fragment_cache.get(key) for key in keys] if maxsize else [None] * len(keys)
+
+    missing = [key[4] for key, fragment in zip(keys, found) if fragment is None]
+    if missing:
+        render = RENDERERS[model]
+        rendered = {}
+        for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+            rendered.update(render(missing[start:start + LOAD_CHUNK_SIZE], fields, include))
+        for i, key in enumerate(keys):
+            if found[i] is None and key[4] in rendered:
+                # Copy through a memoryview: orjson's result keeps ~1 KiB of
+                # spare capacity, which would quadruple the cache's footprint
+                found[i] = bytes(memoryview(dumps_bytes(rendered[key[4]], **dump_args)))
+                if maxsize:
+                    fragment_cache.put(key, found[i], maxsize)
+    return [fragment for fragment in found if fragment is not None]
+
+
+def _iter_array(parts):
+    yield b'['
+    for start in range(0, len(parts), STREAM_CHUNK_SIZE):
+        chunk = b','.join(parts[start:start + STREAM_CHUNK_SIZE])
+        yield chunk if start == 0 else b',' + chunk
+    yield b']\n'
+
+
+def fragment_response(parts):
+    """
+    JSON array response built from encoded fragments.
+
+    Long lists are streamed STREAM_CHUNK_SIZE fragments at a time, so the
+    body is never assembled as one large string; the fragments themselves
+    are shared with the cache.
+    """
+    mimetype = current_app.json.mimetype
+    if len(parts) <= STREAM_CHUNK_SIZE:
+        return Response(b'[' + b','.join(parts) + b']\n', mimetype=mimetype)
+    return Response(_iter_array(parts), mimetype=mimetype)
+
+
+def entity_response(parts):
+    """Response for a single encoded fragment (404 when the row was not found)"""
+    if not parts:
+        abort(404)
+    return Response(parts[0] + b'\n', mimetype=current_app.json.mimetype)
+
+
+def init_fragments(app):
+    app.config.setdefault('FRAGMENT_CACHE_SIZE', 50000)
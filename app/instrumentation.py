@@ -0,0 +1,230 @@
+import json
+import logging
+import time
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from flask.json.provider import JSONProvider
+from sqlalchemy import event
+
+
+logger = logging.getLogger(__name__)
+
+# SQL statements kept per request for the over-budget report
+MAX_RECORDED_STATEMENTS = 50
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request runs more SQL statements than allowed"""
+
+
+class RequestTimings:
+    """Counters for one request; lives in flask.g"""
+
+    def __init__(self, keep_statements):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.template = 0.0
+        self.statements = [] if keep_statements else None
+        self._template_started = []
+
+
+def _current():
+    if not has_request_context():
+        return None
+    return g.get('_request_timings')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current()
+    started = conn.info.get('_query_started')
+    if timings is None or not started:
+        return
+    timings.db += time.perf_counter() - started.pop()
+    timings.queries += 1
+    if timings.statements is not None and len(timings.statements) < MAX_RECORDED_STATEMENTS:
+        timings.statements.append(statement)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute: drop its timer
+    # so the next statement on this connection is not paired with it
+    connection = context.connection
+    started = connection.info.get('_query_started') if connection is not None else None
+    if not started or context.execution_context is None:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    timings = _current()
+    if timings is not None:
+        timings.db += elapsed
+        timings.queries += 1
+        if timings.statements is not None and len(timings.statements) < MAX_RECORDED_STATEMENTS:
+            timings.statements.append(context.statement)
+
+
+def _template_started(sender, template, context, **extra):
+    timings = _current()
+    if timings is not None:
+        timings._template_started.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    timings = _current()
+    if timings is not None and timings._template_started:
+        timings.template += time.perf_counter() - timings._template_started.pop()
+
+
+class TimedJSONProvider(JSONProvider):
+    """
+    Wraps the app's JSON provider, adding encoding time to the request's
+    serialize timing. Other attributes (mimetype, compact, ...) are read
+    from the wrapped provider.
+    """
+
+    def __init__(self, app, provider):
+        super().__init__(app)
+        self.provider = provider
+
+    def __getattr__(self, name):
+        if name == 'provider':
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    def _timed(self, function, *args, **kwargs):
+        timings = _current()
+        if timings is None:
+            return function(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings.serialize += time.perf_counter() - started
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(self.provider.dumps, obj, **kwargs)
+
+    def dumps_bytes(self, obj, **kwargs):
+        if hasattr(self.provider, 'dumps_bytes'):
+            return self._timed(self.provider.dumps_bytes, obj, **kwargs)
+        return self.dumps(obj, **kwargs).encode()
+
+    def loads(self, s, **kwargs):
+        return self.provider.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        return self._timed(self.provider.response, *args, **kwargs)
+
+
+def query_budget(limit, **allowances):
+    """
+    Decorator setting the maximum number of SQL statements for a view.
+
+    `limit` is what the common path costs; each keyword names a path
+    that some requests take and the statements it adds, e.g.
+    @query_budget(4, fragment_misses=2, token_miss=1). The budget is
+    their sum, stored as a function attribute, which functools.wraps
+    copies onto the outer decorators' wrappers.
+    """
+    def decorator(f):
+        f.query_budget = limit + sum(allowances.values())
+        return f
+    return decorator
+
+
+def _route_budget():
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is None:
+        budget = current_app.config['QUERY_BUDGET'] or None
+    return budget
+
+
+class Instrumentation:
+    """
+    Per-request SQL, serialization and template timings.
+
+    Every request records the number of SQL statements and their total
+    time (engine cursor events), JSON encoding time and template render
+    time. They are sent back as a Server-Timing header and logged as one
+    JSON line on the 'app.instrumentation' logger.
+
+    Views may declare a maximum statement count with @query_budget(n)
+    (QUERY_BUDGET applies to the others, 0 = no limit). Requests over
+    budget are logged as warnings, or raise QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is set, which fails the request in tests.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('INSTRUMENTATION_ENABLED', True)
+        app.config.setdefault('SERVER_TIMING_HEADER', True)
+        app.config.setdefault('QUERY_BUDGET', 0)
+        app.config.setdefault('QUERY_BUDGET_STRICT', False)
+        app.extensions['instrumentation'] = self
+        if not app.config['INSTRUMENTATION_ENABLED']:
+            return
+
+        if db is not None:
+            with app.app_context():
+                for engine in db.engines.values():
+                    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+                    event.listen(engine, 'handle_error', _handle_error)
+        before_render_template.connect(_template_started, app)
+        template_rendered.connect(_template_finished, app)
+        app.json = TimedJSONProvider(app, app.json)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g._request_timings = RequestTimings(keep_statements=current_app.config['QUERY_BUDGET_STRICT'])
+
+    def _finish(self, response):
+        timings = g.pop('_request_timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.started
+
+        if current_app.config['SERVER_TIMING_HEADER']:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+                f'serialize;dur={timings.serialize * 1000:.2f}',
+                f'template;dur={timings.template * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ])
+
+        budget = _route_budget()
+        over_budget = budget is not None and timings.queries > budget
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'db_queries': timings.queries,
+            'db_ms': round(timings.db * 1000, 2),
+            'serialize_ms': round(timings.serialize * 1000, 2),
+            'template_ms': round(timings.template * 1000, 2),
+        }
+        if over_budget:
+            record['query_budget'] = budget
+            logger.warning(json.dumps(record))
+            if current_app.config['QUERY_BUDGET_STRICT']:
+                statements = '\n'.join(f'  {statement}' for statement in timings.statements or [])
+                raise QueryBudgetExceeded(
+                    f'{request.method} {request.path} ran {timings.queries} SQL statements '
+                    f'(budget {budget}):\n{statements}')
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+
+instrumentation = Instrumentation()
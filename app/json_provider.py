@@ -0,0 +1,109 @@
+import json
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional: pip install msgspec
+    msgspec = None
+
+
+# Encoders in order of preference for JSON_ENCODER=auto
+JSON_ENCODERS = ('orjson', 'msgspec', 'stdlib')
+
+# json.dumps arguments the fast encoders can honour; anything else goes to json
+_FAST_KWARGS = {'default', 'sort_keys', 'ensure_ascii', 'indent', 'separators'}
+
+
+def available_encoders():
+    """Names of the encoders importable in this environment"""
+    modules = {'orjson': orjson, 'msgspec': msgspec, 'stdlib': json}
+    return [name for name in JSON_ENCODERS if modules[name] is not None]
+
+
+def resolve_encoder(name):
+    """Pick the encoder for a JSON_ENCODER setting, raising ValueError when unavailable"""
+    available = available_encoders()
+    if name == 'auto':
+        return available[0]
+    if name not in JSON_ENCODERS:
+        raise ValueError(f"Unknown JSON_ENCODER '{name}' (expected auto or one of {', '.join(JSON_ENCODERS)})")
+    if name not in available:
+        raise ValueError(f"JSON_ENCODER '{name}' is not installed")
+    return name
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson or msgspec, with json as fallback.
+
+    Output follows DefaultJSONProvider (sorted keys, datetimes as HTTP
+    dates with orjson) except that non-ASCII text is written as UTF-8
+    instead of \\u escapes and compact output has no spaces. Calls using
+    json.dumps options the fast encoder lacks, and values it rejects (e.g.
+    integers over 64 bits), are handed to the stdlib encoder. Parsing
+    request bodies stays on json, which keeps big integers exact.
+    """
+
+    def __init__(self, app, encoder='auto'):
+        super().__init__(app)
+        self.encoder = resolve_encoder(encoder)
+
+    def _fast(self, kwargs):
+        if self.encoder == 'stdlib' or not _FAST_KWARGS.issuperset(kwargs):
+            return False
+        indent = kwargs.get('indent')
+        separators = kwargs.get('separators')
+        if indent not in (None, 2) or (indent is None and separators not in (None, (',', ':'))):
+            return False
+        return True
+
+    def dumps_bytes(self, obj, **kwargs):
+        """Serialize to UTF-8 bytes, skipping the str round trip of dumps()"""
+        if not self._fast(kwargs):
+            return super().dumps(obj, **kwargs).encode()
+        default = kwargs.get('default', self.default)
+        sort_keys = kwargs.get('sort_keys', self.sort_keys)
+        try:
+            if self.encoder == 'orjson':
+                option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                if sort_keys:
+                    option |= orjson.OPT_SORT_KEYS
+                if kwargs.get('indent'):
+                    option |= orjson.OPT_INDENT_2
+                return orjson.dumps(obj, default=default, option=option)
+            data = msgspec.json.encode(obj, enc_hook=default, order='sorted' if sort_keys else None)
+            return msgspec.json.format(data, indent=2) if kwargs.get('indent') else data
+        except (TypeError, OverflowError):
+            return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        if not self._fast(kwargs):
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args = {'indent': 2}
+        else:
+            dump_args = {'separators': (',', ':')}
+        return self._app.response_class(self.dumps_bytes(obj, **dump_args) + b'\n', mimetype=self.mimetype)
+
+
+def dumps_bytes(obj, **kwargs):
+    """Serialize with the current app's provider to UTF-8 bytes"""
+    provider = current_app.json
+    if hasattr(provider, 'dumps_bytes'):
+        return provider.dumps_bytes(obj, **kwargs)
+    return provider.dumps(obj, **kwargs).encode()
+
+
+def init_json(app):
+    app.config.setdefault('JSON_ENCODER', 'auto')
+    app.json = FastJSONProvider(app, app.config['JSON_ENCODER'])
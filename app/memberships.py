@@ -0,0 +1,74 @@
+from app import db
+from app.models import User, Group, user_groups, bump_versions
+from app.changes import record_selected
+
+
+# Ids bound per statement, well under every backend's parameter limit
+MEMBERSHIP_CHUNK_SIZE = 500
+
+
+def _chunks(ids):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), MEMBERSHIP_CHUNK_SIZE):
+        yield ids[start:start + MEMBERSHIP_CHUNK_SIZE]
+
+
+def _insert_ignore(select_stmt):
+    """
+    INSERT INTO user_groups ... SELECT, skipping pairs that already exist.
+
+    The SELECT only yields rows that exist, so unknown ids are dropped by
+    the database instead of being checked in Python. Returns rows inserted.
+    """
+    stmt = user_groups.insert().from_select(['user_id', 'group_id'], select_stmt)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        stmt = stmt.prefix_with('OR IGNORE')
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = stmt.prefix_with('IGNORE')
+    return db.session.execute(stmt).rowcount
+
+
+def _not_member(user_id, group_id):
+    return ~db.select(user_groups.c.user_id).where(
+        user_groups.c.user_id == user_id, user_groups.c.group_id == group_id
+    ).exists()
+
+
+def add_users_to_group(group_id, user_ids):
+    """Add users to a group with set-based INSERTs; returns the number added"""
+    added = 0
+    for chunk in _chunks(user_ids):
+        pairs = db.select(User.id, db.literal(group_id)).where(User.id.in_(chunk))
+        record_selected(db.session.connection(), 'membership', 'add',
+                        pairs.where(_not_member(User.id, group_id)))
+        added += _insert_ignore(pairs)
+    if added:
+        bump_versions(db.session.connection(), {'memberships'})
+    return added
+
+
+def add_user_to_groups(user_id, group_ids):
+    """Add one user to several groups; returns the number of groups added"""
+    added = 0
+    for chunk in _chunks(group_ids):
+        pairs = db.select(db.literal(user_id), Group.id).where(Group.id.in_(chunk))
+        record_selected(db.session.connection(), 'membership', 'add',
+                        pairs.where(_not_member(user_id, Group.id)))
+        added += _insert_ignore(pairs)
+    if added:
+        bump_versions(db.session.connection(), {'memberships'})
+    return added
+
+
+def remove_users_from_group(group_id, user_ids):
+    """Remove users from a group with DELETE ... IN; returns the number removed"""
+    removed = 0
+    for chunk in _chunks(user_ids):
+        condition = db.and_(user_groups.c.group_id == group_id, user_groups.c.user_id.in_(chunk))
+        record_selected(db.session.connection(), 'membership', 'remove',
+                        db.select(user_groups.c.user_id, user_groups.c.group_id).where(condition))
+        removed += db.session.execute(user_groups.delete().where(condition)).rowcount
+    if removed:
+        bump_versions(db.session.connection(), {'memberships'})
+    return removed
@@ -0,0 +1,298 @@
+import glob
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, current_app, g, request
+
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'userkit_http_requests_total': (
+        'counter', 'HTTP requests by endpoint, method and status code', None),
+    'userkit_http_request_duration_seconds': (
+        'histogram', 'HTTP request latency by endpoint', LATENCY_BUCKETS),
+    'userkit_password_hash_duration_seconds': (
+        'histogram', 'Password hashing time by operation (check includes queueing)', LATENCY_BUCKETS),
+    'userkit_password_check_busy_total': (
+        'counter', 'Password checks rejected because the hashing pool was saturated', None),
+    'userkit_logins_total': (
+        'counter', 'Login attempts by result', None),
+    'userkit_login_throttled_total': (
+        'counter', 'Login attempts rejected by the rate limiter, by scope (ip or username)', None),
+    'userkit_event_subscribers': ('gauge', 'Open /api/events streams in this process', None),
+    'userkit_event_catchups_total': (
+        'counter', 'Event streams that re-read the change log, by reason (overflow or gap)', None),
+    'userkit_db_pool_size': ('gauge', 'Configured connection pool size', None),
+    'userkit_db_pool_checked_out': ('gauge', 'Connections currently in use', None),
+    'userkit_db_pool_checked_in': ('gauge', 'Idle connections in the pool', None),
+    'userkit_db_pool_overflow': ('gauge', 'Connections opened beyond the pool size', None),
+    'userkit_db_pool_checkouts_total': ('counter', 'Connection checkouts', None),
+    'userkit_db_pool_timeouts_total': ('counter', 'Connection checkouts that timed out', None),
+    'userkit_db_pool_wait_seconds_total': ('counter', 'Total time spent waiting for a connection', None),
+}
+
+POOL_GAUGES = {
+    'userkit_db_pool_size': 'size',
+    'userkit_db_pool_checked_out': 'checked_out',
+    'userkit_db_pool_checked_in': 'checked_in',
+    'userkit_db_pool_overflow': 'overflow',
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of the current process.
+
+    With METRICS_DIR set, every process writes a snapshot of its values to
+    METRICS_DIR/metrics-<pid>.json (atomically, at most once per
+    METRICS_FLUSH_INTERVAL seconds) and /metrics sums the snapshots of all
+    processes, so any gunicorn worker can answer a scrape. Counters of
+    workers that exited keep counting; their gauges are dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def _check_pid(self):
+        # Values inherited through fork() belong to the parent
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._check_pid()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = _key(name, labels)
+        with self._lock:
+            self._check_pid()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self, gauges=()):
+        with self._lock:
+            self._check_pid()
+            return {
+                'pid': self._pid,
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), list(counts), total, count]
+                               for (name, labels), (counts, total, count) in self._histograms.items()],
+                'gauges': [list(gauge) for gauge in gauges],
+            }
+
+    def flush(self, directory, gauges=None, force=False, interval=1.0):
+        """
+        Write this process's snapshot to `directory` if it is due.
+
+        gauges is a callable returning the live gauge values; it is only
+        called when a snapshot is actually written.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_flush < interval:
+            return
+        self._last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.snapshot(gauges() if gauges else ())
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, os.path.join(directory, f"metrics-{snapshot['pid']}.json"))
+
+
+metrics = MetricsRegistry()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _pool_gauges():
+    """Gauges/counters for the pools of this process's engines"""
+    from app import db
+    from app.database import TimedQueuePool, pool_stats
+    values = []
+    for bind, engine in db.engines.items():
+        stats = pool_stats(engine)
+        labels = {'bind': bind or 'default'}
+        for name, field in POOL_GAUGES.items():
+            if field in stats:
+                values.append((name, labels, stats[field]))
+        pool = engine.pool
+        if isinstance(pool, TimedQueuePool):
+            values.append(('userkit_db_pool_checkouts_total', labels, pool.checkouts))
+            values.append(('userkit_db_pool_timeouts_total', labels, pool.timeouts))
+            values.append(('userkit_db_pool_wait_seconds_total', labels, pool.total_wait))
+    return values
+
+
+def _process_gauges():
+    """Pool values plus the other gauges read live from this process"""
+    from app.events import event_hub
+    return _pool_gauges() + [('userkit_event_subscribers', {}, len(event_hub))]
+
+
+def _load_snapshots():
+    directory = current_app.config['METRICS_DIR']
+    if not directory:
+        return [metrics.snapshot(_process_gauges())]
+    metrics.flush(directory, _process_gauges, force=True)
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_metrics(snapshots):
+    """Merge process snapshots into the Prometheus text exposition format"""
+    counters = {}
+    histograms = {}
+    gauges = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in snapshot['histograms']:
+            key = _key(name, labels)
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+        if snapshot['pid'] == os.getpid() or _pid_alive(snapshot['pid']):
+            for name, labels, value in snapshot['gauges']:
+                gauges[_key(name, dict(labels, pid=snapshot['pid']))] = value
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                labels = dict(labels)
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(dict(labels, le=le))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        else:
+            # Pool counters are read live per process, so they travel with the gauges
+            for source in (counters, gauges):
+                for (metric, labels), value in sorted(source.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(dict(labels))} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    """
+    Prometheus scrape endpoint.
+
+    Requires 'Authorization: Bearer <METRICS_TOKEN>'; without a token it
+    is only served in debug mode, so a production deployment never
+    exposes its metrics by accident.
+    """
+    token = current_app.config['METRICS_TOKEN']
+    if not token and not current_app.debug:
+        return Response('Not Found\n', status=404, mimetype='text/plain')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_metrics(_load_snapshots()),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _record(status):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return
+    endpoint = request.endpoint or 'none'
+    metrics.observe('userkit_http_request_duration_seconds', time.perf_counter() - started,
+                    endpoint=endpoint)
+    metrics.inc('userkit_http_requests_total', endpoint=endpoint, method=request.method,
+                status=str(status))
+    directory = current_app.config['METRICS_DIR']
+    if directory:
+        metrics.flush(directory, _process_gauges, interval=current_app.config['METRICS_FLUSH_INTERVAL'])
+
+
+def _after_request(response):
+    _record(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    # Unhandled exceptions skip after_request; count them as 500s
+    if exc is not None:
+        _record(500)
+
+
+def init_metrics(app):
+    """Record request metrics and serve them at /metrics"""
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_DIR', '')
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 1.0)
+    app.config.setdefault('METRICS_TOKEN', '')
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.extensions['metrics'] = metrics
+    app.before_request(_start_timer)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
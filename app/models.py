@@ -1,15 +1,35 @@
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session, attributes
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from app.passwords import hash_password
+
+
+# updated_at feeds cache keys and ETags, so two edits must never share a
+# value: MySQL's DATETIME keeps whole seconds unless a precision is given
+PreciseDateTime = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql', 'mariadb')
 
 
 # Association table for many-to-many relationship
 user_groups = db.Table('user_groups',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('group_id', db.Integer, db.ForeignKey('groups.id'), primary_key=True)
+    db.Column('group_id', db.Integer, db.ForeignKey('groups.id'), primary_key=True),
+    # The primary key only covers lookups by user_id; members of a group need their own index
+    db.Index('ix_user_groups_group_id', 'group_id', 'user_id')
 )
 
 
+def _serialize_fields(obj, fields):
+    """Read the given attributes into a dict, formatting datetimes as ISO 8601"""
+    data = {}
+    for field in fields:
+        value = getattr(obj, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
 class User(db.Model):
     """User model"""
     __tablename__ = 'users'
@@ -18,40 +38,49 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    is_admin = db.Column(db.Boolean, default=False)
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    is_admin = db.Column(db.Boolean, default=False, index=True)
+    is_active = db.Column(db.Boolean, default=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
-    # Relationships
-    groups = db.relationship('Group', secondary=user_groups, lazy='subquery',
+    # Relationships (loaded on access; list endpoints pick a loader per request)
+    groups = db.relationship('Group', secondary=user_groups, lazy='select',
                            backref=db.backref('users', lazy=True))
     
+    # Fields and relationships clients may request through ?fields= / ?include=
+    API_FIELDS = ('id', 'username', 'email', 'is_admin', 'is_active', 'created_at', 'updated_at')
+    API_INCLUDES = ('groups',)
+    
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check if password matches hash"""
         return check_password_hash(self.password_hash, password)
     
-    def to_dict(self):
-        """Convert user to dictionary"""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'is_admin': self.is_admin,
-            'is_active': self.is_active,
-            'groups': [{'id': g.id, 'name': g.name} for g in self.groups],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    def to_dict(self, fields=None, include=('groups',)):
+        """
+        Convert user to dictionary
+        
+        fields limits the scalar fields (default: all API_FIELDS); include
+        lists the relationships to embed. Only requested attributes are read,
+        so load_only/raiseload queries never trigger extra loads here.
+        """
+        data = _serialize_fields(self, fields or self.API_FIELDS)
+        if 'groups' in include:
+            data['groups'] = [{'id': g.id, 'name': g.name} for g in self.groups]
+        return data
     
     def __repr__(self):
         return f'<User {self.username}>'
 
 
+# Case-insensitive ?q= prefix searches on SQLite (see pagination.prefix_match)
+db.Index('ix_users_username_nocase', db.collate(User.username, 'NOCASE')).ddl_if(dialect='sqlite')
+db.Index('ix_users_email_nocase', db.collate(User.email, 'NOCASE')).ddl_if(dialect='sqlite')
+
+
 class Group(db.Model):
     """Group model"""
     __tablename__ = 'groups'
@@ -60,20 +89,159 @@ class Group(db.Model):
     name = db.Column(db.String(80), unique=True, nullable=False, index=True)
     description = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
-    def to_dict(self):
-        """Convert group to dictionary"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'user_count': len(self.users),
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    API_FIELDS = ('id', 'name', 'description', 'user_count', 'created_at', 'updated_at')
+    API_INCLUDES = ('users',)
+    
+    @staticmethod
+    def member_counts(group_ids=None):
+        """Return {group_id: member count} from a single aggregate over user_groups"""
+        query = db.session.query(user_groups.c.group_id, db.func.count(user_groups.c.user_id)) \
+            .group_by(user_groups.c.group_id)
+        if group_ids is not None:
+            query = query.filter(user_groups.c.group_id.in_(group_ids))
+        return dict(query.all())
+    
+    @property
+    def member_count(self):
+        """Count members with a COUNT query instead of loading every member"""
+        return db.session.query(db.func.count(user_groups.c.user_id)) \
+            .filter(user_groups.c.group_id == self.id).scalar()
+    
+    def to_dict(self, user_count=None, fields=None, include=()):
+        """
+        Convert group to dictionary (pass user_count when it is already known)
+        
+        fields limits the fields (default: all API_FIELDS); include=('users',)
+        embeds the members as {id, username}.
+        """
+        fields = fields or self.API_FIELDS
+        data = _serialize_fields(self, [f for f in fields if f != 'user_count'])
+        if 'user_count' in fields:
+            data['user_count'] = self.member_count if user_count is None else user_count
+        if 'users' in include:
+            data['users'] = [{'id': u.id, 'username': u.username} for u in self.users]
+        return data
     
     def __repr__(self):
         return f'<Group {self.name}>'
 
 
+class ApiToken(db.Model):
+    """
+    Bearer token for API automation.
+
+    Only an HMAC-SHA256 of the token is stored (see app.tokens), so a
+    lookup is a single indexed equality match instead of a password KDF.
+    """
+    __tablename__ = 'api_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(80), nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    prefix = db.Column(db.String(12), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+    
+    user = db.relationship('User', backref=db.backref('api_tokens', cascade='all, delete-orphan', lazy='select'))
+    
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= datetime.utcnow()
+    
+    def to_dict(self):
+        """Token metadata (the secret itself is never stored)"""
+        data = _serialize_fields(self, ('id', 'user_id', 'name', 'prefix', 'created_at', 'expires_at', 'revoked_at'))
+        data['active'] = self.revoked_at is None and not self.is_expired
+        return data
+    
+    def __repr__(self):
+        return f'<ApiToken {self.prefix}… user={self.user_id}>'
+
+
+class Change(db.Model):
+    """
+    Change log entry behind GET /api/changes (written by app.changes).
+
+    kind is 'user' or 'group' (action 'upsert' or 'delete', object_id is
+    the row id) or 'membership' (action 'add' or 'remove', object_id is
+    the user and group_id the group). The id is the change token clients
+    resume from, so ids must never be reused once entries are pruned.
+    """
+    __tablename__ = 'changes'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    object_id = db.Column(db.Integer, nullable=False)
+    group_id = db.Column(db.Integer, nullable=True)
+    action = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<Change {self.id} {self.kind}:{self.object_id} {self.action}>'
+
+
+class DataVersion(db.Model):
+    """
+    Version counters for changes that leave no trace in updated_at.
+
+    Rows: 'users' and 'groups' (bumped on deletes) and 'memberships'
+    (bumped whenever user_groups changes). Used to build HTTP validators.
+    'changes' is bumped before every change log write and
+    'changes_pruned' holds the newest change id removed by pruning.
+    """
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
+
+
+def bump_versions(connection, names):
+    """Increment the DataVersion counters in `names` on the given connection"""
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    for name in sorted(names):
+        result = connection.execute(
+            table.update().where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(name=name, version=1, updated_at=now))
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_version_changes(session, flush_context, instances):
+    """Note which counters this flush must bump (membership edits and deletes)"""
+    names = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User):
+            history = attributes.get_history(obj, 'groups', passive=attributes.PASSIVE_NO_INITIALIZE)
+        elif isinstance(obj, Group):
+            history = attributes.get_history(obj, 'users', passive=attributes.PASSIVE_NO_INITIALIZE)
+        else:
+            continue
+        if history.has_changes():
+            names.add('memberships')
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            names.update(('users', 'memberships'))
+        elif isinstance(obj, Group):
+            names.update(('groups', 'memberships'))
+    if names:
+        session.info.setdefault('pending_versions', set()).update(names)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_version_changes(session, flush_context):
+    """Bump the counters in the same transaction as the flushed changes"""
+    names = session.info.pop('pending_versions', None)
+    if names:
+        bump_versions(session.connection(), names)
@@ -0,0 +1,121 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, collate
+from app import db
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse the ?limit= query parameter, raising ValueError when invalid"""
+    if value in (None, ''):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def parse_bool(value):
+    """Parse a boolean query parameter (true/false/1/0), None when absent"""
+    if value in (None, ''):
+        return None
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'invalid boolean value: {value}')
+
+
+def prefix_match(column, prefix):
+    """
+    Filter rows whose column starts with prefix, ignoring case, as an index range scan.
+
+    SQLite only uses an index for LIKE under case_sensitive_like, so there
+    the prefix becomes a range over the column's NOCASE index (ASCII case
+    folding, like SQLite's LIKE); other backends keep LIKE 'prefix%', which
+    their case-insensitive collations and indexes already serve.
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        folded = collate(column, 'NOCASE')
+        return and_(folded >= prefix, folded < prefix + '\U0010ffff')
+    return column.startswith(prefix, autoescape=True)
+
+
+def encode_cursor(sort_value, row_id):
+    """Build an opaque cursor from the last row's sort value and id"""
+    if isinstance(sort_value, datetime):
+        sort_value = {'dt': sort_value.isoformat()}
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_column=None):
+    """
+    Decode a cursor built by encode_cursor, raising ValueError when invalid.
+
+    The id must be an integer and the sort value must match the type of
+    sort_column (str, int or an ISO datetime), so a forged cursor is
+    rejected here instead of failing inside the query.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, dict) and set(sort_value) == {'dt'}:
+            sort_value = datetime.fromisoformat(sort_value['dt'])
+    except (TypeError, ValueError) as e:
+        raise ValueError('invalid cursor') from e
+    if not _is_int(row_id):
+        raise ValueError('invalid cursor')
+    if sort_column is not None:
+        expected = sort_column.type.python_type
+        valid = _is_int(sort_value) if expected is int else isinstance(sort_value, expected)
+        if not valid:
+            raise ValueError('invalid cursor')
+    return sort_value, row_id
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def keyset_page(query, sort_column, id_column, after=None, limit=DEFAULT_PAGE_SIZE,
+                descending=False):
+    """
+    Fetch one page of a query ordered by (sort_column, id_column).
+
+    Rows are located with a "seek" predicate instead of OFFSET, so every page
+    is a single range scan over the sort column's index. Returns the rows and
+    the cursor for the next page (None on the last page).
+    """
+    if after is not None:
+        last_value, last_id = decode_cursor(after, sort_column)
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            query = query.filter(or_(sort_column < last_value,
+                                     and_(sort_column == last_value, id_column < last_id)))
+        else:
+            query = query.filter(or_(sort_column > last_value,
+                                     and_(sort_column == last_value, id_column > last_id)))
+
+    if sort_column is id_column:
+        order = [id_column.desc() if descending else id_column.asc()]
+    elif descending:
+        order = [sort_column.desc(), id_column.desc()]
+    else:
+        order = [sort_column.asc(), id_column.asc()]
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from functools import lru_cache, partial
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.metrics import metrics
+
+
+# Below this many passwords a pool costs more to start than it saves
+PARALLEL_HASH_THRESHOLD = 16
+
+
+class HashingBusy(Exception):
+    """Raised when every hashing worker and queue slot is taken"""
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """Full parameter prefix werkzeug writes for a method, e.g. 'scrypt:32768:8:1'"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def needs_rehash(password_hash, method):
+    """True when a stored hash was made with other parameters than `method`"""
+    return password_hash.split('$', 1)[0] != _method_prefix(method)
+
+
+def _check_and_rehash(password_hash, password, method):
+    """Worker task: verify a password and rehash it when the parameters are outdated"""
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if needs_rehash(password_hash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    """
+    Runs password verification on a bounded worker pool.
+
+    At most PASSWORD_CHECK_WORKERS checks run at once and at most
+    PASSWORD_CHECK_QUEUE_SIZE more wait for a worker; beyond that
+    check() raises HashingBusy immediately instead of piling up request
+    threads behind a slow KDF. The pool is created lazily in each process,
+    so it is safe to initialize before gunicorn forks its workers.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_CHECK_EXECUTOR', 'thread')
+        app.config.setdefault('PASSWORD_CHECK_WORKERS', os.cpu_count() or 1)
+        app.config.setdefault('PASSWORD_CHECK_QUEUE_SIZE', 16)
+        app.config.setdefault('PASSWORD_CHECK_TIMEOUT', 10)
+        app.config.setdefault('PASSWORD_CHECK_RETRY_AFTER', 5)
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    config = current_app.config
+                    workers = max(1, int(config['PASSWORD_CHECK_WORKERS']))
+                    pool_class = (ProcessPoolExecutor if config['PASSWORD_CHECK_EXECUTOR'] == 'process'
+                                  else ThreadPoolExecutor)
+                    self._slots = threading.BoundedSemaphore(
+                        workers + max(0, int(config['PASSWORD_CHECK_QUEUE_SIZE'])))
+                    self._executor = pool_class(max_workers=workers)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def check(self, password_hash, password):
+        """
+        Verify a password on the pool.
+
+        Returns (matches, new_hash) where new_hash is set when the stored
+        hash should be replaced to match PASSWORD_HASH_METHOD. Raises
+        HashingBusy when the pool is saturated or the check times out.
+        """
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            metrics.inc('userkit_password_check_busy_total')
+            raise HashingBusy()
+        started = time.perf_counter()
+
+        try:
+            future = executor.submit(_check_and_rehash, password_hash, password,
+                                     current_app.config['PASSWORD_HASH_METHOD'])
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            result = future.result(timeout=current_app.config['PASSWORD_CHECK_TIMEOUT'])
+        except TimeoutError:
+            metrics.inc('userkit_password_check_busy_total')
+            raise HashingBusy()
+        metrics.observe('userkit_password_hash_duration_seconds', time.perf_counter() - started,
+                        operation='check')
+        return result
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password):
+    """Hash a password with the configured PASSWORD_HASH_METHOD"""
+    started = time.perf_counter()
+    password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
+    metrics.observe('userkit_password_hash_duration_seconds', time.perf_counter() - started,
+                    operation='hash')
+    return password_hash
+
+
+@contextmanager
+def hashing_pool(workers=None):
+    """
+    Process pool shared by the hash_passwords() calls of one bulk job.
+
+    Yields None when PASSWORD_HASH_WORKERS is 1. Worker processes start
+    on the first submitted batch and are reused by the following ones,
+    so a chunked import pays for them once rather than per chunk.
+    """
+    if workers is None:
+        workers = current_app.config.get('PASSWORD_HASH_WORKERS', 1)
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield pool
+
+
+def hash_passwords(passwords, pool=None):
+    """
+    Hash a list of passwords, fanning out over a process pool.
+
+    generate_password_hash is CPU-bound, so separate processes hash in
+    parallel on every core. Pass the pool of hashing_pool() when hashing
+    several batches; without one a pool is started for this call only.
+    Results keep the order of the input list.
+    """
+    passwords = list(passwords)
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 1)
+    hasher = partial(generate_password_hash, method=current_app.config['PASSWORD_HASH_METHOD'])
+
+    if workers <= 1 or len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [hasher(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    if pool is not None:
+        return list(pool.map(hasher, passwords, chunksize=chunksize))
+    with hashing_pool(min(workers, len(passwords))) as pool:
+        return list(pool.map(hasher, passwords, chunksize=chunksize))
@@ -1,7 +1,23 @@
 from functools import wraps
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, current_app, request, jsonify, session, url_for, Response, stream_with_context, g
 from app import db
-from app.models import User, Group
+from app.models import User, Group, ApiToken, user_groups
+from app.pagination import parse_limit, parse_bool, keyset_page, prefix_match
+from app.export import EXPORT_FORMATS, iter_export
+from app.bulk_import import parse_csv, import_users
+from app.stats import get_dashboard_stats
+from app.database import pool_stats, use_replica
+from app.instrumentation import query_budget
+from app.search import search_users
+from app.tokens import authenticate_token, issue_token, revoke_token
+from app.memberships import add_users_to_group, add_user_to_groups as add_memberships, remove_users_from_group
+from app.fieldsets import parse_fieldset, user_load_options
+from app.fragments import stamp_columns, fragments, fragment_response, entity_response
+from app.changes import (changes_since, current_token, ChangeTokenExpired,
+                         DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT)
+from app.events import event_hub, iter_events, threaded_server
+from app.conditional import (conditional, users_collection_state, user_state,
+                             groups_collection_state, group_state, group_users_state)
 from sqlalchemy.exc import IntegrityError
 
 api_bp = Blueprint('api', __name__)
@@ -9,33 +25,178 @@ api_bp = Blueprint('api', __name__)
 
 # API Authentication decorator
 def api_admin_required(f):
-    """Decorator to require admin for API routes"""
+    """Decorator to require admin for API routes (session cookie or Bearer token)"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer':
+            principal = authenticate_token(credentials.strip())
+            if principal is None:
+                return jsonify({'error': 'Invalid or expired token'}), 401
+            if not principal['is_admin']:
+                return jsonify({'error': 'Admin privileges required'}), 403
+            g.api_user_id = principal['user_id']
+            g.api_token_id = principal['token_id']
+            return f(*args, **kwargs)
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required'}), 401
         if not session.get('is_admin', False):
             return jsonify({'error': 'Admin privileges required'}), 403
+        g.api_user_id = session['user_id']
+        g.api_token_id = None
         return f(*args, **kwargs)
     return decorated_function
 
 
+# ============= STATS ENDPOINT =============
+
+@api_bp.route('/stats', methods=['GET'])
+@query_budget(1, token_miss=1)
+@api_admin_required
+def get_stats():
+    """Dashboard counters (users, active, admins, groups) - Admin only"""
+    return jsonify(get_dashboard_stats()), 200
+
+
+@api_bp.route('/pool', methods=['GET'])
+@api_admin_required
+def get_pool_stats():
+    """Database connection pool statistics of this worker process - Admin only"""
+    return jsonify(pool_stats(db.engine)), 200
+
+
 # ============= USER ENDPOINTS =============
 
+# Deepest result offset served by /users/search
+MAX_SEARCH_OFFSET = 10000
+
+# Sort keys accepted by GET /users; each one is backed by an index
+USER_SORT_KEYS = {
+    'id': User.id,
+    'username': User.username,
+    'email': User.email,
+    'created_at': User.created_at,
+}
+
 @api_bp.route('/users', methods=['GET'])
+@query_budget(4, fragment_misses=2, token_miss=1)
 @api_admin_required
+@use_replica
+@conditional(users_collection_state, User, default_include=('groups',))
 def get_users():
-    """Get all users - Admin only"""
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
+    """
+    List users one page at a time - Admin only
+
+    Query parameters: limit, after (cursor), sort (id, username, email,
+    created_at; prefix with '-' for descending), q (username/email prefix),
+    is_active, is_admin and group_id. The cursor for the next page is
+    returned in the X-Next-Cursor and Link headers. Accepts ?fields= and
+    ?include=groups (see fieldsets.parse_fieldset).
+    """
+    sort = request.args.get('sort', 'id')
+    descending = sort.startswith('-')
+    sort_column = USER_SORT_KEYS.get(sort.lstrip('-'))
+    if sort_column is None:
+        return jsonify({'error': f'Invalid sort key: {sort}'}), 400
+    
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        is_active = parse_bool(request.args.get('is_active'))
+        is_admin = parse_bool(request.args.get('is_admin'))
+        group_id = request.args.get('group_id', type=int)
+        fields, include = parse_fieldset(request.args, User, default_include=('groups',))
+        
+        # Select ids and cache stamps only; the bodies come from the fragment cache
+        columns = stamp_columns(User, fields, include)
+        if sort_column is not User.id:
+            columns.append(sort_column)
+        query = db.session.query(*columns)
+        q = request.args.get('q', '').strip()
+        if q:
+            query = query.filter(db.or_(prefix_match(User.username, q), prefix_match(User.email, q)))
+        if is_active is not None:
+            query = query.filter(User.is_active == is_active)
+        if is_admin is not None:
+            query = query.filter(User.is_admin == is_admin)
+        if group_id is not None:
+            query = query.join(user_groups, user_groups.c.user_id == User.id) \
+                         .filter(user_groups.c.group_id == group_id)
+        
+        users, next_cursor = keyset_page(query, sort_column, User.id,
+                                         after=request.args.get('after'),
+                                         limit=limit, descending=descending)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = fragment_response(fragments(User, users, fields, include))
+    if next_cursor:
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("api.get_users", **args)}>; rel="next"'
+    return response, 200
+
+
+@api_bp.route('/users/search', methods=['GET'])
+@query_budget(3, fuzzy_fallback=2, token_miss=1)
+@api_admin_required
+def search_users_endpoint():
+    """
+    Search users by substring of username or email, best match first - Admin only
+
+    Query parameters: q (required), limit, offset, fields and include. The
+    next page's URL is returned in the Link header.
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Search term (q) is required'}), 400
+    
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        offset = request.args.get('offset', 0, type=int)
+        if offset < 0 or offset > MAX_SEARCH_OFFSET:
+            raise ValueError(f'offset must be between 0 and {MAX_SEARCH_OFFSET}')
+        fields, include = parse_fieldset(request.args, User, default_include=('groups',))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    users = search_users(q, limit + 1, offset, options=user_load_options(fields, include))
+    response = jsonify([user.to_dict(fields, include) for user in users[:limit]])
+    if len(users) > limit:
+        args = request.args.to_dict()
+        args['offset'] = offset + limit
+        response.headers['Link'] = f'<{url_for("api.search_users_endpoint", **args)}>; rel="next"'
+    return response, 200
+
+
+@api_bp.route('/users/export', methods=['GET'])
+@api_admin_required
+def export_users():
+    """Stream every user with their groups as NDJSON or CSV (?format=) - Admin only"""
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Invalid format: {fmt}'}), 400
+    
+    response = Response(stream_with_context(iter_export(fmt)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=users.{fmt}'
+    # Ask reverse proxies not to buffer the whole body before forwarding it
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_bp.route('/users/<int:user_id>', methods=['GET'])
+@query_budget(4, fragment_misses=2, token_miss=1)
 @api_admin_required
+@conditional(user_state, User, default_include=('groups',))
 def get_user(user_id):
     """Get specific user by ID - Admin only"""
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict()), 200
+    try:
+        fields, include = parse_fieldset(request.args, User, default_include=('groups',))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = db.session.query(*stamp_columns(User, fields, include)).filter(User.id == user_id).all()
+    return entity_response(fragments(User, rows, fields, include)), 200
 
 
 @api_bp.route('/users', methods=['POST'])
@@ -75,6 +236,28 @@ def create_user():
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/users/bulk', methods=['POST'])
+@api_admin_required
+def bulk_create_users():
+    """
+    Create many users at once - Admin only
+
+    Accepts a JSON list of user objects (or {"users": [...]}) or a CSV body
+    (Content-Type: text/csv). Invalid or duplicate rows are reported in
+    'errors' without aborting the rest of the batch.
+    """
+    if request.mimetype == 'text/csv':
+        rows = parse_csv(request.get_data(as_text=True))
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get('users') if isinstance(data, dict) else data
+    
+    if not isinstance(rows, list):
+        return jsonify({'error': 'A list of users is required'}), 400
+    
+    return jsonify(import_users(rows)), 200
+
+
 @api_bp.route('/users/<int:user_id>', methods=['PUT'])
 @api_admin_required
 def update_user(user_id):
@@ -190,12 +373,11 @@ def add_user_to_groups(user_id):
     if not data or 'group_ids' not in data:
         return jsonify({'error': 'group_ids are required'}), 400
     
-    groups = Group.query.filter(Group.id.in_(data['group_ids'])).all()
-    
-    for group in groups:
-        if group not in user.groups:
-            user.groups.append(group)
+    group_ids = _parse_id_list(data['group_ids'])
+    if group_ids is None:
+        return jsonify({'error': 'group_ids must be a list of integers'}), 400
     
+    add_memberships(user.id, group_ids)
     db.session.commit()
     return jsonify(user.to_dict()), 200
 
@@ -205,29 +387,52 @@ def add_user_to_groups(user_id):
 def remove_user_from_group(user_id, group_id):
     """Remove user from group - Admin only"""
     user = User.query.get_or_404(user_id)
-    group = Group.query.get_or_404(group_id)
+    Group.query.get_or_404(group_id)
     
-    if group in user.groups:
-        user.groups.remove(group)
+    if remove_users_from_group(group_id, [user.id]):
         db.session.commit()
     
     return jsonify(user.to_dict()), 200
 
 
+def _parse_id_list(value):
+    """Return a JSON id list when every item is an integer (not a bool, float or string), else None"""
+    if not isinstance(value, list):
+        return None
+    if not all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        return None
+    return value
+
+
 # ============= GROUP ENDPOINTS =============
 
 @api_bp.route('/groups', methods=['GET'])
+@query_budget(4, fragment_misses=3)
+@use_replica
+@conditional(groups_collection_state, Group)
 def get_groups():
-    """Get all groups"""
-    groups = Group.query.all()
-    return jsonify([group.to_dict() for group in groups]), 200
+    """Get all groups (accepts ?fields= and ?include=users)"""
+    try:
+        fields, include = parse_fieldset(request.args, Group)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = db.session.query(*stamp_columns(Group, fields, include)).order_by(Group.id).all()
+    return fragment_response(fragments(Group, rows, fields, include)), 200
 
 
 @api_bp.route('/groups/<int:group_id>', methods=['GET'])
+@query_budget(4, fragment_misses=3)
+@conditional(group_state, Group)
 def get_group(group_id):
-    """Get specific group by ID"""
-    group = Group.query.get_or_404(group_id)
-    return jsonify(group.to_dict()), 200
+    """Get specific group by ID (accepts ?fields= and ?include=users)"""
+    try:
+        fields, include = parse_fieldset(request.args, Group)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = db.session.query(*stamp_columns(Group, fields, include)).filter(Group.id == group_id).all()
+    return entity_response(fragments(Group, rows, fields, include)), 200
 
 
 @api_bp.route('/groups', methods=['POST'])
@@ -295,9 +500,204 @@ def delete_group(group_id):
 
 
 @api_bp.route('/groups/<int:group_id>/users', methods=['GET'])
+@query_budget(6, fragment_misses=2)
+@use_replica
+@conditional(group_users_state, User, default_include=('groups',))
 def get_group_users(group_id):
-    """Get all users in a group"""
-    group = Group.query.get_or_404(group_id)
-    return jsonify([user.to_dict() for user in group.users]), 200
+    """Get all users in a group (accepts ?fields= and ?include=groups)"""
+    try:
+        fields, include = parse_fieldset(request.args, User, default_include=('groups',))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    Group.query.get_or_404(group_id)
+    rows = db.session.query(*stamp_columns(User, fields, include)) \
+        .join(user_groups, user_groups.c.user_id == User.id) \
+        .filter(user_groups.c.group_id == group_id) \
+        .order_by(User.id).all()
+    return fragment_response(fragments(User, rows, fields, include)), 200
+
+
+@api_bp.route('/groups/<int:group_id>/users', methods=['POST'])
+@api_admin_required
+def add_group_users(group_id):
+    """Add many users to a group at once ({"user_ids": [...]}) - Admin only"""
+    Group.query.get_or_404(group_id)
+    data = request.get_json(silent=True)
+    user_ids = _parse_id_list(data.get('user_ids')) if isinstance(data, dict) else None
+    if user_ids is None:
+        return jsonify({'error': 'user_ids must be a list of integers'}), 400
+    
+    added = add_users_to_group(group_id, user_ids)
+    db.session.commit()
+    return jsonify({'added': added}), 200
+
+
+@api_bp.route('/groups/<int:group_id>/users', methods=['DELETE'])
+@api_admin_required
+def remove_group_users(group_id):
+    """Remove many users from a group at once ({"user_ids": [...]}) - Admin only"""
+    Group.query.get_or_404(group_id)
+    data = request.get_json(silent=True)
+    user_ids = _parse_id_list(data.get('user_ids')) if isinstance(data, dict) else None
+    if user_ids is None:
+        return jsonify({'error': 'user_ids must be a list of integers'}), 400
+    
+    removed = remove_users_from_group(group_id, user_ids)
+    db.session.commit()
+    return jsonify({'removed': removed}), 200
+
+
+@api_bp.route('/groups/<int:group_id>/candidates', methods=['GET'])
+@query_budget(2, token_miss=1)
+@api_admin_required
+def get_group_candidates(group_id):
+    """
+    Autocomplete users who are not in the group - Admin only
+
+    Returns the first ?limit= (default 10, max 50) users whose username or
+    email starts with ?q=, ordered by username.
+    """
+    Group.query.get_or_404(group_id)
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify([]), 200
+    
+    try:
+        limit = parse_limit(request.args.get('limit'), default=10, maximum=50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    is_member = db.select(user_groups.c.user_id).where(
+        user_groups.c.user_id == User.id, user_groups.c.group_id == group_id
+    ).exists()
+    users = User.query.options(*user_load_options(('username', 'email'), ())) \
+        .filter(db.or_(prefix_match(User.username, q), prefix_match(User.email, q))) \
+        .filter(~is_member) \
+        .order_by(User.username).limit(limit).all()
+    return jsonify([user.to_dict(('id', 'username', 'email'), ()) for user in users]), 200
+
+
+# ============= CHANGES ENDPOINT =============
+
+@api_bp.route('/changes', methods=['GET'])
+@query_budget(6, token_miss=1)
+@api_admin_required
+def get_changes():
+    """
+    Users, groups and memberships changed since a change token - Admin only
+
+    Without ?since= only the current token is returned: clients read it
+    before loading the full lists, then ask for ?since=<token> and apply
+    the delta (see changes.changes_since). At most ?limit= log entries
+    (default 500, max 5000) are folded per call; has_more tells the client
+    to ask again with the returned token. Tokens older than the retained
+    log get 410 and the client must reload the full lists. The token-only
+    response also says whether GET /api/events can stream on this server.
+    """
+    since = request.args.get('since', '')
+    if since == '':
+        events = current_app.config['EVENTS_ENABLED'] and threaded_server(request.environ)
+        return jsonify({'token': current_token(), 'has_more': False, 'users': [], 'groups': [],
+                        'memberships': [], 'deleted': {'users': [], 'groups': []},
+                        'events': events}), 200
+    
+    try:
+        since = int(since)
+        if since < 0:
+            raise ValueError('Invalid change token')
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_CHANGES_LIMIT, maximum=MAX_CHANGES_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'Invalid change token or limit'}), 400
+    
+    try:
+        return jsonify(changes_since(since, limit)), 200
+    except ChangeTokenExpired:
+        return jsonify({'error': 'Change token expired, reload the full lists'}), 410
+
+
+@api_bp.route('/events', methods=['GET'])
+@api_admin_required
+def stream_events():
+    """
+    Server-Sent Events stream of user, group and membership changes - Admin only
+
+    Each 'changes' event carries the same delta as GET /api/changes and
+    its token as the event id. ?since=<token> (or Last-Event-ID when the
+    browser reconnects) replays what changed after it first; without it
+    the stream starts with a 'ready' event holding the current token. A
+    'reset' event means the token is too old: reload the full lists.
+    """
+    if not current_app.config['EVENTS_ENABLED']:
+        return jsonify({'error': 'Event stream is disabled'}), 404
+    if not threaded_server(request.environ):
+        return jsonify({'error': 'Event stream requires a threaded or async worker (e.g. gunicorn gthread)'}), 503
+    
+    since = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+    try:
+        since = int(since) if since != '' else None
+        if since is not None and since < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'Invalid change token'}), 400
+    
+    subscriber = event_hub.subscribe()
+    if subscriber is None:
+        return jsonify({'error': 'Too many event streams, try again later'}), 503
+    response = Response(stream_with_context(iter_events(subscriber, since)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also covers clients that disconnect before the body starts
+    response.call_on_close(lambda: event_hub.unsubscribe(subscriber))
+    return response
+
+
+# ============= TOKEN ENDPOINTS =============
+
+@api_bp.route('/tokens', methods=['GET'])
+@api_admin_required
+def get_tokens():
+    """List API tokens (metadata only) - Admin only; ?user_id= filters by owner"""
+    query = ApiToken.query.order_by(ApiToken.id)
+    user_id = request.args.get('user_id', type=int)
+    if user_id is not None:
+        query = query.filter(ApiToken.user_id == user_id)
+    return jsonify([token.to_dict() for token in query.all()]), 200
 
 
+@api_bp.route('/tokens', methods=['POST'])
+@api_admin_required
+def create_token():
+    """
+    Issue an API token - Admin only
+
+    Body: {"name": ..., "expires_in_days": 30, "user_id": 5}. The token is
+    issued to the caller unless user_id is given; expires_in_days=0 means
+    no expiry. The plaintext token is returned once and cannot be retrieved
+    again.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('name'):
+        return jsonify({'error': 'Token name is required'}), 400
+    
+    expires_in_days = data.get('expires_in_days')
+    if expires_in_days is not None and (not isinstance(expires_in_days, int) or isinstance(expires_in_days, bool)
+                                        or expires_in_days < 0):
+        return jsonify({'error': 'expires_in_days must be a non-negative integer'}), 400
+    
+    user = User.query.get_or_404(data.get('user_id', g.api_user_id))
+    api_token, token = issue_token(user.id, data['name'][:80], expires_in_days)
+    db.session.commit()
+    
+    result = api_token.to_dict()
+    result['token'] = token
+    return jsonify(result), 201
+
+
+@api_bp.route('/tokens/<int:token_id>', methods=['DELETE'])
+@api_admin_required
+def revoke_token_endpoint(token_id):
+    """Revoke an API token - Admin only"""
+    api_token = ApiToken.query.get_or_404(token_id)
+    revoke_token(api_token)
+    db.session.commit()
+    return jsonify(api_token.to_dict()), 200
@@ -1,7 +1,15 @@
 from functools import wraps
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models import User, Group
+from app.passwords import password_hasher, HashingBusy
+from app.throttling import login_throttle
+from app.stats import get_dashboard_stats
+from app.database import use_replica
+from app.instrumentation import query_budget
+from app.metrics import metrics
+from app.memberships import add_users_to_group, remove_users_from_group
 
 web_bp = Blueprint('web', __name__)
 
@@ -45,20 +53,50 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
+        # Rate limits run before the user lookup and the password hash
+        throttled = login_throttle.check(request.remote_addr, username)
+        if throttled:
+            scope, retry_after = throttled
+            metrics.inc('userkit_login_throttled_total', scope=scope)
+            metrics.inc('userkit_logins_total', result='throttled')
+            flash('Muitas tentativas de login. Aguarde alguns instantes e tente novamente.', 'warning')
+            return render_template('login.html'), 429, {'Retry-After': str(retry_after)}
+        
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
+        # Verify on the bounded hashing pool; shed load when it is saturated
+        password_ok = False
+        if user and password:
+            try:
+                password_ok, new_hash = password_hasher.check(user.password_hash, password)
+            except HashingBusy:
+                metrics.inc('userkit_logins_total', result='busy')
+                retry_after = current_app.config['PASSWORD_CHECK_RETRY_AFTER']
+                flash('Servidor ocupado. Tente novamente em alguns segundos.', 'warning')
+                return render_template('login.html'), 503, {'Retry-After': str(retry_after)}
+            
+            # Upgrade hashes made with outdated parameters transparently
+            if password_ok and new_hash:
+                user.password_hash = new_hash
+                db.session.commit()
+        
+        if password_ok:
             if not user.is_active:
+                metrics.inc('userkit_logins_total', result='inactive')
                 flash('Usuário inativo. Contate o administrador.', 'danger')
                 return redirect(url_for('web.login'))
             
             session['user_id'] = user.id
             session['username'] = user.username
             session['is_admin'] = user.is_admin
+            login_throttle.succeeded(request.remote_addr, username)
+            metrics.inc('userkit_logins_total', result='success')
             
             flash(f'Bem-vindo, {user.username}!', 'success')
             return redirect(url_for('web.index'))
         else:
+            login_throttle.failed(request.remote_addr, username)
+            metrics.inc('userkit_logins_total', result='failure')
             flash('Usuário ou senha incorretos.', 'danger')
             return redirect(url_for('web.login'))
     
@@ -74,32 +112,33 @@ def logout():
 
 
 @web_bp.route('/')
+@query_budget(1)
 @login_required
+@use_replica
 def index():
     """Home page"""
-    user_count = User.query.count()
-    group_count = Group.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    admin_count = User.query.filter_by(is_admin=True).count()
+    stats = get_dashboard_stats()
     
     return render_template('index.html', 
-                         user_count=user_count,
-                         group_count=group_count,
-                         active_users=active_users,
-                         admin_count=admin_count)
+                         user_count=stats['user_count'],
+                         group_count=stats['group_count'],
+                         active_users=stats['active_users'],
+                         admin_count=stats['admin_count'])
 
 
 # ============= USER ROUTES =============
 
 @web_bp.route('/usuarios')
 @admin_required
+@use_replica
 def users_list():
     """List all users - Admin only"""
-    users = User.query.order_by(User.id).all()
+    users = User.query.options(selectinload(User.groups)).order_by(User.id).all()
     return render_template('users_list.html', users=users)
 
 
 @web_bp.route('/usuarios/<int:user_id>')
+@query_budget(2)
 @admin_required
 def user_detail(user_id):
     """View user details - Admin only"""
@@ -264,20 +303,23 @@ def user_toggle_admin(user_id):
 # ============= GROUP ROUTES =============
 
 @web_bp.route('/grupos')
+@query_budget(2)
 @login_required
+@use_replica
 def groups_list():
     """List all groups"""
     groups = Group.query.order_by(Group.name).all()
-    return render_template('groups_list.html', groups=groups)
+    member_counts = Group.member_counts()
+    return render_template('groups_list.html', groups=groups, member_counts=member_counts)
 
 
 @web_bp.route('/grupos/<int:group_id>')
+@query_budget(2)
 @login_required
 def group_detail(group_id):
     """View group details"""
     group = Group.query.get_or_404(group_id)
-    all_users = User.query.order_by(User.username).all() if session.get('is_admin') else []
-    return render_template('group_detail.html', group=group, all_users=all_users)
+    return render_template('group_detail.html', group=group)
 
 
 @web_bp.route('/grupos/novo', methods=['GET', 'POST'])
@@ -360,8 +402,7 @@ def group_add_user(group_id, user_id):
     group = Group.query.get_or_404(group_id)
     user = User.query.get_or_404(user_id)
     
-    if user not in group.users:
-        group.users.append(user)
+    if add_users_to_group(group.id, [user.id]):
         db.session.commit()
         flash(f'Usuário {user.username} adicionado ao grupo {group.name}!', 'success')
     else:
@@ -377,8 +418,7 @@ def group_remove_user(group_id, user_id):
     group = Group.query.get_or_404(group_id)
     user = User.query.get_or_404(user_id)
     
-    if user in group.users:
-        group.users.remove(user)
+    if remove_users_from_group(group.id, [user.id]):
         db.session.commit()
         flash(f'Usuário {user.username} removido do grupo {group.name}!', 'success')
     else:
@@ -0,0 +1,246 @@
+import logging
+import re
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import User
+from app.pagination import prefix_match
+
+
+logger = logging.getLogger(__name__)
+
+# Shortest term the n-gram indexes can match (trigram / MySQL ngram_token_size=2)
+MIN_TERM_LENGTH = {'fts5': 3, 'mysql': 2}
+
+# External-content FTS5 table over users(username, email). Triggers keep it
+# in sync with every write to users, including bulk INSERTs that bypass the ORM.
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        username, email, content='users', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END""",
+]
+
+SQLITE_FTS_TRIGGERS = ('users_fts_ai', 'users_fts_ad', 'users_fts_au')
+
+MYSQL_FULLTEXT_INDEX = 'ft_users_username_email'
+
+# Typo-tolerant fallback for terms without any substring match: at most
+# FUZZY_CANDIDATES rows sharing n-grams with the term are read from the
+# index and kept when FUZZY_MIN_SIMILARITY of the term's trigrams occur in
+# their username or email
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SIMILARITY = 0.5
+# Each part of 'maria.souza' or 'joao_silva' is also compared on its own
+WORD_SEPARATORS = re.compile(r'[._+-]')
+
+
+def _sqlite_index_exists():
+    return db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+    )).first() is not None
+
+
+def _mysql_index_exists():
+    return db.session.execute(text(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = 'users' AND index_name = :name"
+    ), {'name': MYSQL_FULLTEXT_INDEX}).first() is not None
+
+
+def _init_sqlite():
+    exists = _sqlite_index_exists()
+    for statement in SQLITE_FTS_DDL:
+        db.session.execute(text(statement))
+    if not exists:
+        # Index the rows that were written before the table existed
+        db.session.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    return 'fts5'
+
+
+def _init_mysql():
+    if not _mysql_index_exists():
+        # InnoDB maintains FULLTEXT indexes on every write by itself
+        db.session.execute(text(
+            f'ALTER TABLE users ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} '
+            '(username, email) WITH PARSER ngram'
+        ))
+    db.session.commit()
+    return 'mysql'
+
+
+def init_search_index(app):
+    """
+    Create the user search index for the configured database if missing.
+
+    Records the backend in app.extensions['user_search'] ('fts5', 'mysql'
+    or None when unavailable, in which case search falls back to prefix
+    matching).
+    """
+    dialect = db.engine.dialect.name
+    backend = None
+    try:
+        if dialect == 'sqlite':
+            backend = _init_sqlite()
+        elif dialect in ('mysql', 'mariadb'):
+            backend = _init_mysql()
+    except OperationalError as e:
+        db.session.rollback()
+        logger.warning('User search index unavailable, using prefix search: %s', e)
+    app.extensions['user_search'] = backend
+    return backend
+
+
+def search_backend():
+    """
+    Search backend of the current app, detected on first use.
+
+    The index is created by the database bootstrap, so a freshly started
+    worker only checks whether it exists (one catalog query per process).
+    """
+    extensions = current_app.extensions
+    if 'user_search' not in extensions:
+        dialect = db.engine.dialect.name
+        backend = None
+        try:
+            if dialect == 'sqlite' and _sqlite_index_exists():
+                backend = 'fts5'
+            elif dialect in ('mysql', 'mariadb') and _mysql_index_exists():
+                backend = 'mysql'
+        except OperationalError:
+            db.session.rollback()
+        extensions['user_search'] = backend
+    return extensions['user_search']
+
+
+@contextmanager
+def search_index_suspended():
+    """
+    Stop maintaining the user search index during a bulk load.
+
+    Per-row index upkeep dominates large INSERTs into users; dropping it
+    first and rebuilding it once at the end is several times faster.
+    Searches during the load miss the new rows. No-op without an index.
+    """
+    backend = search_backend()
+    if backend == 'fts5':
+        for trigger in SQLITE_FTS_TRIGGERS:
+            db.session.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+    elif backend == 'mysql':
+        db.session.execute(text(f'ALTER TABLE users DROP INDEX {MYSQL_FULLTEXT_INDEX}'))
+    db.session.commit()
+    try:
+        yield
+    finally:
+        if backend == 'fts5':
+            for statement in SQLITE_FTS_DDL:
+                db.session.execute(text(statement))
+            db.session.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+            db.session.commit()
+        elif backend == 'mysql':
+            _init_mysql()
+
+
+def _quote(term):
+    """Quote a term as a single phrase for MATCH, neutralizing query syntax"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _ranked_ids(backend, term, limit, offset):
+    """Return matching user ids, best match first"""
+    if backend == 'fts5':
+        rows = db.session.execute(text(
+            'SELECT rowid FROM users_fts WHERE users_fts MATCH :q '
+            'ORDER BY bm25(users_fts) LIMIT :limit OFFSET :offset'
+        ), {'q': _quote(term), 'limit': limit, 'offset': offset})
+    else:
+        rows = db.session.execute(text(
+            'SELECT id FROM users WHERE MATCH(username, email) AGAINST (:q IN BOOLEAN MODE) '
+            'ORDER BY MATCH(username, email) AGAINST (:q IN BOOLEAN MODE) DESC, id '
+            'LIMIT :limit OFFSET :offset'
+        ), {'q': '"' + term.replace('"', '') + '"', 'limit': limit, 'offset': offset})
+    return [row[0] for row in rows]
+
+
+def _trigrams(value):
+    """Lowercased trigrams of value, padded so that its start and end count too"""
+    padded = f'  {value.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(term, value):
+    """Share of the term's trigrams found in value (1.0 when value contains the term)"""
+    wanted = _trigrams(term)
+    return len(wanted & _trigrams(value)) / len(wanted)
+
+
+def _fuzzy_ids(backend, term):
+    """
+    Ids of users similar to a term with no substring match, best first.
+
+    The index returns the FUZZY_CANDIDATES rows sharing the most n-grams
+    with the term (any of its trigrams on SQLite, natural-language ngram
+    ranking on MySQL); they are scored in Python by similarity() against
+    the username, the email's local part and each of their words.
+    """
+    if backend == 'fts5':
+        lowered = term.lower()
+        grams = sorted({lowered[i:i + 3] for i in range(len(lowered) - 2)})
+        rows = db.session.execute(text(
+            'SELECT rowid, username, email FROM users_fts WHERE users_fts MATCH :q '
+            'ORDER BY bm25(users_fts) LIMIT :limit'
+        ), {'q': ' OR '.join(_quote(gram) for gram in grams), 'limit': FUZZY_CANDIDATES})
+    else:
+        rows = db.session.execute(text(
+            'SELECT id, username, email FROM users WHERE MATCH(username, email) AGAINST (:q) '
+            'ORDER BY MATCH(username, email) AGAINST (:q) DESC, id LIMIT :limit'
+        ), {'q': term, 'limit': FUZZY_CANDIDATES})
+    scored = []
+    for user_id, username, email in rows:
+        local = email.split('@')[0]
+        words = {username, local, *WORD_SEPARATORS.split(username), *WORD_SEPARATORS.split(local)}
+        score = max(similarity(term, word) for word in words if word)
+        if score >= FUZZY_MIN_SIMILARITY:
+            scored.append((-score, username, user_id))
+    return [user_id for _, _, user_id in sorted(scored)]
+
+
+def search_users(term, limit, offset=0, options=()):
+    """
+    Substring search over username and email, ranked by relevance.
+
+    Uses the n-gram index when available; terms shorter than an n-gram (or
+    databases without an index) fall back to an indexed prefix match. A
+    term that matches nothing gets the closest spellings instead (see
+    _fuzzy_ids). Returns at most `limit` users.
+    """
+    backend = search_backend()
+    if backend and len(term) >= MIN_TERM_LENGTH[backend]:
+        ids = _ranked_ids(backend, term, limit, offset)
+        if not ids and len(term) >= MIN_TERM_LENGTH['fts5']:
+            # Past the last page of real matches there is nothing to fill in
+            if offset and _ranked_ids(backend, term, 1, 0):
+                return []
+            ids = _fuzzy_ids(backend, term)[offset:offset + limit]
+        if not ids:
+            return []
+        users = {user.id: user for user in User.query.options(*options).filter(User.id.in_(ids))}
+        return [users[user_id] for user_id in ids if user_id in users]
+
+    return User.query.options(*options) \
+        .filter(db.or_(prefix_match(User.username, term), prefix_match(User.email, term))) \
+        .order_by(User.username).limit(limit).offset(offset).all()
@@ -0,0 +1,76 @@
+// ===== Group Detail Page JavaScript =====
+
+const CANDIDATES_LIMIT = 10;
+let candidatesRequest = null;
+
+$(document).ready(function() {
+    $('#userSearch').on('input', debounce(searchCandidates, 250));
+
+    $('#userSuggestions').on('click', '.list-group-item', function(e) {
+        e.preventDefault();
+        selectCandidate($(this).data('id'), $(this).data('label'));
+    });
+
+    $('#addUserForm').on('submit', function() {
+        const userId = $('#user_select').val();
+        if (!userId) return false;
+        this.action = this.action.replace(/\/0$/, '/' + userId);
+        return true;
+    });
+
+    // Hide suggestions when clicking elsewhere
+    $(document).on('click', function(e) {
+        if (!$(e.target).closest('#userSearch, #userSuggestions').length) {
+            $('#userSuggestions').empty();
+        }
+    });
+});
+
+// ===== Search Candidates (non-members matching the typed prefix) =====
+function searchCandidates() {
+    const term = $('#userSearch').val().trim();
+    const url = $('#addUserForm').data('candidates-url');
+
+    $('#user_select').val('');
+    $('#addUserBtn').prop('disabled', true);
+
+    if (candidatesRequest) candidatesRequest.abort();
+    if (!term) {
+        $('#userSuggestions').empty();
+        return;
+    }
+
+    candidatesRequest = apiGet(url + '?' + $.param({ q: term, limit: CANDIDATES_LIMIT }))
+        .done(renderCandidates)
+        .fail(function(xhr, status) {
+            if (status === 'abort') return;
+            showError('Erro ao buscar usuários: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
+        });
+}
+
+function renderCandidates(users) {
+    const list = $('#userSuggestions');
+    list.empty();
+
+    if (users.length === 0) {
+        list.append($('<div class="list-group-item text-muted"></div>').text('Nenhum usuário encontrado'));
+        return;
+    }
+
+    users.forEach(function(user) {
+        const label = `${user.username} (${user.email})`;
+        list.append(
+            $('<a href="#" class="list-group-item list-group-item-action"></a>')
+                .text(label)
+                .data('id', user.id)
+                .data('label', label)
+        );
+    });
+}
+
+function selectCandidate(userId, label) {
+    $('#user_select').val(userId);
+    $('#userSearch').val(label);
+    $('#userSuggestions').empty();
+    $('#addUserBtn').prop('disabled', false);
+}
@@ -1,9 +1,13 @@
 // ===== Groups Page JavaScript =====
 
 let allGroups = [];
+const CANDIDATES_LIMIT = 10;
+let candidatesRequest = null;
+let changeFeed = null;
 
 $(document).ready(function() {
-    loadGroups();
+    changeFeed = createChangeFeed(applyGroupChanges, reloadGroups);
+    reloadGroups();
     
     // Search functionality
     $('#searchGroup').on('input', debounce(filterGroups, 300));
@@ -17,6 +21,18 @@ $(document).ready(function() {
     // Delete group
     $('#confirmDeleteGroupBtn').click(deleteGroup);
     
+    // Add user to the open group: autocomplete over non-members
+    $('#addUserSearch').on('input', debounce(searchCandidates, 250));
+    $('#addUserSuggestions').on('click', '.list-group-item', function(e) {
+        e.preventDefault();
+        selectCandidate($(this).data('id'), $(this).data('label'));
+    });
+    $(document).on('click', function(e) {
+        if (!$(e.target).closest('#addUserSearch, #addUserSuggestions').length) {
+            $('#addUserSuggestions').empty();
+        }
+    });
+    
     // Clear forms when modals close
     $('#addGroupModal').on('hidden.bs.modal', function() {
         $('#addGroupForm')[0].reset();
@@ -44,6 +60,30 @@ function loadGroups() {
         });
 }
 
+// Take a change token first so changes made during the load are applied after it
+function reloadGroups() {
+    changeFeed.start().always(loadGroups);
+}
+
+// ===== Apply Changes =====
+function applyGroupChanges(delta) {
+    if (delta.groups.length || delta.deleted.groups.length) {
+        allGroups = mergeById(allGroups, delta.groups, delta.deleted.groups);
+        filterGroups();
+    }
+    
+    // Refresh the open member list when its group's members changed
+    const modal = $('#viewGroupUsersModal');
+    const groupId = parseInt($('#viewGroupId').val());
+    if (!modal.hasClass('show') || !groupId) return;
+    if (delta.deleted.groups.includes(groupId)) {
+        closeModal('viewGroupUsersModal');
+    } else if (delta.memberships.some(m => m.group_id === groupId)
+               || delta.users.some(u => u.groups.some(g => g.id === groupId))) {
+        loadGroupUsers(groupId);
+    }
+}
+
 // ===== Render Groups =====
 function renderGroups(groups) {
     const tbody = $('#groupsTableBody');
@@ -118,7 +158,7 @@ function saveGroup() {
         .done(function() {
             showSuccess('Grupo criado com sucesso!');
             closeModal('addGroupModal');
-            loadGroups();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao criar grupo: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -157,7 +197,7 @@ function updateGroup() {
         .done(function() {
             showSuccess('Grupo atualizado com sucesso!');
             closeModal('editGroupModal');
-            loadGroups();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao atualizar grupo: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -178,7 +218,7 @@ function deleteGroup() {
         .done(function() {
             showSuccess('Grupo deletado com sucesso!');
             closeModal('deleteGroupModal');
-            loadGroups();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao deletar grupo: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -206,30 +246,69 @@ function viewGroupUsers(groupId) {
     
     openModal('viewGroupUsersModal');
     
-    // Load available users for dropdown
-    loadAvailableUsersForGroup(groupId);
+    clearCandidates();
     
     // Load current users
     loadGroupUsers(groupId);
 }
 
-// ===== Load Available Users for Group =====
-function loadAvailableUsersForGroup(groupId) {
-    apiGet('/api/users')
-        .done(function(users) {
-            const select = $('#addUserToGroup');
-            select.empty();
-            select.append('<option value="">Selecione um usuário...</option>');
-            
-            users.forEach(function(user) {
-                select.append(`<option value="${user.id}">${user.username} (${user.email})</option>`);
-            });
-        })
-        .fail(function() {
-            showError('Erro ao carregar lista de usuários');
+// ===== Search Candidates (non-members matching the typed prefix) =====
+function searchCandidates() {
+    const groupId = $('#viewGroupId').val();
+    const term = $('#addUserSearch').val().trim();
+    
+    $('#addUserToGroup').val('');
+    $('#addUserToGroupBtn').prop('disabled', true);
+    
+    if (candidatesRequest) candidatesRequest.abort();
+    if (!term) {
+        $('#addUserSuggestions').empty();
+        return;
+    }
+    
+    candidatesRequest = apiGet(`/api/groups/${groupId}/candidates?` + $.param({ q: term, limit: CANDIDATES_LIMIT }))
+        .done(renderCandidates)
+        .fail(function(xhr, status) {
+            if (status === 'abort') return;
+            showError('Erro ao buscar usuários: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
         });
 }
 
+function renderCandidates(users) {
+    const list = $('#addUserSuggestions');
+    list.empty();
+    
+    if (users.length === 0) {
+        list.append($('<div class="list-group-item text-muted"></div>').text('Nenhum usuário encontrado'));
+        return;
+    }
+    
+    users.forEach(function(user) {
+        const label = `${user.username} (${user.email})`;
+        list.append(
+            $('<a href="#" class="list-group-item list-group-item-action"></a>')
+                .text(label)
+                .data('id', user.id)
+                .data('label', label)
+        );
+    });
+}
+
+function selectCandidate(userId, label) {
+    $('#addUserToGroup').val(userId);
+    $('#addUserSearch').val(label);
+    $('#addUserSuggestions').empty();
+    $('#addUserToGroupBtn').prop('disabled', false);
+}
+
+function clearCandidates() {
+    if (candidatesRequest) candidatesRequest.abort();
+    $('#addUserToGroup').val('');
+    $('#addUserSearch').val('');
+    $('#addUserSuggestions').empty();
+    $('#addUserToGroupBtn').prop('disabled', true);
+}
+
 // ===== Load Group Users =====
 function loadGroupUsers(groupId) {
     apiGet(`/api/groups/${groupId}/users`)
@@ -311,12 +390,9 @@ function addUserToCurrentGroup() {
     apiPost(`/api/users/${userId}/groups`, { group_ids: [parseInt(groupId)] })
         .done(function() {
             showSuccess('Usuário adicionado ao grupo com sucesso!');
-            // Reload group users
-            loadGroupUsers(groupId);
-            // Reset dropdown
-            $('#addUserToGroup').val('');
-            // Reload groups to update count
-            loadGroups();
+            clearCandidates();
+            // Member list and count are refreshed from the change feed
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao adicionar usuário: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -332,10 +408,8 @@ function removeUserFromGroup(userId, groupId) {
     apiDelete(`/api/users/${userId}/groups/${groupId}`)
         .done(function() {
             showSuccess('Usuário removido do grupo com sucesso!');
-            // Reload group users
-            loadGroupUsers(groupId);
-            // Reload groups to update count
-            loadGroups();
+            // Member list and count are refreshed from the change feed
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao remover usuário: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
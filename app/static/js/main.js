@@ -177,3 +177,99 @@ function debounce(func, wait) {
 }
 
 
+
+// ===== Change Feed (GET /api/events, GET /api/changes) =====
+// Keeps in-memory lists current with only what changed since the last
+// change token: deltas are pushed over Server-Sent Events, and fetched
+// from /api/changes after writes and on a timer only while no stream is
+// open. start() must run before the full lists are loaded, so nothing
+// written in between is missed (applying a change twice is harmless).
+// onExpired runs when the token is too old: the page must call start()
+// again and reload its lists.
+const CHANGES_POLL_INTERVAL = 30000;
+
+function createChangeFeed(onChanges, onExpired) {
+    const feed = { token: null, request: null, again: false, source: null, events: false };
+    
+    function apply(data) {
+        // Deltas already covered by a newer token were applied before
+        if (feed.token !== null && data.token <= feed.token) return;
+        feed.token = data.token;
+        onChanges(data);
+    }
+    
+    function expire() {
+        if (feed.source) feed.source.close();
+        feed.source = null;
+        feed.token = null;
+        onExpired();
+    }
+    
+    feed.start = function() {
+        return apiGet('/api/changes').done(function(data) {
+            feed.token = data.token;
+            // The server says whether /api/events is enabled on a worker that can hold streams
+            feed.events = data.events === true;
+            feed.listen();
+        });
+    };
+    
+    feed.listen = function() {
+        if (!window.EventSource || !feed.events || feed.source || feed.token === null) return;
+        
+        // The browser reconnects by itself, resuming from the last event id
+        const source = new EventSource('/api/events?' + $.param({ since: feed.token }));
+        source.addEventListener('changes', function(event) {
+            apply(JSON.parse(event.data));
+        });
+        source.addEventListener('reset', expire);
+        source.onerror = function() {
+            // Refused streams (503, 401) are not retried; fall back to polling
+            if (source.readyState === EventSource.CLOSED) feed.source = null;
+        };
+        feed.source = source;
+    };
+    
+    feed.streaming = function() {
+        return feed.source !== null && feed.source.readyState === EventSource.OPEN;
+    };
+    
+    feed.sync = function() {
+        if (feed.token === null || feed.streaming()) return;
+        if (feed.request) {
+            feed.again = true;
+            return;
+        }
+        
+        feed.request = apiGet('/api/changes?' + $.param({ since: feed.token }))
+            .done(function(data) {
+                apply(data);
+                if (data.has_more) feed.again = true;
+            })
+            .fail(function(xhr) {
+                if (xhr.status === 410) expire();
+            })
+            .always(function() {
+                feed.request = null;
+                if (feed.again) {
+                    feed.again = false;
+                    feed.sync();
+                }
+            });
+    };
+    
+    // Without an open stream, poll for changes made by other admins while the page is visible
+    setInterval(function() {
+        if (!document.hidden) feed.sync();
+    }, CHANGES_POLL_INTERVAL);
+    
+    return feed;
+}
+
+// Replace items by id, add new ones and drop removed ids, keeping id order
+function mergeById(list, items, removedIds) {
+    const byId = new Map(list.map(item => [item.id, item]));
+    items.forEach(item => byId.set(item.id, item));
+    (removedIds || []).forEach(id => byId.delete(id));
+    return Array.from(byId.values()).sort((a, b) => a.id - b.id);
+}
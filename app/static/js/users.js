@@ -2,16 +2,23 @@
 
 let allUsers = [];
 let allGroups = [];
+let nextCursor = null;
+let usersRequest = null;
+let changeFeed = null;
+const USERS_PAGE_SIZE = 50;
 
 $(document).ready(function() {
-    loadUsers();
-    loadGroupsForSelects();
+    changeFeed = createChangeFeed(applyUserChanges, reloadAll);
+    reloadAll();
     
-    // Search functionality
+    // Search functionality (filtering happens on the server)
     $('#searchUser').on('input', debounce(filterUsers, 300));
     $('#filterStatus').on('change', filterUsers);
     $('#filterAdmin').on('change', filterUsers);
     
+    // Pagination
+    $('#loadMoreUsersBtn').click(loadMoreUsers);
+    
     // Add user
     $('#saveUserBtn').click(saveUser);
     
@@ -39,15 +46,36 @@ $(document).ready(function() {
 });
 
 // ===== Load Users =====
-function loadUsers() {
+function buildUsersQuery(after) {
+    const params = { limit: USERS_PAGE_SIZE };
+    const searchTerm = $('#searchUser').val().trim();
+    const statusFilter = $('#filterStatus').val();
+    const adminFilter = $('#filterAdmin').val();
+    
+    if (searchTerm) params.q = searchTerm;
+    if (statusFilter) params.is_active = statusFilter === 'active';
+    if (adminFilter) params.is_admin = adminFilter === 'admin';
+    if (after) params.after = after;
+    
+    return '/api/users?' + $.param(params);
+}
+
+function fetchUsersPage(after) {
+    // Drop responses for filters the user has already changed
+    if (usersRequest) usersRequest.abort();
+    
     showLoading('loadingUsers');
+    usersRequest = apiGet(buildUsersQuery(after));
     
-    apiGet('/api/users')
-        .done(function(data) {
-            allUsers = data;
-            renderUsers(data);
+    return usersRequest
+        .done(function(data, status, xhr) {
+            nextCursor = xhr.getResponseHeader('X-Next-Cursor');
+            allUsers = after ? allUsers.concat(data) : data;
+            renderUsers(allUsers);
+            $('#loadMoreUsersBtn').toggle(!!nextCursor);
         })
-        .fail(function(xhr) {
+        .fail(function(xhr, status) {
+            if (status === 'abort') return;
             showError('Erro ao carregar usuários: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
         })
         .always(function() {
@@ -55,6 +83,59 @@ function loadUsers() {
         });
 }
 
+function loadUsers() {
+    nextCursor = null;
+    return fetchUsersPage(null);
+}
+
+function loadMoreUsers() {
+    if (nextCursor) fetchUsersPage(nextCursor);
+}
+
+// Take a change token first so changes made during the load are applied after it
+function reloadAll() {
+    changeFeed.start().always(function() {
+        loadUsers();
+        loadGroupsForSelects();
+    });
+}
+
+// ===== Apply Changes =====
+function matchesUserFilters(user) {
+    const searchTerm = $('#searchUser').val().trim().toLowerCase();
+    const statusFilter = $('#filterStatus').val();
+    const adminFilter = $('#filterAdmin').val();
+    
+    if (searchTerm && !user.username.toLowerCase().startsWith(searchTerm)
+        && !user.email.toLowerCase().startsWith(searchTerm)) return false;
+    if (statusFilter && user.is_active !== (statusFilter === 'active')) return false;
+    if (adminFilter && user.is_admin !== (adminFilter === 'admin')) return false;
+    return true;
+}
+
+function applyUserChanges(delta) {
+    // Groups first: user rows embed group names
+    if (delta.groups.length || delta.deleted.groups.length) {
+        allGroups = mergeById(allGroups, delta.groups, delta.deleted.groups);
+        populateGroupSelects(allGroups);
+        const names = new Map(allGroups.map(g => [g.id, g.name]));
+        allUsers.forEach(function(user) {
+            user.groups = user.groups
+                .filter(g => names.has(g.id))
+                .map(g => ({ id: g.id, name: names.get(g.id) }));
+        });
+    }
+    
+    // Changed users replace their row (or leave the list when they no longer
+    // match the filters); new ones are appended once every page is loaded
+    const loaded = new Set(allUsers.map(u => u.id));
+    const changed = delta.users.filter(u => matchesUserFilters(u) && (loaded.has(u.id) || !nextCursor));
+    const removed = delta.deleted.users.concat(
+        delta.users.filter(u => loaded.has(u.id) && !matchesUserFilters(u)).map(u => u.id));
+    allUsers = mergeById(allUsers, changed, removed);
+    renderUsers(allUsers);
+}
+
 // ===== Render Users =====
 function renderUsers(users) {
     const tbody = $('#usersTableBody');
@@ -122,30 +203,7 @@ function renderUsers(users) {
 
 // ===== Filter Users =====
 function filterUsers() {
-    const searchTerm = $('#searchUser').val().toLowerCase();
-    const statusFilter = $('#filterStatus').val();
-    const adminFilter = $('#filterAdmin').val();
-    
-    let filtered = allUsers.filter(function(user) {
-        // Search filter
-        const matchesSearch = !searchTerm || 
-            user.username.toLowerCase().includes(searchTerm) ||
-            user.email.toLowerCase().includes(searchTerm);
-        
-        // Status filter
-        const matchesStatus = !statusFilter ||
-            (statusFilter === 'active' && user.is_active) ||
-            (statusFilter === 'inactive' && !user.is_active);
-        
-        // Admin filter
-        const matchesAdmin = !adminFilter ||
-            (adminFilter === 'admin' && user.is_admin) ||
-            (adminFilter === 'regular' && !user.is_admin);
-        
-        return matchesSearch && matchesStatus && matchesAdmin;
-    });
-    
-    renderUsers(filtered);
+    loadUsers();
 }
 
 // ===== Load Groups for Selects =====
@@ -201,7 +259,7 @@ function saveUser() {
         .done(function() {
             showSuccess('Usuário criado com sucesso!');
             closeModal('addUserModal');
-            loadUsers();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao criar usuário: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -252,7 +310,7 @@ function updateUser() {
         .done(function() {
             showSuccess('Usuário atualizado com sucesso!');
             closeModal('editUserModal');
-            loadUsers();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao atualizar usuário: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -267,7 +325,7 @@ function toggleUserStatus(userId, activate) {
     apiPost(`/api/users/${userId}/${endpoint}`)
         .done(function() {
             showSuccess(`Usuário ${message} com sucesso!`);
-            loadUsers();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError(`Erro ao ${message} usuário: ` + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -282,7 +340,7 @@ function toggleAdmin(userId, makeAdmin) {
     apiPost(`/api/users/${userId}/${endpoint}`)
         .done(function() {
             showSuccess(`Usuário ${message} com sucesso!`);
-            loadUsers();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError(`Erro: ` + (xhr.responseJSON?.error || 'Erro desconhecido'));
@@ -335,7 +393,7 @@ function deleteUser() {
         .done(function() {
             showSuccess('Usuário deletado com sucesso!');
             closeModal('deleteUserModal');
-            loadUsers();
+            changeFeed.sync();
         })
         .fail(function(xhr) {
             showError('Erro ao deletar usuário: ' + (xhr.responseJSON?.error || 'Erro desconhecido'));
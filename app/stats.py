@@ -0,0 +1,77 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Group
+
+
+_lock = threading.Lock()
+_cache = {'value': None, 'expires': 0.0}
+
+
+def _query_stats():
+    """All dashboard numbers in one statement using conditional sums"""
+    group_count = db.select(db.func.count(Group.id)).scalar_subquery()
+    row = db.session.execute(db.select(
+        db.func.count(User.id),
+        db.func.coalesce(db.func.sum(db.case((User.is_active, 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((User.is_admin, 1), else_=0)), 0),
+        group_count
+    )).one()
+    return {
+        'user_count': row[0],
+        'active_users': int(row[1]),
+        'admin_count': int(row[2]),
+        'group_count': row[3],
+    }
+
+
+def get_dashboard_stats():
+    """
+    Return user/group counters, cached in-process for STATS_CACHE_TTL seconds.
+
+    Writes made through this process invalidate the cache on commit; other
+    worker processes see them once their TTL expires.
+    """
+    now = time.monotonic()
+    with _lock:
+        if _cache['value'] is not None and now < _cache['expires']:
+            return dict(_cache['value'])
+
+    stats = _query_stats()
+    with _lock:
+        _cache['value'] = stats
+        _cache['expires'] = now + current_app.config.get('STATS_CACHE_TTL', 30)
+    return dict(stats)
+
+
+def invalidate_stats():
+    with _lock:
+        _cache['value'] = None
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_stats_dirty(session, flush_context):
+    if any(isinstance(obj, (User, Group))
+           for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['stats_dirty'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_stats_dirty(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['stats_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('stats_dirty', False):
+        invalidate_stats()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stats_dirty(session):
+    session.info.pop('stats_dirty', None)
@@ -0,0 +1,255 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+# Rows of the SQLite backend older than this many windows are deleted
+# every CLEANUP_EVERY writes
+STALE_WINDOWS = 2
+CLEANUP_EVERY = 1000
+
+
+def _estimate(window_index, current, previous, now, window):
+    """
+    Sliding-window count from two fixed-window counters.
+
+    The previous window's count is weighted by how much of it still
+    overlaps the sliding window, which needs three numbers per key
+    instead of one timestamp per attempt.
+    """
+    index = int(now // window)
+    if window_index == index - 1:
+        current, previous = 0, current
+    elif window_index != index:
+        current, previous = 0, 0
+    overlap = 1 - (now % window) / window
+    return current + previous * overlap
+
+
+def _retry_after(window_index, current, previous, now, window, allowed, inclusive=False):
+    """
+    Whole seconds until the sliding-window count falls below `allowed`
+    (or down to it, with inclusive).
+
+    The estimate falls linearly as the previous window slides out, so the
+    wait follows from the counters instead of assuming a full window.
+    """
+    index = int(now // window)
+    if window_index == index - 1:
+        current, previous = 0, current
+    elif window_index != index:
+        return 1
+    window_start = index * window
+    if current < allowed:
+        # previous * (1 - elapsed / window) <= allowed - current
+        if previous <= allowed - current:
+            return 1
+        at = window_start + (1 - (allowed - current) / previous) * window
+    elif current:
+        # Only once this window's attempts are themselves sliding out
+        at = window_start + window + (1 - allowed / current) * window
+    else:
+        at = window_start + window
+    wait = at - now
+    return max(1, math.ceil(wait) if inclusive else math.floor(wait) + 1)
+
+
+class MemoryBackend:
+    """
+    Per-process counters: key -> (window index, current, previous).
+
+    Bounded to max_keys entries, least recently used first out, so a
+    flood of distinct IPs or usernames cannot grow memory without limit.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def entry(self, key):
+        """(window index, current, previous) of key, or None"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def count(self, key, window, now):
+        entry = self.entry(key)
+        return _estimate(*entry, now, window) if entry else 0
+
+    def add(self, key, window, now):
+        index = int(now // window)
+        with self._lock:
+            window_index, current, previous = self._entries.pop(key, (index, 0, 0))
+            if window_index == index - 1:
+                current, previous = 0, current
+            elif window_index != index:
+                current, previous = 0, 0
+            self._entries[key] = (index, current + 1, previous)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return _estimate(index, current + 1, previous, now, window)
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteBackend:
+    """
+    Counters in a SQLite file shared by every worker process.
+
+    Each update runs in a BEGIN IMMEDIATE transaction, so concurrent
+    workers serialize on the file lock and limits hold across gunicorn
+    workers. Connections are opened lazily per process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._writes = 0
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS login_throttle ('
+                'key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, '
+                'current INTEGER NOT NULL, previous INTEGER NOT NULL, window REAL NOT NULL)')
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def entry(self, key):
+        """(window index, current, previous) of key, or None"""
+        with self._lock:
+            return self._connect().execute(
+                'SELECT window_index, current, previous FROM login_throttle WHERE key = ?', (key,)).fetchone()
+
+    def count(self, key, window, now):
+        entry = self.entry(key)
+        return _estimate(*entry, now, window) if entry else 0
+
+    def add(self, key, window, now):
+        index = int(now // window)
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute(
+                    'SELECT window_index, current, previous FROM login_throttle WHERE key = ?', (key,)).fetchone()
+                window_index, current, previous = row or (index, 0, 0)
+                if window_index == index - 1:
+                    current, previous = 0, current
+                elif window_index != index:
+                    current, previous = 0, 0
+                connection.execute(
+                    'INSERT OR REPLACE INTO login_throttle (key, window_index, current, previous, window) '
+                    'VALUES (?, ?, ?, ?, ?)', (key, index, current + 1, previous, window))
+                self._writes += 1
+                if self._writes % CLEANUP_EVERY == 0:
+                    connection.execute('DELETE FROM login_throttle WHERE (window_index + ?) * window < ?',
+                                       (STALE_WINDOWS, now))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return _estimate(index, current + 1, previous, now, window)
+
+    def reset(self, key):
+        with self._lock:
+            self._connect().execute('DELETE FROM login_throttle WHERE key = ?', (key,))
+
+
+def _user_key(username, ip):
+    return f'user:{username.lower()}:{ip}'
+
+
+class LoginThrottle:
+    """
+    Per-IP and per-username sliding-window limits for web.login.
+
+    Every login attempt counts against its client IP
+    (LOGIN_THROTTLE_IP_LIMIT per LOGIN_THROTTLE_IP_WINDOW seconds); failed
+    attempts also count against the username from that IP
+    (LOGIN_THROTTLE_USER_LIMIT per LOGIN_THROTTLE_USER_WINDOW), and a
+    successful login clears it. Keying failures by IP too means guessing
+    a known username elsewhere cannot lock its owner out.
+    Counters live in this process (LOGIN_THROTTLE_MAX_KEYS entries) or,
+    with LOGIN_THROTTLE_STORAGE set to a file path, in a SQLite file
+    shared by all workers on the host.
+    """
+
+    def __init__(self, app=None):
+        self._backends = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOGIN_THROTTLE_ENABLED', True)
+        app.config.setdefault('LOGIN_THROTTLE_IP_LIMIT', 20)
+        app.config.setdefault('LOGIN_THROTTLE_IP_WINDOW', 60)
+        app.config.setdefault('LOGIN_THROTTLE_USER_LIMIT', 5)
+        app.config.setdefault('LOGIN_THROTTLE_USER_WINDOW', 300)
+        app.config.setdefault('LOGIN_THROTTLE_MAX_KEYS', 100000)
+        app.config.setdefault('LOGIN_THROTTLE_STORAGE', '')
+        app.extensions['login_throttle'] = self
+
+    def _backend(self):
+        config = current_app.config
+        storage = config['LOGIN_THROTTLE_STORAGE']
+        backend = self._backends.get(storage)
+        if backend is None:
+            with self._lock:
+                backend = self._backends.get(storage)
+                if backend is None:
+                    backend = (SQLiteBackend(storage) if storage
+                               else MemoryBackend(config['LOGIN_THROTTLE_MAX_KEYS']))
+                    self._backends[storage] = backend
+        return backend
+
+    def check(self, ip, username):
+        """
+        Count an attempt from `ip` and tell whether it must be rejected.
+
+        Returns None when the attempt may proceed, or (scope, retry_after)
+        with scope 'ip' or 'username'.
+        """
+        config = current_app.config
+        if not config['LOGIN_THROTTLE_ENABLED']:
+            return None
+        backend = self._backend()
+        now = time.time()
+
+        key, window, limit = f'ip:{ip}', config['LOGIN_THROTTLE_IP_WINDOW'], config['LOGIN_THROTTLE_IP_LIMIT']
+        if backend.add(key, window, now) > limit:
+            # The next attempt is counted too, so wait until one more fits
+            return 'ip', _retry_after(*backend.entry(key), now, window, limit - 1, inclusive=True)
+        if username:
+            key, window, limit = _user_key(username, ip), config['LOGIN_THROTTLE_USER_WINDOW'], \
+                config['LOGIN_THROTTLE_USER_LIMIT']
+            if backend.count(key, window, now) >= limit:
+                return 'username', _retry_after(*backend.entry(key), now, window, limit)
+        return None
+
+    def failed(self, ip, username):
+        """Record a failed password for `username` from `ip`"""
+        if current_app.config['LOGIN_THROTTLE_ENABLED'] and username:
+            self._backend().add(_user_key(username, ip), current_app.config['LOGIN_THROTTLE_USER_WINDOW'],
+                                time.time())
+
+    def succeeded(self, ip, username):
+        """Clear the failures of `username` from `ip` after a successful login"""
+        if current_app.config['LOGIN_THROTTLE_ENABLED'] and username:
+            self._backend().reset(_user_key(username, ip))
+
+
+login_throttle = LoginThrottle()
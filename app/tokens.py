@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, ApiToken
+
+
+# Issued tokens look like 'ukt_<43 url-safe chars>'; the prefix makes leaked
+# tokens easy to grep for and lets the API ignore other bearer formats
+TOKEN_PREFIX = 'ukt_'
+# Characters kept in clear (ApiToken.prefix) so users can tell tokens apart
+DISPLAY_PREFIX_LENGTH = 12
+
+
+def hash_token(token):
+    """HMAC-SHA256 of a token with API_TOKEN_HMAC_KEY (falls back to SECRET_KEY)"""
+    key = current_app.config.get('API_TOKEN_HMAC_KEY') or current_app.config['SECRET_KEY']
+    return hmac.new(key.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_token(user_id, name, expires_in_days=None):
+    """
+    Create a token for a user; returns (ApiToken, plaintext token).
+
+    The plaintext is not stored anywhere and must be shown to the caller
+    once. expires_in_days=None uses API_TOKEN_DEFAULT_EXPIRY_DAYS; 0 means
+    no expiry. The caller commits.
+    """
+    if expires_in_days is None:
+        expires_in_days = current_app.config['API_TOKEN_DEFAULT_EXPIRY_DAYS']
+    token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    api_token = ApiToken(
+        user_id=user_id,
+        name=name,
+        token_hash=hash_token(token),
+        prefix=token[:DISPLAY_PREFIX_LENGTH],
+        expires_at=datetime.utcnow() + timedelta(days=expires_in_days) if expires_in_days else None,
+    )
+    db.session.add(api_token)
+    return api_token, token
+
+
+def revoke_token(api_token):
+    """Mark a token as revoked (the caller commits)"""
+    if api_token.revoked_at is None:
+        api_token.revoked_at = datetime.utcnow()
+
+
+class TokenCache:
+    """
+    Small LRU of token hash -> principal with a per-entry TTL.
+
+    Unknown tokens are cached too (as None) so a misconfigured client
+    retrying a bad token does not hit the database on every call. Commits
+    that touch users or tokens clear this process's cache; other worker
+    processes pick changes up when their entries expire.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, principal = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, principal
+
+    def put(self, key, principal, ttl, maxsize):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def _load_principal(token_hash):
+    row = db.session.execute(
+        db.select(ApiToken.id, ApiToken.expires_at, User.id, User.username, User.is_admin, User.is_active)
+        .join(User, User.id == ApiToken.user_id)
+        .where(ApiToken.token_hash == token_hash, ApiToken.revoked_at.is_(None))
+    ).first()
+    if row is None:
+        return None
+    token_id, expires_at, user_id, username, is_admin, is_active = row
+    return {'token_id': token_id, 'expires_at': expires_at, 'user_id': user_id,
+            'username': username, 'is_admin': is_admin, 'is_active': is_active}
+
+
+def authenticate_token(token):
+    """
+    Resolve a bearer token to its principal dict, or None.
+
+    Cached lookups cost one HMAC and a dict access; misses run one indexed
+    query. Expiry is checked on every call, so cached tokens still expire
+    on time; revoked or inactive-user tokens are rejected.
+    """
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    token_hash = hash_token(token)
+    found, principal = token_cache.get(token_hash)
+    if not found:
+        principal = _load_principal(token_hash)
+        config = current_app.config
+        token_cache.put(token_hash, principal, config['API_TOKEN_CACHE_TTL'], config['API_TOKEN_CACHE_SIZE'])
+    if principal is None or not principal['is_active']:
+        return None
+    if principal['expires_at'] is not None and principal['expires_at'] <= datetime.utcnow():
+        return None
+    return principal
+
+
+def init_tokens(app):
+    app.config.setdefault('API_TOKEN_HMAC_KEY', None)
+    app.config.setdefault('API_TOKEN_DEFAULT_EXPIRY_DAYS', 90)
+    app.config.setdefault('API_TOKEN_CACHE_SIZE', 1024)
+    app.config.setdefault('API_TOKEN_CACHE_TTL', 30)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_tokens_dirty(session, flush_context):
+    # Revocations, deactivations, admin changes and deletes must not be
+    # served from the cache of the process that made them
+    if any(isinstance(obj, (User, ApiToken)) for obj in list(session.dirty) + list(session.deleted)):
+        session.info['tokens_dirty'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_tokens_dirty(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['tokens_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_cache_after_commit(session):
+    if session.info.pop('tokens_dirty', False):
+        token_cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_tokens_dirty(session):
+    session.info.pop('tokens_dirty', None)
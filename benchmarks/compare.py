@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files written by benchmarks/run.py
+
+Prints p50/p99 latency and SQL statement changes per scale and route,
+flagging regressions beyond the threshold.
+
+Usage:
+    python benchmarks/compare.py benchmarks/results/old.json benchmarks/results/new.json
+    python benchmarks/compare.py old.json new.json --threshold 10
+"""
+
+import argparse
+import json
+
+
+def change(old, new):
+    if not old:
+        return None
+    return (new - old) / old * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara dois resultados do benchmark de rotas')
+    parser.add_argument('old', help='Resultado de referência (JSON)')
+    parser.add_argument('new', help='Resultado novo (JSON)')
+    parser.add_argument('--threshold', type=float, default=20,
+                        help='Variação de p50 (%%) considerada regressão (padrão: 20)')
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"Referência: {old.get('commit')} ({old.get('date')})")
+    print(f"Novo:       {new.get('commit')} ({new.get('date')})")
+
+    regressions = 0
+    for scale in sorted(set(old['scales']) & set(new['scales']), key=int):
+        old_routes = old['scales'][scale]['routes']
+        new_routes = new['scales'][scale]['routes']
+        print("\n" + "=" * 92)
+        print(f"  {scale} usuários")
+        print("=" * 92)
+        print(f"{'Rota':<40}{'p50 antes':>11}{'p50 agora':>11}{'Δ%':>8}{'p99 Δ%':>9}{'SQL':>10}")
+        for name in sorted(set(old_routes) & set(new_routes)):
+            before, after = old_routes[name], new_routes[name]
+            p50 = change(before['p50_ms'], after['p50_ms'])
+            p99 = change(before['p99_ms'], after['p99_ms'])
+            queries = f"{before['queries']}→{after['queries']}" if before['queries'] != after['queries'] else ''
+            flag = ''
+            if (p50 is not None and p50 > args.threshold) or (
+                    before['queries'] is not None and (after['queries'] or 0) > before['queries']):
+                flag = '  ⚠'
+                regressions += 1
+            print(f"{name:<40}{before['p50_ms']:>11}{after['p50_ms']:>11}"
+                  f"{'' if p50 is None else f'{p50:+.0f}':>8}{'' if p99 is None else f'{p99:+.0f}':>9}"
+                  f"{queries:>10}{flag}")
+
+    print(f"\n{regressions} possível(is) regressão(ões) acima de {args.threshold:g}% ou com mais SQL")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Synthetic dataset for the benchmark suite.
+
+Users are inserted with bulk Core statements and share one precomputed
+password hash. Group sizes follow a power law (Zipf): a handful of groups
+hold most memberships and the long tail has a few members each, which is
+what makes per-group pages and counters behave differently at scale.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import User, Group, user_groups, bump_versions
+
+INSERT_CHUNK_SIZE = 10000
+
+# Groups per user: P(0..4), averaging 1.9 memberships per user
+GROUPS_PER_USER_WEIGHTS = (10, 35, 30, 15, 10)
+
+PASSWORD = 'benchmark'
+
+
+def _chunks(rows, size=INSERT_CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def default_group_count(user_count):
+    return max(20, user_count // 500)
+
+
+def seed_dataset(connection, user_count, group_count=None, skew=1.1, password_hash='x', seed=42):
+    """
+    Insert `user_count` users, groups and skewed memberships.
+
+    Runs on a Core connection (commit is left to the caller). Returns a
+    summary with row counts and timings.
+    """
+    rng = random.Random(seed)
+    group_count = group_count or default_group_count(user_count)
+    started = time.perf_counter()
+    base = datetime(2024, 1, 1)
+
+    first_group_id = (connection.execute(db.select(db.func.max(Group.id))).scalar() or 0) + 1
+    connection.execute(db.insert(Group), [
+        {'name': f'bench-group-{rank:05d}', 'description': f'Grupo sintético {rank}',
+         'created_at': base, 'updated_at': base}
+        for rank in range(1, group_count + 1)
+    ])
+    group_ids = list(range(first_group_id, first_group_id + group_count))
+
+    first_user_id = (connection.execute(db.select(db.func.max(User.id))).scalar() or 0) + 1
+    for chunk in _chunks(
+        {'username': f'user{i:07d}', 'email': f'user{i:07d}@example.com', 'password_hash': password_hash,
+         'is_admin': i % 1000 == 0, 'is_active': i % 10 != 9,
+         'created_at': base + timedelta(seconds=i), 'updated_at': base + timedelta(seconds=i)}
+        for i in range(user_count)
+    ):
+        connection.execute(db.insert(User), chunk)
+    users_done = time.perf_counter()
+
+    # Rank 1 is the biggest group: weight 1 / rank^skew
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, group_count + 1):
+        total += 1 / rank ** skew
+        cum_weights.append(total)
+    counts = range(len(GROUPS_PER_USER_WEIGHTS))
+
+    def memberships():
+        for user_id in range(first_user_id, first_user_id + user_count):
+            wanted = rng.choices(counts, weights=GROUPS_PER_USER_WEIGHTS)[0]
+            for group_id in set(rng.choices(group_ids, cum_weights=cum_weights, k=wanted)):
+                yield {'user_id': user_id, 'group_id': group_id}
+
+    membership_count = 0
+    for chunk in _chunks(memberships()):
+        connection.execute(user_groups.insert(), chunk)
+        membership_count += len(chunk)
+    bump_versions(connection, {'users', 'groups', 'memberships'})
+
+    return {
+        'users': user_count,
+        'groups': group_count,
+        'memberships': membership_count,
+        'first_user_id': first_user_id,
+        'group_ids': (group_ids[0], group_ids[-1]),
+        'users_seconds': round(users_done - started, 2),
+        'seed_seconds': round(time.perf_counter() - started, 2),
+    }
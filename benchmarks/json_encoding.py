@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+JSON encoding benchmark for list responses
+Encodes user lists shaped like GET /api/groups/<id>/users bodies with every
+available encoder (stdlib json, orjson, msgspec) and compares:
+
+- whole: the list encoded in one call into a single string (jsonify)
+- fragments: one encoded object per user, then the streamed array body
+  (what the list endpoints do on a cold fragment cache)
+- cached: only the streamed body from already encoded fragments (warm cache)
+
+Peak memory is the Python allocation peak measured with tracemalloc
+while encoding, excluding the input list.
+
+Usage:
+    python benchmarks/json_encoding.py
+    python benchmarks/json_encoding.py --scales 10k,100k,1m --repeat 5
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from app.json_provider import FastJSONProvider, available_encoders  # noqa: E402
+from app.fragments import STREAM_CHUNK_SIZE, _iter_array  # noqa: E402
+from benchmarks.run import parse_scale  # noqa: E402
+
+GROUP_NAMES = ['Administradores', 'Visualizadores', 'Editores', 'Financeiro - São Paulo', 'Suporte - Remoto']
+
+
+def build_payload(count):
+    """User dicts as User.to_dict() returns them (ISO dates, 0-3 groups)"""
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            'id': i,
+            'username': f'user{i:07d}',
+            'email': f'user{i:07d}@example.com',
+            'is_admin': i % 1000 == 0,
+            'is_active': i % 10 != 9,
+            'created_at': (base + timedelta(seconds=i)).isoformat(),
+            'updated_at': (base + timedelta(seconds=i, microseconds=i % 999983)).isoformat(),
+            'groups': [{'id': g + 1, 'name': GROUP_NAMES[g]} for g in range(i % 4)],
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def encode_whole(provider, payload):
+    return len(provider.dumps_bytes(payload, separators=(',', ':')))
+
+
+def encode_fragments(provider, payload):
+    parts = [bytes(memoryview(provider.dumps_bytes(item, separators=(',', ':')))) for item in payload]
+    return sum(len(chunk) for chunk in _iter_array(parts))
+
+
+def stream_cached(parts):
+    return sum(len(chunk) for chunk in _iter_array(parts))
+
+
+def measure(function, *args, repeat):
+    """Best-of-`repeat` time (ms) and the allocation peak (MB) of one run"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        size = function(*args)
+        times.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'ms': round(min(times) * 1000, 1), 'median_ms': round(statistics.median(times) * 1000, 1),
+            'peak_mb': round(peak / (1024 * 1024), 1), 'bytes': size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de codificação JSON de listas')
+    parser.add_argument('--scales', default='10k,100k', help='Quantidades de usuários (padrão: 10k,100k)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições por medida (padrão: 3)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    encoders = available_encoders()
+    print(f"Codificadores disponíveis: {', '.join(encoders)} "
+          f"(corpo em blocos de {STREAM_CHUNK_SIZE} objetos)")
+
+    for scale in [parse_scale(value) for value in args.scales.split(',') if value.strip()]:
+        payload = build_payload(scale)
+        print("\n" + "=" * 78)
+        print(f"  {scale} usuários")
+        print("=" * 78)
+        print(f"{'Codificador':<12}{'Modo':<12}{'melhor (ms)':>13}{'mediana (ms)':>14}{'pico (MB)':>12}{'MB':>9}")
+        for encoder in encoders:
+            provider = FastJSONProvider(app, encoder)
+            parts = [bytes(memoryview(provider.dumps_bytes(item, separators=(',', ':')))) for item in payload]
+            results = {
+                'whole': measure(encode_whole, provider, payload, repeat=args.repeat),
+                'fragments': measure(encode_fragments, provider, payload, repeat=args.repeat),
+                'cached': measure(stream_cached, parts, repeat=args.repeat),
+            }
+            for mode, result in results.items():
+                print(f"{encoder:<12}{mode:<12}{result['ms']:>13}{result['median_ms']:>14}"
+                      f"{result['peak_mb']:>12}{result['bytes'] / (1024 * 1024):>9.1f}")
+            del parts
+
+
+if __name__ == '__main__':
+    main()
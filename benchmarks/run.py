@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Route benchmark suite for pyFlaskUserKit
+Seeds a temporary SQLite database at each scale (users with power-law
+group sizes), then drives every api_bp and web_bp route through the Flask
+test client and records p50/p99 latency, throughput, SQL statements per
+request (from the Server-Timing header) and peak RSS. Results are written
+as JSON so runs on two commits can be compared with benchmarks/compare.py.
+
+Seeding runs in its own process and every route is measured in a fresh
+process of its own: ru_maxrss is a high-water mark, so a shared process
+would report the largest earlier route for every later one. Each route
+reports its process's peak RSS and the growth over the RSS right after
+startup (rss_delta_mb).
+
+Usage:
+    python benchmarks/run.py --scales 1k
+    python benchmarks/run.py --scales 1k,100k,1m --iterations 30 --output results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from benchmarks.scenarios import (SCENARIOS, METRICS_TOKEN, spare_rows_needed,  # noqa: E402
+                                  uncovered_endpoints)
+
+SAMPLE_USERS = 50
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+def parse_scale(value):
+    value = value.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def make_app(db_path):
+    from config import Config
+    from app import create_app
+
+    class BenchmarkConfig(Config):
+        DATABASE_TYPE = 'sqlite'
+        SQLITE_DB_PATH = db_path
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_BINDS = {}
+        METRICS_DIR = ''
+        METRICS_TOKEN = METRICS_TOKEN
+        SERVER_TIMING_HEADER = True
+        QUERY_BUDGET_STRICT = False
+        # /api/events ends after its replay instead of holding the connection
+        EVENTS_ENABLED = True
+        EVENTS_STREAM_TIMEOUT = 0
+
+    return create_app(BenchmarkConfig)
+
+
+def seed_worker(db_path, user_count, spare):
+    """Create the schema and the dataset; returns the benchmark context"""
+    from app import db
+    from app.bootstrap import bootstrap_database
+    from app.models import User, Group
+    from app.passwords import hash_password
+    from app.search import search_index_suspended
+    from app.tokens import issue_token
+    from benchmarks.dataset import PASSWORD, seed_dataset
+
+    app = make_app(db_path)
+    with app.app_context():
+        bootstrap_database(app)
+        password_hash = hash_password(PASSWORD)
+        with search_index_suspended(), db.engine.begin() as connection:
+            summary = seed_dataset(connection, user_count, password_hash=password_hash)
+            connection.execute(db.insert(User), [
+                {'username': f'bench-spare-tmp-{n}', 'email': f'bench-spare-{n}@example.com',
+                 'password_hash': password_hash, 'is_admin': False, 'is_active': True}
+                for n in range(spare)
+            ])
+            connection.execute(db.insert(Group), [
+                {'name': f'bench-spare-group-tmp-{n}', 'description': 'Reservado para o benchmark'}
+                for n in range(spare)
+            ])
+        spare_users = [row[0] for row in db.session.execute(
+            db.select(User.id).where(User.username.like('bench-spare-tmp-%')).order_by(User.id))]
+        spare_groups = [row[0] for row in db.session.execute(
+            db.select(Group.id).where(Group.name.like('bench-spare-group-tmp-%')).order_by(Group.id))]
+        # Names of spare rows follow their ids so web edit forms can resend them
+        # (temporary names first, so no renamed row collides with a pending one)
+        db.session.execute(db.update(User).where(User.id.in_(spare_users))
+                           .values(username=db.literal('bench-spare-') + db.cast(User.id, db.String)))
+        db.session.execute(db.update(Group).where(Group.id.in_(spare_groups))
+                           .values(name=db.literal('bench-spare-group-') + db.cast(Group.id, db.String)))
+        # One token for the bearer scenarios plus one per revocation
+        tokens = [issue_token(summary['first_user_id'], f'bench-{n}', 0) for n in range(1 + spare)]
+        db.session.commit()
+        token = tokens[0][1]
+        spare_tokens = [api_token.id for api_token, _ in tokens[1:]]
+
+    first, last = summary['first_user_id'], summary['first_user_id'] + user_count - 1
+    rng = random.Random(user_count)
+    admin_id = first  # user0000000 is an active admin
+    summary['context'] = {
+        'admin_id': admin_id,
+        'admin_username': 'user0000000',
+        'sample_user_ids': sorted(rng.sample(range(first + 1, last + 1), min(SAMPLE_USERS, user_count - 1))),
+        'largest_group_id': summary['group_ids'][0],
+        'smallest_group_id': summary['group_ids'][1],
+        'spare_user_ids': spare_users,
+        'spare_group_ids': spare_groups,
+        'api_token': token,
+        'spare_token_ids': spare_tokens,
+    }
+    return summary
+
+
+def run_scenario(client, scenario, ctx, iterations):
+    method = scenario.method.lower()
+    latencies = []
+    queries = []
+    statuses = {}
+
+    if scenario.method == 'GET':
+        url, kwargs = scenario.build(ctx, 0)
+        getattr(client() if callable(client) else client, method)(url, **kwargs)  # warm-up
+
+    for i in range(iterations):
+        url, kwargs = scenario.build(ctx, i)
+        request_client = client() if callable(client) else client
+        started = time.perf_counter()
+        response = getattr(request_client, method)(url, **kwargs)
+        response.get_data()  # consume streamed bodies
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        match = QUERIES_PATTERN.search(response.headers.get('Server-Timing', ''))
+        if match:
+            queries.append(int(match.group(1)))
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'method': scenario.method,
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+        'throughput_rps': round(iterations / total, 1) if total else None,
+        'queries': max(queries) if queries else None,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'errors': sum(count for code, count in statuses.items() if code >= 400),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def measure_worker(db_path, ctx, iterations, name):
+    """Drive one scenario against an already seeded database, in a fresh process"""
+    # Query counts are in the results; skip the per-request log lines
+    logging.getLogger('app.instrumentation').setLevel(logging.ERROR)
+    app = make_app(db_path)
+    admin = app.test_client()
+    with admin.session_transaction() as session:
+        session['user_id'] = ctx['admin_id']
+        session['username'] = ctx['admin_username']
+        session['is_admin'] = True
+
+    scenario = next(scenario for scenario in SCENARIOS if scenario.name == name)
+    client = app.test_client if scenario.anonymous else admin
+    count = min(iterations, scenario.max_iterations or iterations)
+    rss_before = peak_rss_mb()
+    result = run_scenario(client, scenario, ctx, count)
+    result['rss_after_startup_mb'] = rss_before
+    result['rss_delta_mb'] = round(result['peak_rss_mb'] - rss_before, 1)
+    return result
+
+
+def coverage_worker(db_path):
+    return uncovered_endpoints(make_app(db_path))
+
+
+def run_scale(user_count, args):
+    directory = tempfile.mkdtemp(prefix='userkit-bench-')
+    db_path = os.path.join(directory, 'bench.db')
+    spawn = get_context('spawn')
+
+    print(f"\n[{user_count} usuários] populando o banco...", flush=True)
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+        summary = pool.submit(seed_worker, db_path, user_count, spare_rows_needed(args.iterations)).result()
+    print(f"  {summary['users']} usuários, {summary['groups']} grupos, "
+          f"{summary['memberships']} vínculos em {summary['seed_seconds']}s", flush=True)
+
+    print(f"[{user_count} usuários] medindo rotas...", flush=True)
+    names = [scenario.name for scenario in SCENARIOS
+             if not args.only or any(pattern in scenario.name for pattern in args.only)]
+    # One process per route (in order, since write scenarios share the database)
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn, max_tasks_per_child=1) as pool:
+        routes = {name: pool.submit(measure_worker, db_path, summary['context'], args.iterations, name).result()
+                  for name in names}
+        uncovered = pool.submit(coverage_worker, db_path).result()
+    measured = {
+        'routes': routes,
+        'uncovered': uncovered,
+        'peak_rss_mb': max((route['peak_rss_mb'] for route in routes.values()), default=None),
+    }
+
+    dataset = {key: value for key, value in summary.items() if key != 'context'}
+    dataset['db_size_mb'] = round(os.path.getsize(db_path) / (1024 * 1024), 1)
+    if not args.keep:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return {'dataset': dataset, **measured}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def print_table(scale, result):
+    print("=" * 96)
+    print(f"  {scale} usuários")
+    print("=" * 96)
+    print(f"{'Rota':<40}{'p50 (ms)':>11}{'p99 (ms)':>11}{'req/s':>10}{'SQL':>6}{'Erros':>7}{'ΔRSS (MB)':>11}")
+    for name, route in result['routes'].items():
+        queries = '-' if route['queries'] is None else route['queries']
+        print(f"{name:<40}{route['p50_ms']:>11}{route['p99_ms']:>11}{route['throughput_rps']:>10}"
+              f"{queries:>6}{route['errors']:>7}{route['rss_delta_mb']:>11}")
+    if result['uncovered']:
+        print(f"\n⚠ Rotas sem cenário: {', '.join(result['uncovered'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas da API e da interface web')
+    parser.add_argument('--scales', default='1k,100k,1m',
+                        help='Quantidades de usuários separadas por vírgula (padrão: 1k,100k,1m)')
+    parser.add_argument('--iterations', type=int, default=20, help='Requisições medidas por rota (padrão: 20)')
+    parser.add_argument('--only', default='', help='Mede apenas rotas cujo nome contém um destes termos (vírgulas)')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: benchmarks/results/<data>-<commit>.json)')
+    parser.add_argument('--keep', action='store_true', help='Mantém os bancos temporários')
+    args = parser.parse_args()
+    args.only = [term.strip() for term in args.only.split(',') if term.strip()]
+
+    revision = git_revision()
+    report = {
+        'commit': revision,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'iterations': args.iterations,
+        'scales': {},
+    }
+    for scale in [parse_scale(value) for value in args.scales.split(',') if value.strip()]:
+        result = run_scale(scale, args)
+        report['scales'][str(scale)] = result
+        print_table(scale, result)
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"{datetime.now():%Y%m%d-%H%M%S}-{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nResultados gravados em {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Request scenarios for every route of api_bp and web_bp.
+
+Each scenario builds the request for iteration `i` from the benchmark
+context (ids of the seeded data). Write scenarios target ids reserved for
+them (fresh names, spare users and groups), so every iteration succeeds
+and the run can be repeated on a new database with the same results.
+"""
+
+from collections import namedtuple
+
+# name: label in the results ('endpoint' or 'endpoint[variant]')
+# build: (ctx, i) -> (url, request kwargs)
+# anonymous: run each request on a new client without the admin session
+# max_iterations: cap for scenarios dominated by password hashing or full scans
+# METRICS_TOKEN of the benchmark app (/metrics requires one outside debug mode)
+METRICS_TOKEN = 'benchmark'
+
+Scenario = namedtuple('Scenario', 'name method build anonymous max_iterations')
+
+
+def scenario(name, method, build, anonymous=False, max_iterations=None):
+    return Scenario(name, method, build, anonymous, max_iterations)
+
+
+def _get(url):
+    return lambda ctx, i: (url.format(**ctx), {})
+
+
+def _stream(url):
+    # The test client looks like a sync worker; streams need a threaded one
+    return lambda ctx, i: (url.format(**ctx), {'environ_overrides': {'wsgi.multithread': True}})
+
+
+def _sample_user(ctx, i):
+    users = ctx['sample_user_ids']
+    return users[i % len(users)]
+
+
+SCENARIOS = [
+    # ----- API: reads -----
+    scenario('api.get_stats', 'GET', _get('/api/stats')),
+    scenario('api.get_pool_stats', 'GET', _get('/api/pool')),
+    scenario('api.get_users', 'GET', _get('/api/users')),
+    scenario('api.get_users[filtered]', 'GET',
+             _get('/api/users?q=user00&is_active=true&group_id={largest_group_id}&sort=username')),
+    scenario('api.get_users[limit=500]', 'GET', _get('/api/users?limit=500&include=groups')),
+    scenario('api.search_users_endpoint', 'GET', _get('/api/users/search?q=00012')),
+    scenario('api.export_users', 'GET', _get('/api/users/export?format=ndjson'), max_iterations=3),
+    scenario('api.get_user', 'GET', lambda ctx, i: (f'/api/users/{_sample_user(ctx, i)}', {})),
+    scenario('api.get_groups', 'GET', _get('/api/groups')),
+    scenario('api.get_group', 'GET', _get('/api/groups/{largest_group_id}')),
+    scenario('api.get_group_users[largest]', 'GET', _get('/api/groups/{largest_group_id}/users')),
+    scenario('api.get_group_users[smallest]', 'GET', _get('/api/groups/{smallest_group_id}/users')),
+    scenario('api.get_group_candidates', 'GET', _get('/api/groups/{largest_group_id}/candidates?q=user01')),
+    scenario('api.get_stats[bearer]', 'GET', lambda ctx, i: ('/api/stats', {
+        'headers': {'Authorization': f"Bearer {ctx['api_token']}"}}), anonymous=True),
+    scenario('api.get_tokens', 'GET', _get('/api/tokens')),
+    scenario('api.get_changes', 'GET', _get('/api/changes')),
+    scenario('api.get_changes[since=0]', 'GET', _get('/api/changes?since=0')),
+    scenario('api.stream_events', 'GET', _stream('/api/events')),
+    scenario('api.stream_events[since=0]', 'GET', _stream('/api/events?since=0')),
+
+    # ----- API: writes -----
+    scenario('api.create_user', 'POST', lambda ctx, i: ('/api/users', {'json': {
+        'username': f'bench-api-{i}', 'email': f'bench-api-{i}@example.com', 'password': 'benchmark',
+        'group_ids': [ctx['largest_group_id']]}}), max_iterations=10),
+    scenario('api.bulk_create_users', 'POST', lambda ctx, i: ('/api/users/bulk', {'json': [
+        {'username': f'bench-bulk-{i}-{n}', 'email': f'bench-bulk-{i}-{n}@example.com', 'password': 'benchmark'}
+        for n in range(10)]}), max_iterations=3),
+    scenario('api.update_user', 'PUT', lambda ctx, i: (f"/api/users/{ctx['spare_user_ids'][0]}", {'json': {
+        'email': f'bench-updated-{i}@example.com', 'is_active': True}})),
+    scenario('api.activate_user', 'POST', lambda ctx, i: (f'/api/users/{_sample_user(ctx, i)}/activate', {})),
+    scenario('api.deactivate_user', 'POST',
+             lambda ctx, i: (f'/api/users/{_sample_user(ctx, i)}/deactivate', {})),
+    scenario('api.make_admin', 'POST', lambda ctx, i: (f'/api/users/{_sample_user(ctx, i)}/make-admin', {})),
+    scenario('api.remove_admin', 'POST',
+             lambda ctx, i: (f'/api/users/{_sample_user(ctx, i)}/remove-admin', {})),
+    scenario('api.reset_password', 'POST', lambda ctx, i: (f"/api/users/{ctx['spare_user_ids'][0]}/reset-password",
+                                                            {'json': {'new_password': 'benchmark'}}),
+             max_iterations=10),
+    scenario('api.add_user_to_groups', 'POST', lambda ctx, i: (f'/api/users/{_sample_user(ctx, i)}/groups', {
+        'json': {'group_ids': [ctx['largest_group_id'], ctx['smallest_group_id']]}})),
+    scenario('api.remove_user_from_group', 'DELETE', lambda ctx, i: (
+        f"/api/users/{_sample_user(ctx, i)}/groups/{ctx['smallest_group_id']}", {})),
+    scenario('api.add_group_users', 'POST', lambda ctx, i: (f"/api/groups/{ctx['smallest_group_id']}/users", {
+        'json': {'user_ids': ctx['sample_user_ids']}})),
+    scenario('api.remove_group_users', 'DELETE', lambda ctx, i: (f"/api/groups/{ctx['smallest_group_id']}/users", {
+        'json': {'user_ids': ctx['sample_user_ids']}})),
+    scenario('api.create_group', 'POST', lambda ctx, i: ('/api/groups', {'json': {
+        'name': f'bench-api-group-{i}', 'description': 'Benchmark'}})),
+    scenario('api.update_group', 'PUT', lambda ctx, i: (f"/api/groups/{ctx['spare_group_ids'][0]}", {'json': {
+        'description': f'Atualizado {i}'}})),
+    scenario('api.delete_user', 'DELETE', lambda ctx, i: (f"/api/users/{ctx['spare_user_ids'][1 + i]}", {})),
+    scenario('api.delete_group', 'DELETE', lambda ctx, i: (f"/api/groups/{ctx['spare_group_ids'][1 + i]}", {})),
+    scenario('api.create_token', 'POST', lambda ctx, i: ('/api/tokens', {'json': {'name': f'bench-{i}'}})),
+    scenario('api.revoke_token_endpoint', 'DELETE',
+             lambda ctx, i: (f"/api/tokens/{ctx['spare_token_ids'][i]}", {})),
+
+    # ----- Web: pages -----
+    scenario('web.index', 'GET', _get('/')),
+    scenario('web.users_list', 'GET', _get('/usuarios'), max_iterations=3),  # renders every user
+    scenario('web.user_detail', 'GET', lambda ctx, i: (f'/usuarios/{_sample_user(ctx, i)}', {})),
+    scenario('web.user_create[form]', 'GET', _get('/usuarios/novo')),
+    scenario('web.user_edit[form]', 'GET', lambda ctx, i: (f'/usuarios/{_sample_user(ctx, i)}/editar', {})),
+    scenario('web.groups_list', 'GET', _get('/grupos')),
+    scenario('web.group_detail[largest]', 'GET', _get('/grupos/{largest_group_id}')),
+    scenario('web.group_detail[smallest]', 'GET', _get('/grupos/{smallest_group_id}')),
+    scenario('web.group_create[form]', 'GET', _get('/grupos/novo')),
+    scenario('web.group_edit[form]', 'GET', _get('/grupos/{largest_group_id}/editar')),
+    scenario('web.documentation', 'GET', _get('/documentacao')),
+    scenario('web.login[form]', 'GET', _get('/login'), anonymous=True),
+
+    # ----- Web: form posts -----
+    scenario('web.login', 'POST', lambda ctx, i: ('/login', {'data': {
+        'username': ctx['admin_username'], 'password': 'benchmark'}}), anonymous=True, max_iterations=10),
+    scenario('web.logout', 'GET', _get('/logout'), anonymous=True),
+    scenario('web.user_create', 'POST', lambda ctx, i: ('/usuarios/novo', {'data': {
+        'username': f'bench-web-{i}', 'email': f'bench-web-{i}@example.com', 'password': 'benchmark',
+        'is_active': 'on', 'groups': [str(ctx['largest_group_id'])]}}), max_iterations=10),
+    scenario('web.user_edit', 'POST', lambda ctx, i: (f"/usuarios/{ctx['spare_user_ids'][0]}/editar", {'data': {
+        'username': f"bench-spare-{ctx['spare_user_ids'][0]}", 'email': f'bench-web-edit-{i}@example.com',
+        'is_active': 'on', 'groups': [str(ctx['smallest_group_id'])]}})),
+    scenario('web.user_toggle_status', 'POST',
+             lambda ctx, i: (f'/usuarios/{_sample_user(ctx, i)}/alternar-status', {})),
+    scenario('web.user_toggle_admin', 'POST',
+             lambda ctx, i: (f'/usuarios/{_sample_user(ctx, i)}/alternar-admin', {})),
+    scenario('web.group_create', 'POST', lambda ctx, i: ('/grupos/novo', {'data': {
+        'name': f'bench-web-group-{i}', 'description': 'Benchmark'}})),
+    scenario('web.group_edit', 'POST', lambda ctx, i: (f"/grupos/{ctx['spare_group_ids'][0]}/editar", {'data': {
+        'name': f"bench-spare-group-{ctx['spare_group_ids'][0]}", 'description': f'Atualizado {i}'}})),
+    scenario('web.group_add_user', 'POST', lambda ctx, i: (
+        f"/grupos/{ctx['smallest_group_id']}/adicionar-usuario/{_sample_user(ctx, i)}", {})),
+    scenario('web.group_remove_user', 'POST', lambda ctx, i: (
+        f"/grupos/{ctx['smallest_group_id']}/remover-usuario/{_sample_user(ctx, i)}", {})),
+    scenario('web.user_delete', 'POST', lambda ctx, i: (
+        f"/usuarios/{ctx['spare_user_ids'][-1 - i]}/deletar", {})),
+    scenario('web.group_delete', 'POST', lambda ctx, i: (
+        f"/grupos/{ctx['spare_group_ids'][-1 - i]}/deletar", {})),
+
+    scenario('metrics', 'GET', lambda ctx, i: ('/metrics', {
+        'headers': {'Authorization': f'Bearer {METRICS_TOKEN}'}})),
+]
+
+
+def spare_rows_needed(iterations):
+    """Spare users/groups to reserve: one edited in place plus one per delete on each side"""
+    return 1 + 2 * iterations
+
+
+def uncovered_endpoints(app):
+    """api/web endpoints (per method) without a scenario"""
+    covered = {(s.name.split('[')[0], s.method) for s in SCENARIOS}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.split('.')[0] not in ('api', 'web'):
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.endpoint, method) not in covered:
+                missing.append(f'{method} {rule.rule}')
+    return missing
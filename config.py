@@ -23,13 +23,134 @@ class Config:
             f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@"
             f"{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
         )
+        
+        # Connection pool: recycle connections before MySQL's wait_timeout
+        # closes them and ping on checkout so stale ones are replaced
+        MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 10))
+        MYSQL_MAX_OVERFLOW = int(os.getenv('MYSQL_MAX_OVERFLOW', 20))
+        MYSQL_POOL_TIMEOUT = int(os.getenv('MYSQL_POOL_TIMEOUT', 30))  # seconds
+        MYSQL_POOL_RECYCLE = int(os.getenv('MYSQL_POOL_RECYCLE', 1800))  # seconds
+        MYSQL_POOL_PRE_PING = os.getenv('MYSQL_POOL_PRE_PING', 'True') == 'True'
+        
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': MYSQL_POOL_SIZE,
+            'max_overflow': MYSQL_MAX_OVERFLOW,
+            'pool_timeout': MYSQL_POOL_TIMEOUT,
+            'pool_recycle': MYSQL_POOL_RECYCLE,
+            'pool_pre_ping': MYSQL_POOL_PRE_PING,
+        }
     else:
         # SQLite as default
         SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', 'instance/app.db')
         SQLALCHEMY_DATABASE_URI = f"sqlite:///{SQLITE_DB_PATH}"
+        
+        # Connection PRAGMAs: 'production' (WAL + tuned settings below) or
+        # 'default' (plain SQLite defaults)
+        SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'production')
+        SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+        SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+        SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # milliseconds
+        SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+        SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+        SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+    
+    # Read replicas: comma-separated SQLAlchemy URIs. Read-only views
+    # (lists, dashboard) query one of them; writes stay on the primary.
+    DATABASE_REPLICA_URIS = [uri.strip() for uri in os.getenv('DATABASE_REPLICA_URIS', '').split(',')
+                             if uri.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{i}': uri for i, uri in enumerate(DATABASE_REPLICA_URIS)}
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Password hashing
+    # Target werkzeug method; stored hashes with other parameters are
+    # upgraded on the next successful login (e.g. 'scrypt', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # Processes used to hash passwords in bulk imports
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    # Login verification pool: 'thread' or 'process', workers and waiting slots;
+    # logins beyond workers + queue size get 503 with Retry-After
+    PASSWORD_CHECK_EXECUTOR = os.getenv('PASSWORD_CHECK_EXECUTOR', 'thread')
+    PASSWORD_CHECK_WORKERS = int(os.getenv('PASSWORD_CHECK_WORKERS', os.cpu_count() or 1))
+    PASSWORD_CHECK_QUEUE_SIZE = int(os.getenv('PASSWORD_CHECK_QUEUE_SIZE', 16))
+    PASSWORD_CHECK_TIMEOUT = float(os.getenv('PASSWORD_CHECK_TIMEOUT', 10))
+    PASSWORD_CHECK_RETRY_AFTER = int(os.getenv('PASSWORD_CHECK_RETRY_AFTER', 5))
+    
+    # Login rate limits, checked before the user lookup and password hash:
+    # attempts per client IP and failed attempts per (username, IP) within
+    # a sliding window (seconds); over the limit the login page answers 429.
+    # LOGIN_THROTTLE_STORAGE is a SQLite file path shared by all workers
+    # (empty = per-process memory, at most LOGIN_THROTTLE_MAX_KEYS keys).
+    LOGIN_THROTTLE_ENABLED = os.getenv('LOGIN_THROTTLE_ENABLED', 'True') == 'True'
+    LOGIN_THROTTLE_IP_LIMIT = int(os.getenv('LOGIN_THROTTLE_IP_LIMIT', 20))
+    LOGIN_THROTTLE_IP_WINDOW = int(os.getenv('LOGIN_THROTTLE_IP_WINDOW', 60))
+    LOGIN_THROTTLE_USER_LIMIT = int(os.getenv('LOGIN_THROTTLE_USER_LIMIT', 5))
+    LOGIN_THROTTLE_USER_WINDOW = int(os.getenv('LOGIN_THROTTLE_USER_WINDOW', 300))
+    LOGIN_THROTTLE_MAX_KEYS = int(os.getenv('LOGIN_THROTTLE_MAX_KEYS', 100000))
+    LOGIN_THROTTLE_STORAGE = os.getenv('LOGIN_THROTTLE_STORAGE', '')
+    
+    # Reverse proxies in front of the app: number of X-Forwarded-For /
+    # X-Forwarded-Proto values to trust (0 = not behind a proxy). Without
+    # it every client shares the proxy's IP in the login limits.
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    PROXY_FIX_X_PROTO = int(os.getenv('PROXY_FIX_X_PROTO', 0))
+    
+    # Seconds the dashboard counters are cached per process
+    STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 30))
+    # JSON encoder for API responses: auto (orjson, then msgspec, when
+    # installed), orjson, msgspec or stdlib
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+    # Pre-encoded user/group JSON objects kept per process for the read
+    # endpoints (entries; 0 disables). Keys include each row's updated_at
+    # and the memberships/group versions, so edits never serve stale data.
+    FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', 50000))
+    
+    # Change log behind GET /api/changes: entries older than this many days
+    # are pruned (0 keeps everything); older tokens get 410 Gone
+    CHANGE_LOG_RETENTION_DAYS = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', 7))
+    
+    # Server-Sent Events at /api/events. Each open stream holds a worker
+    # thread, so the endpoint is off by default and refuses streams on
+    # sync workers (use gunicorn --worker-class gthread or gevent); keep
+    # EVENTS_MAX_SUBSCRIBERS well below --threads. Streams end after
+    # EVENTS_STREAM_TIMEOUT seconds and the browser resumes them.
+    EVENTS_ENABLED = os.getenv('EVENTS_ENABLED', 'False') == 'True'
+    EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', 1.0))
+    EVENTS_BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', 100))
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 8))
+    EVENTS_KEEPALIVE = int(os.getenv('EVENTS_KEEPALIVE', 15))
+    EVENTS_STREAM_TIMEOUT = int(os.getenv('EVENTS_STREAM_TIMEOUT', 300))
+    
+    # Request instrumentation: SQL statement count/time, JSON encoding and
+    # template render time per request, as a Server-Timing header and a
+    # JSON log line ('app.instrumentation' logger)
+    INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'True') == 'True'
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True') == 'True'
+    # Default max SQL statements per request (0 = no limit; views may set
+    # their own with @query_budget). Strict mode turns overruns into errors.
+    QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', 0))
+    QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+    
+    # Prometheus metrics at /metrics. Under gunicorn set METRICS_DIR to a
+    # directory shared by the workers (emptied before start) so every worker
+    # reports the totals of all of them. Scrapes need 'Authorization:
+    # Bearer <METRICS_TOKEN>'; without a token /metrics answers 404 unless
+    # the app runs in debug mode.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+    METRICS_DIR = os.getenv('METRICS_DIR', '')
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))  # seconds
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    
+    # API tokens ('Authorization: Bearer ukt_...'): stored as HMAC-SHA256
+    # with API_TOKEN_HMAC_KEY (SECRET_KEY when empty; changing the key
+    # invalidates every token). Lookups are cached per process for
+    # API_TOKEN_CACHE_TTL seconds, so revocations reach other workers
+    # within that time.
+    API_TOKEN_HMAC_KEY = os.getenv('API_TOKEN_HMAC_KEY', '')
+    API_TOKEN_DEFAULT_EXPIRY_DAYS = int(os.getenv('API_TOKEN_DEFAULT_EXPIRY_DAYS', 90))  # 0 = never
+    API_TOKEN_CACHE_SIZE = int(os.getenv('API_TOKEN_CACHE_SIZE', 1024))
+    API_TOKEN_CACHE_TTL = float(os.getenv('API_TOKEN_CACHE_TTL', 30))
+    
     # Admin configuration
     ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
     ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@example.com')
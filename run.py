@@ -4,6 +4,11 @@ import os
 app = create_app()
 
 if __name__ == '__main__':
+    # Development server: create tables and default groups on first run
+    from app.bootstrap import bootstrap_database
+    with app.app_context():
+        bootstrap_database(app)
+    
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'True') == 'True'
     app.run(host='0.0.0.0', port=port, debug=debug)
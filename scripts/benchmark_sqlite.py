@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+SQLite concurrency benchmark for pyFlaskUserKit
+Runs concurrent reader and writer processes (like gunicorn workers) against
+a temporary database, once with SQLite defaults and once with the
+'production' profile (WAL, synchronous=NORMAL, busy_timeout, mmap, cache),
+and reports read/write throughput and 'database is locked' errors.
+
+Usage:
+    python scripts/benchmark_sqlite.py
+    python scripts/benchmark_sqlite.py --readers 8 --writers 2 --duration 10 --json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.database import apply_sqlite_pragmas
+from app.models import User  # noqa: F401 - registers the tables on db.metadata
+
+
+PROFILES = {
+    'default': {'SQLITE_PROFILE': 'default'},
+    'production': {'SQLITE_PROFILE': 'production'},
+}
+
+
+def make_engine(path, profile):
+    engine = create_engine(f'sqlite:///{path}')
+    apply_sqlite_pragmas(engine, PROFILES[profile])
+    return engine
+
+
+def seed(path, profile, user_count):
+    engine = make_engine(path, profile)
+    db.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+             'is_admin': False, 'is_active': True, 'created_at': now, 'updated_at': now}
+            for i in range(1, user_count + 1)
+        ])
+    engine.dispose()
+
+
+def worker(role, path, profile, user_count, duration, results):
+    """Run reads or writes until the deadline; report (role, ops, lock errors)"""
+    engine = make_engine(path, profile)
+    ops = errors = 0
+    deadline = time.perf_counter() + duration
+    with engine.connect() as conn:
+        while time.perf_counter() < deadline:
+            user_id = random.randint(1, user_count)
+            try:
+                if role == 'reader':
+                    conn.execute(text('SELECT id, username, email FROM users WHERE id = :id'),
+                                 {'id': user_id}).all()
+                    conn.execute(text('SELECT count(*) FROM users WHERE id BETWEEN :a AND :b'),
+                                 {'a': user_id, 'b': user_id + 100}).scalar()
+                    conn.rollback()
+                else:
+                    conn.execute(text('UPDATE users SET updated_at = :now WHERE id = :id'),
+                                 {'now': datetime.utcnow(), 'id': user_id})
+                    conn.commit()
+                ops += 1
+            except OperationalError:
+                conn.rollback()
+                errors += 1
+    engine.dispose()
+    results.put((role, ops, errors))
+
+
+def run_profile(profile, args):
+    directory = tempfile.mkdtemp(prefix='userkit-bench-')
+    path = os.path.join(directory, 'bench.db')
+    seed(path, profile, args.users)
+
+    results = multiprocessing.Queue()
+    roles = ['reader'] * args.readers + ['writer'] * args.writers
+    processes = [multiprocessing.Process(target=worker,
+                                         args=(role, path, profile, args.users, args.duration, results))
+                 for role in roles]
+    for process in processes:
+        process.start()
+    totals = {'reader': [0, 0], 'writer': [0, 0]}
+    for _ in processes:
+        role, ops, errors = results.get()
+        totals[role][0] += ops
+        totals[role][1] += errors
+    for process in processes:
+        process.join()
+
+    return {
+        'profile': profile,
+        'reads_per_sec': round(totals['reader'][0] / args.duration, 1),
+        'writes_per_sec': round(totals['writer'][0] / args.duration, 1),
+        'read_errors': totals['reader'][1],
+        'write_errors': totals['writer'][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de concorrência do SQLite (padrão vs produção)')
+    parser.add_argument('--readers', type=int, default=4, help='Processos leitores (padrão: 4)')
+    parser.add_argument('--writers', type=int, default=2, help='Processos escritores (padrão: 2)')
+    parser.add_argument('--duration', type=float, default=5, help='Segundos por perfil (padrão: 5)')
+    parser.add_argument('--users', type=int, default=10000, help='Usuários no banco (padrão: 10000)')
+    parser.add_argument('--json', action='store_true', help='Imprime os resultados em JSON')
+    args = parser.parse_args()
+
+    results = [run_profile(profile, args) for profile in PROFILES]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 72)
+    print(f"  SQLite: {args.readers} leitores, {args.writers} escritores, "
+          f"{args.duration:g}s por perfil, {args.users} usuários")
+    print("=" * 72)
+    print(f"{'Perfil':<12}{'Leituras/s':>14}{'Escritas/s':>14}{'Erros leit.':>14}{'Erros escr.':>14}")
+    for result in results:
+        print(f"{result['profile']:<12}{result['reads_per_sec']:>14}{result['writes_per_sec']:>14}"
+              f"{result['read_errors']:>14}{result['write_errors']:>14}")
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for pyFlaskUserKit
+Starts fresh Python processes (like new gunicorn workers) and measures how
+long it takes to import the app package, to run create_app() and to serve
+the first request, plus how many SQL statements create_app() issued
+(expected: 0, the database bootstrap lives in app/bootstrap.py).
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 20 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs in a fresh interpreter; prints one JSON line with the timings
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+flask_app = app.create_app()
+created = time.perf_counter()
+startup_statements = len(statements)
+
+with flask_app.app_context():
+    from app.bootstrap import bootstrap_database
+    bootstrap_database(flask_app)
+flask_app.test_client().get('/login')
+served = time.perf_counter()
+
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'startup_statements': startup_statements,
+    'modules': len(sys.modules),
+    'alembic_loaded': 'alembic' in sys.modules,
+}))
+'''
+
+
+def run_probe(env):
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples]
+    return {'median': round(statistics.median(values), 1), 'min': round(min(values), 1),
+            'max': round(max(values), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do tempo de inicialização da aplicação')
+    parser.add_argument('--runs', type=int, default=10, help='Processos medidos (padrão: 10)')
+    parser.add_argument('--json', action='store_true', help='Imprime os resultados em JSON')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='userkit-startup-')
+    env = dict(os.environ, DATABASE_TYPE='sqlite', SQLITE_DB_PATH=os.path.join(directory, 'startup.db'))
+
+    # Warm-up: bytecode caches, and the first run bootstraps the database
+    run_probe(env)
+    samples = [run_probe(env) for _ in range(args.runs)]
+
+    results = {
+        'runs': args.runs,
+        'import_ms': summarize(samples, 'import_ms'),
+        'create_app_ms': summarize(samples, 'create_app_ms'),
+        'first_request_ms': summarize(samples, 'first_request_ms'),
+        'startup_statements': max(sample['startup_statements'] for sample in samples),
+        'modules': samples[-1]['modules'],
+        'alembic_loaded': samples[-1]['alembic_loaded'],
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 60)
+    print(f"  Inicialização: {args.runs} processos novos")
+    print("=" * 60)
+    print(f"{'Etapa':<22}{'Mediana (ms)':>14}{'Mín':>10}{'Máx':>10}")
+    for key, label in (('import_ms', 'import app'), ('create_app_ms', 'create_app()'),
+                       ('first_request_ms', 'primeira requisição')):
+        print(f"{label:<22}{results[key]['median']:>14}{results[key]['min']:>10}{results[key]['max']:>10}")
+    print("-" * 60)
+    print(f"Comandos SQL em create_app(): {results['startup_statements']}")
+    print(f"Módulos carregados: {results['modules']}")
+    print(f"Alembic carregado: {'sim' if results['alembic_loaded'] else 'não'}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
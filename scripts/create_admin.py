@@ -12,6 +12,7 @@ from getpass import getpass
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app, db
+from app.bootstrap import bootstrap_database
 from app.models import User, Group
 
 
@@ -25,6 +26,9 @@ def create_admin_user():
     app = create_app()
     
     with app.app_context():
+        # Make sure tables and default groups exist (no-op when up to date)
+        bootstrap_database(app)
+        
         # Check if admin already exists
         print("Verificando usuários administradores existentes...")
         existing_admins = User.query.filter_by(is_admin=True).all()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Bulk user import script for pyFlaskUserKit
+Imports users from a CSV or JSON file using the same code path as
+POST /api/users/bulk (batched inserts, parallel password hashing).
+
+Usage:
+    python scripts/import_users.py usuarios.csv
+    python scripts/import_users.py usuarios.json --chunk-size 2000
+
+CSV header: username,email,password[,is_admin,is_active,group_ids]
+JSON: a list of objects with the same keys (group_ids as a list).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.bootstrap import bootstrap_database
+from app.bulk_import import BULK_IMPORT_CHUNK_SIZE, parse_csv, import_users
+
+
+def load_rows(path):
+    """Read import rows from a CSV or JSON file"""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            return parse_csv(f.read())
+        data = json.load(f)
+    return data.get('users') if isinstance(data, dict) else data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa usuários em lote (CSV ou JSON)')
+    parser.add_argument('file', help='Arquivo .csv ou .json com os usuários')
+    parser.add_argument('--chunk-size', type=int, default=BULK_IMPORT_CHUNK_SIZE,
+                        help=f'Usuários por transação (padrão: {BULK_IMPORT_CHUNK_SIZE})')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  pyFlaskUserKit - Importação de Usuários em Lote")
+    print("=" * 60)
+
+    try:
+        rows = load_rows(args.file)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Erro ao ler '{args.file}': {e}")
+        sys.exit(1)
+
+    if not isinstance(rows, list):
+        print("\n❌ O arquivo deve conter uma lista de usuários.")
+        sys.exit(1)
+
+    print(f"\n{len(rows)} usuário(s) encontrados em '{args.file}'")
+
+    app = create_app()
+
+    with app.app_context():
+        bootstrap_database(app)
+        started = time.perf_counter()
+        result = import_users(rows, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+
+    print(f"\n✓ {result['created']} usuário(s) criados em {elapsed:.1f}s")
+
+    if result['errors']:
+        print(f"\n❌ {len(result['errors'])} linha(s) com erro:")
+        for error in result['errors']:
+            print(f"  - #{error['index']} {error['username'] or ''}: {error['error']}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == '__main__':
+    main()
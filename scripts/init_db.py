@@ -11,53 +11,18 @@ import sys
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from sqlalchemy import text
+
 from app import create_app, db
-from app.models import Group
+from app.bootstrap import SCHEMA_VERSION, DEFAULT_GROUPS, bootstrap_database, current_schema_version
 from config import Config
 
 
-def create_default_groups():
-    """Create default groups if they don't exist"""
-    default_groups = [
-        {
-            'name': 'Administradores',
-            'description': 'Grupo de administradores do sistema com privilégios totais'
-        },
-        {
-            'name': 'Visualizadores',
-            'description': 'Grupo de usuários com permissão apenas para visualização'
-        },
-        {
-            'name': 'Editores',
-            'description': 'Grupo de usuários com permissão para edição de conteúdo'
-        }
-    ]
-    
-    created_groups = []
-    
-    for group_data in default_groups:
-        existing_group = Group.query.filter_by(name=group_data['name']).first()
-        
-        if not existing_group:
-            group = Group(
-                name=group_data['name'],
-                description=group_data['description']
-            )
-            db.session.add(group)
-            created_groups.append(group_data['name'])
-            print(f"   ✓ Grupo '{group_data['name']}' criado")
-        else:
-            print(f"   → Grupo '{group_data['name']}' já existe")
-    
-    db.session.commit()
-    return created_groups
-
-
 def check_database_connection():
     """Check if database connection is working"""
     try:
         # Try to query the database
-        db.session.execute('SELECT 1')
+        db.session.execute(text('SELECT 1'))
         return True
     except Exception as e:
         print(f"✗ Erro ao conectar ao banco de dados: {e}")
@@ -92,16 +57,22 @@ def main():
             print(f"   Host: {Config.MYSQL_HOST}:{Config.MYSQL_PORT}")
             print(f"   Database: {Config.MYSQL_DATABASE}")
         
-        print("\n2. Criando tabelas no banco de dados...")
+        if not check_database_connection():
+            return
+        
+        print("\n2. Criando tabelas, índice de busca e grupos padrão...")
+        previous_version = current_schema_version()
         try:
-            db.create_all()
-            print("   ✓ Tabelas criadas com sucesso")
+            ran = bootstrap_database(app)
         except Exception as e:
-            print(f"   ✗ Erro ao criar tabelas: {e}")
+            print(f"   ✗ Erro ao inicializar o banco: {e}")
             return
-        
-        print("\n3. Criando grupos padrão...")
-        create_default_groups()
+        if ran:
+            print(f"   ✓ Esquema atualizado da versão {previous_version} para {SCHEMA_VERSION}")
+            for group_data in DEFAULT_GROUPS:
+                print(f"   ✓ Grupo '{group_data['name']}' disponível")
+        else:
+            print(f"   → Esquema já está na versão {SCHEMA_VERSION}, nada a fazer")
         
         print("\n" + "=" * 60)
         print("  ✓ Banco de dados inicializado com sucesso!")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for pyFlaskUserKit
+Fills the configured database with realistic users, groups and
+power-law-distributed memberships (a few huge groups, a long tail of
+small ones) to reproduce production-sized workloads locally.
+
+Rows are written with bulk Core INSERTs in chunks, each chunk in its own
+transaction, and every user shares one precomputed password hash. The
+user search index is rebuilt once at the end instead of row by row.
+
+Usage:
+    python scripts/seed_data.py --users 100000
+    python scripts/seed_data.py --users 1000000 --groups 2000 --skew 1.2 --hash-method pbkdf2:sha256:1
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.bootstrap import bootstrap_database
+from app.models import User, Group, user_groups, bump_versions
+from app.search import search_index_suspended
+from werkzeug.security import generate_password_hash
+
+
+FIRST_NAMES = [
+    'ana', 'bruno', 'carla', 'daniel', 'eduarda', 'felipe', 'gabriela', 'henrique', 'isabela', 'joao',
+    'julia', 'lucas', 'mariana', 'matheus', 'natalia', 'otavio', 'paula', 'rafael', 'sofia', 'thiago',
+    'beatriz', 'caio', 'fernanda', 'gustavo', 'helena', 'igor', 'larissa', 'marcos', 'patricia', 'vitor',
+]
+LAST_NAMES = [
+    'silva', 'santos', 'oliveira', 'souza', 'rodrigues', 'ferreira', 'alves', 'pereira', 'lima', 'gomes',
+    'costa', 'ribeiro', 'martins', 'carvalho', 'almeida', 'lopes', 'soares', 'fernandes', 'vieira', 'barbosa',
+]
+EMAIL_DOMAINS = ['example.com', 'example.org', 'empresa.example', 'mail.example']
+DEPARTMENTS = [
+    'Financeiro', 'Comercial', 'Marketing', 'Engenharia', 'Suporte', 'Jurídico', 'Recursos Humanos',
+    'Operações', 'Logística', 'Compras', 'Produto', 'Dados',
+]
+REGIONS = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Porto Alegre', 'Recife', 'Remoto']
+
+
+def next_id(model):
+    return (db.session.execute(db.select(db.func.max(model.id))).scalar() or 0) + 1
+
+
+def insert_chunked(table, rows, total, chunk_size, label):
+    """Insert rows in chunks, one transaction per chunk, printing progress"""
+    started = time.perf_counter()
+    done = 0
+    chunk = []
+
+    def flush():
+        nonlocal done
+        with db.engine.begin() as connection:
+            connection.execute(table.insert(), chunk)
+        done += len(chunk)
+        chunk.clear()
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        percent = f' ({done * 100 // total}%)' if total else ''
+        print(f"\r   {label}: {done}{f'/{total}' if total else ''}{percent} - {rate:,.0f} linhas/s",
+              end='', flush=True)
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    print()
+    return done
+
+
+def generate_groups(rng, first_id, count):
+    now = datetime.utcnow()
+    for n in range(count):
+        group_id = first_id + n
+        created = now - timedelta(days=rng.randint(0, 3 * 365))
+        yield {
+            'id': group_id,
+            'name': f'{rng.choice(DEPARTMENTS)} - {rng.choice(REGIONS)} #{group_id}',
+            'description': f'Grupo sintético {group_id}',
+            'created_at': created,
+            'updated_at': created,
+        }
+
+
+def generate_users(rng, first_id, count, password_hash, admin_ratio, inactive_ratio):
+    now = datetime.utcnow()
+    for n in range(count):
+        user_id = first_id + n
+        username = f'{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}.{user_id}'
+        created = now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400))
+        yield {
+            'id': user_id,
+            'username': username,
+            'email': f'{username}@{rng.choice(EMAIL_DOMAINS)}',
+            'password_hash': password_hash,
+            'is_admin': rng.random() < admin_ratio,
+            'is_active': rng.random() >= inactive_ratio,
+            'created_at': created,
+            'updated_at': created + timedelta(seconds=rng.randint(0, 30 * 86400)),
+        }
+
+
+def generate_memberships(rng, user_ids, group_ids, per_user, skew):
+    """
+    Each user joins ~per_user groups (exponential spread); groups are
+    picked with probability proportional to 1 / rank^skew.
+    """
+    ranked = list(group_ids)
+    rng.shuffle(ranked)  # the biggest groups are not simply the first ids
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, len(ranked) + 1):
+        total += 1 / rank ** skew
+        cum_weights.append(total)
+
+    for user_id in user_ids:
+        wanted = min(len(ranked), int(rng.expovariate(1 / per_user) + 0.5)) if per_user > 0 else 0
+        for group_id in set(rng.choices(ranked, cum_weights=cum_weights, k=wanted)):
+            yield {'user_id': user_id, 'group_id': group_id}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera usuários, grupos e vínculos sintéticos em massa')
+    parser.add_argument('--users', type=int, default=100000, help='Usuários a criar (padrão: 100000)')
+    parser.add_argument('--groups', type=int, help='Grupos a criar (padrão: usuários / 500, mínimo 20)')
+    parser.add_argument('--memberships-per-user', type=float, default=2.0,
+                        help='Média de grupos por usuário (padrão: 2.0)')
+    parser.add_argument('--skew', type=float, default=1.1,
+                        help='Expoente da lei de potência dos tamanhos de grupo (padrão: 1.1)')
+    parser.add_argument('--admin-ratio', type=float, default=0.001, help='Fração de administradores (padrão: 0.001)')
+    parser.add_argument('--inactive-ratio', type=float, default=0.1, help='Fração de inativos (padrão: 0.1)')
+    parser.add_argument('--password', default='senha123', help='Senha de todos os usuários (padrão: senha123)')
+    parser.add_argument('--hash-method',
+                        help='Método do hash da senha (padrão: PASSWORD_HASH_METHOD; ex.: pbkdf2:sha256:1 '
+                             'para logins baratos em testes)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Linhas por transação (padrão: 10000)')
+    parser.add_argument('--seed', type=int, help='Semente aleatória para repetir o mesmo conjunto')
+    args = parser.parse_args()
+
+    group_count = args.groups if args.groups is not None else max(20, args.users // 500)
+    rng = random.Random(args.seed)
+
+    print("=" * 60)
+    print("  pyFlaskUserKit - Geração de Dados Sintéticos")
+    print("=" * 60)
+
+    app = create_app()
+    with app.app_context():
+        bootstrap_database(app)
+        method = args.hash_method or app.config['PASSWORD_HASH_METHOD']
+        password_hash = generate_password_hash(args.password, method=method)
+        print(f"\nBanco: {db.engine.url.render_as_string(hide_password=True)}")
+        print(f"Senha de todos os usuários: '{args.password}' ({method})\n")
+
+        started = time.perf_counter()
+        first_group_id = next_id(Group)
+        first_user_id = next_id(User)
+        group_ids = range(first_group_id, first_group_id + group_count)
+        user_ids = range(first_user_id, first_user_id + args.users)
+
+        with search_index_suspended():
+            insert_chunked(Group.__table__, generate_groups(rng, first_group_id, group_count),
+                           group_count, args.chunk_size, 'Grupos')
+            insert_chunked(User.__table__,
+                           generate_users(rng, first_user_id, args.users, password_hash,
+                                          args.admin_ratio, args.inactive_ratio),
+                           args.users, args.chunk_size, 'Usuários')
+            memberships = insert_chunked(user_groups,
+                                         generate_memberships(rng, user_ids, group_ids,
+                                                              args.memberships_per_user, args.skew),
+                                         None, args.chunk_size, 'Vínculos')
+            print("   Reconstruindo índice de busca...", flush=True)
+
+        with db.engine.begin() as connection:
+            bump_versions(connection, {'users', 'groups', 'memberships'})
+
+        elapsed = time.perf_counter() - started
+        print(f"\n✓ {args.users} usuários, {group_count} grupos e {memberships} vínculos em {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.bootstrap import bootstrap_database
+from config import Config
+
+
+def make_config(db_path, **overrides):
+    """Isolated SQLite configuration; over-budget requests fail instead of logging"""
+
+    class TestConfig(Config):
+        TESTING = True
+        DATABASE_TYPE = 'sqlite'
+        SQLITE_DB_PATH = db_path
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_BINDS = {}
+        DATABASE_REPLICA_URIS = []
+        METRICS_DIR = ''
+        EVENTS_ENABLED = False
+        SERVER_TIMING_HEADER = True
+        QUERY_BUDGET_STRICT = True
+        # Render every object instead of serving it from the fragment cache
+        FRAGMENT_CACHE_SIZE = 0
+
+    for name, value in overrides.items():
+        setattr(TestConfig, name, value)
+    return TestConfig
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build bootstrapped apps, each on its own SQLite file (keywords override the config)"""
+    created = []
+
+    def factory(name='app', **overrides):
+        app = create_app(make_config(str(tmp_path / f'{name}.db'), **overrides))
+        with app.app_context():
+            bootstrap_database(app)
+        # The first request of a worker also reads the schema stamp, which
+        # no view budget covers
+        app.test_client().get('/login')
+        created.append(app)
+        return app
+
+    yield factory
+    for app in created:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def login_admin(client, user_id):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = 'admin'
+        session['is_admin'] = True
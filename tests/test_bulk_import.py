@@ -0,0 +1,110 @@
+"""
+Bulk user import: invalid rows are reported by index without stopping
+the batch, and field types are checked strictly.
+"""
+import pytest
+
+from app import db
+from app.models import User, Group
+from app.bulk_import import import_users
+from conftest import login_admin
+
+
+@pytest.fixture
+def seeded(make_app):
+    app = make_app()
+    # Cheap hashes: these tests are about validation, not the KDF
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    with app.app_context():
+        admin = User(username='admin', email='admin@example.com', is_admin=True, password_hash='x')
+        group = Group(name='staff', description='test')
+        db.session.add_all([admin, group])
+        db.session.commit()
+        admin_id, group_id = admin.id, group.id
+    client = app.test_client()
+    login_admin(client, admin_id)
+    return app, client, group_id
+
+
+def row(n, **fields):
+    return {'username': f'new{n}', 'email': f'new{n}@example.com', 'password': 'secret', **fields}
+
+
+def test_invalid_rows_are_reported_and_the_rest_created(seeded):
+    app, client, group_id = seeded
+    rows = [
+        row(0, group_ids=[group_id], is_admin=True),
+        row(1, email=''),
+        row(2, username='admin'),
+        row(0, email='other@example.com'),
+        row(3, email='new0@example.com'),
+        row(4, group_ids=[9999]),
+        'not an object',
+        row(5, is_active=False),
+    ]
+    response = client.post('/api/users/bulk', json={'users': rows})
+    assert response.status_code == 200
+    assert response.json['created'] == 2
+    assert [(e['index'], e['username'], e['error']) for e in response.json['errors']] == [
+        (1, 'new1', 'Username, email and password are required'),
+        (2, 'admin', 'Username already exists'),
+        (3, 'new0', 'Duplicate username in batch'),
+        (4, 'new3', 'Duplicate email in batch'),
+        (5, 'new4', 'Unknown group ids: [9999]'),
+        (6, None, 'Row must be an object'),
+    ]
+    with app.app_context():
+        created = {user.username: user for user in User.query.filter(User.username.in_(['new0', 'new5']))}
+        assert created['new0'].is_admin and [g.id for g in created['new0'].groups] == [group_id]
+        assert not created['new5'].is_active
+        assert created['new5'].check_password('secret')
+
+
+@pytest.mark.parametrize('fields, error', [
+    ({'username': 42}, 'username must be a string'),
+    ({'password': ['secret']}, 'password must be a string'),
+    ({'is_admin': 'maybe'}, 'is_admin must be true or false'),
+    ({'is_active': 2}, 'is_active must be true or false'),
+    ({'is_active': 1.0}, 'is_active must be true or false'),
+    ({'group_ids': 'staff'}, 'group_ids must be a list of integers'),
+    ({'group_ids': [True]}, 'group_ids must be a list of integers'),
+    ({'group_ids': [1.5]}, 'group_ids must be a list of integers'),
+    ({'group_ids': ['x']}, 'group_ids must be a list of integers'),
+])
+def test_field_types_are_strict(seeded, fields, error):
+    app, client, group_id = seeded
+    response = client.post('/api/users/bulk', json=[row(1, **fields)])
+    assert response.json == {'created': 0, 'errors': [{'index': 0, 'username': fields.get('username', 'new1'),
+                                                       'error': error}]}
+
+
+def test_csv_flags_and_groups(seeded):
+    app, client, group_id = seeded
+    body = ('username,email,password,is_admin,is_active,group_ids\n'
+            f'a,a@example.com,pw,sim,não,{group_id}\n'
+            'b,b@example.com,pw,,,\n'
+            'c,c@example.com,pw,talvez,,\n')
+    response = client.post('/api/users/bulk', data=body.encode(), content_type='text/csv')
+    assert response.json['created'] == 2
+    assert response.json['errors'] == [{'index': 2, 'username': 'c', 'error': 'is_admin must be true or false'}]
+    with app.app_context():
+        a, b = User.query.filter(User.username.in_(['a', 'b'])).order_by(User.username)
+        assert (a.is_admin, a.is_active, [g.id for g in a.groups]) == (True, False, [group_id])
+        assert (b.is_admin, b.is_active, b.groups) == (False, True, [])
+
+
+def test_body_must_be_a_list(seeded):
+    app, client, group_id = seeded
+    assert client.post('/api/users/bulk', json={'users': 'x'}).status_code == 400
+
+
+def test_errors_keep_batch_indexes_across_chunks(seeded):
+    app, client, group_id = seeded
+    rows = [row(n) for n in range(7)] + [row(7, email=None)]
+    rows[4] = row(1)
+    with app.app_context():
+        result = import_users(rows, chunk_size=3)
+    assert result['created'] == 6
+    assert result['errors'] == [{'index': 4, 'username': 'new1', 'error': 'Duplicate username in batch'},
+                                {'index': 7, 'username': 'new7', 'error': 'Username, email and password are required'}]
@@ -0,0 +1,167 @@
+"""
+Change log sync: GET /api/changes returns tombstones for deleted rows,
+and GET /api/events resumes from Last-Event-ID.
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.changes import prune_changes
+from app.models import User
+from conftest import login_admin
+
+
+@pytest.fixture
+def seeded(make_app):
+    app = make_app(EVENTS_ENABLED=True, EVENTS_STREAM_TIMEOUT=0.3, EVENTS_KEEPALIVE=0.1,
+                   EVENTS_POLL_INTERVAL=0.05)
+    with app.app_context():
+        admin = User(username='admin', email='admin@example.com', is_admin=True, password_hash='x')
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+    client = app.test_client()
+    login_admin(client, admin_id)
+    return app, client
+
+
+def token(client):
+    response = client.get('/api/changes')
+    assert response.status_code == 200
+    return response.json['token']
+
+
+def create_member(client):
+    """A user in a new group; returns (user_id, group_id)"""
+    group_id = client.post('/api/groups', json={'name': 'staff'}).json['id']
+    user = client.post('/api/users', json={'username': 'member', 'email': 'member@example.com',
+                                           'password': 'x', 'group_ids': [group_id]}).json
+    return user['id'], group_id
+
+
+def events(response):
+    """(id, event, data) of each SSE message in a finished stream"""
+    messages = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            messages.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return messages
+
+
+def test_deletes_are_returned_as_tombstones(seeded):
+    app, client = seeded
+    user_id, group_id = create_member(client)
+    since = token(client)
+
+    assert client.delete(f'/api/users/{user_id}').status_code == 200
+    assert client.delete(f'/api/groups/{group_id}').status_code == 200
+
+    delta = client.get(f'/api/changes?since={since}').json
+    assert delta['deleted'] == {'users': [user_id], 'groups': [group_id]}
+    assert delta['users'] == [] and delta['groups'] == []
+    assert delta['memberships'] == [{'user_id': user_id, 'group_id': group_id, 'action': 'remove'}]
+    assert delta['token'] > since and not delta['has_more']
+    # Nothing newer: the same token comes back with an empty delta
+    again = client.get(f'/api/changes?since={delta["token"]}').json
+    assert again['token'] == delta['token'] and again['deleted'] == {'users': [], 'groups': []}
+
+
+def test_created_then_deleted_row_is_only_a_tombstone(seeded):
+    app, client = seeded
+    since = token(client)
+    user_id, group_id = create_member(client)
+    client.delete(f'/api/users/{user_id}')
+
+    delta = client.get(f'/api/changes?since={since}').json
+    assert delta['deleted']['users'] == [user_id]
+    assert [group['id'] for group in delta['groups']] == [group_id]
+    assert delta['groups'][0]['user_count'] == 0
+
+
+def test_changes_are_paged_by_limit(seeded):
+    app, client = seeded
+    since = token(client)
+    create_member(client)
+
+    first = client.get(f'/api/changes?since={since}&limit=1').json
+    assert first['has_more'] and first['token'] == since + 1
+    rest = client.get(f'/api/changes?since={first["token"]}').json
+    assert not rest['has_more'] and rest['token'] == token(client)
+
+
+def test_pruned_token_must_reload(seeded):
+    app, client = seeded
+    since = token(client)
+    create_member(client)
+    with app.app_context():
+        prune_changes(db.session.connection(), datetime.utcnow() + timedelta(seconds=1))
+        db.session.commit()
+
+    assert client.get(f'/api/changes?since={since}').status_code == 410
+    assert client.get('/api/changes?since=-1').status_code == 400
+
+
+def stream(client, **headers):
+    # The test client looks like a sync worker; streams need a threaded one
+    return client.get('/api/events', headers=headers, environ_overrides={'wsgi.multithread': True})
+
+
+def test_stream_resumes_from_last_event_id(seeded):
+    app, client = seeded
+    since = token(client)
+    user_id, group_id = create_member(client)
+
+    response = stream(client, **{'Last-Event-ID': str(since)})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    messages = events(response)
+    assert [event for _, event, _ in messages] == ['changes']
+    event_id, _, delta = messages[0]
+    assert int(event_id) == delta['token'] == token(client)
+    assert [user['id'] for user in delta['users']] == [user_id]
+    assert {'user_id': user_id, 'group_id': group_id, 'action': 'add'} in delta['memberships']
+
+    # Reconnecting with that id replays nothing
+    assert events(stream(client, **{'Last-Event-ID': event_id})) == []
+
+
+def test_stream_delivers_live_tombstones(seeded):
+    app, client = seeded
+    user_id, group_id = create_member(client)
+    writer = app.test_client()
+    with client.session_transaction() as session:
+        admin_id = session['user_id']
+    login_admin(writer, admin_id)
+    # Delete once the stream below has subscribed and sent its first event
+    timer = threading.Timer(0.1, lambda: writer.delete(f'/api/users/{user_id}'))
+    timer.start()
+    try:
+        messages = events(stream(client))
+    finally:
+        timer.join()
+
+    assert [event for _, event, _ in messages] == ['ready', 'changes']
+    delta = messages[1][2]
+    assert delta['deleted']['users'] == [user_id]
+    assert delta['memberships'] == [{'user_id': user_id, 'group_id': group_id, 'action': 'remove'}]
+
+
+def test_stream_without_id_starts_at_the_current_token(seeded):
+    app, client = seeded
+    messages = events(stream(client))
+    assert messages == [(str(token(client)), 'ready', {'token': token(client)})]
+
+
+def test_stream_resets_a_pruned_last_event_id(seeded):
+    app, client = seeded
+    since = token(client)
+    create_member(client)
+    with app.app_context():
+        prune_changes(db.session.connection(), datetime.utcnow() + timedelta(seconds=1))
+        db.session.commit()
+
+    assert [event for _, event, _ in events(stream(client, **{'Last-Event-ID': str(since)}))] == ['reset']
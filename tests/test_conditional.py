@@ -0,0 +1,153 @@
+"""
+Conditional GET: validators must change whenever the body would.
+"""
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+import pytest
+
+from app import db
+from app.models import User, Group, DataVersion
+from conftest import login_admin
+
+ENDPOINTS = [
+    '/api/users',
+    '/api/users/{member_id}',
+    '/api/groups',
+    '/api/groups/{group_id}',
+    '/api/groups/{group_id}/users',
+]
+
+
+def seed(app):
+    """An admin and one group holding a second user; returns their ids"""
+    with app.app_context():
+        admin = User(username='admin', email='admin@example.com', is_admin=True)
+        member = User(username='member', email='member@example.com')
+        admin.set_password('x')
+        member.set_password('x')
+        group = Group(name='staff', description='test')
+        group.users.append(member)
+        db.session.add_all([admin, member, group])
+        db.session.commit()
+        return admin.id, member.id, group.id
+
+
+def backdate(app, hours=1):
+    """Move every timestamp the validators read into the past"""
+    with app.app_context():
+        moment = datetime.utcnow() - timedelta(hours=hours)
+        for model in (User, Group, DataVersion):
+            db.session.execute(db.update(model).values(updated_at=moment))
+        db.session.commit()
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_not_modified_until_a_write(make_app, endpoint):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    backdate(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+    url = endpoint.format(member_id=member_id, group_id=group_id)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    etag = response.headers['ETag']
+    # A cache that stored the response after its last modified second
+    since = http_date(response.last_modified + timedelta(seconds=1))
+
+    for headers in ({'If-None-Match': etag}, {'If-Modified-Since': since}):
+        cached = client.get(url, headers=headers)
+        assert cached.status_code == 304
+        assert cached.data == b''
+        assert cached.headers['ETag'] == etag
+
+    # Every body above embeds the group's name
+    assert client.put(f'/api/groups/{group_id}', json={'name': 'renamed'}).status_code == 200
+
+    for headers in ({'If-None-Match': etag}, {'If-Modified-Since': since}):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert b'renamed' in response.data
+        assert response.headers['ETag'] != etag
+
+
+def test_missing_row_is_not_validated(make_app):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+
+    response = client.get('/api/groups/9999', headers={'If-None-Match': '*'})
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_group_with_users_is_modified_by_member_rename(make_app):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+
+    detail, collection = f'/api/groups/{group_id}?include=users', '/api/groups?include=users'
+    etags = {url: client.get(url).headers['ETag'] for url in (detail, collection)}
+    for url, etag in etags.items():
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.put(f'/api/users/{member_id}', json={'username': 'renamed'})
+
+    response = client.get(detail, headers={'If-None-Match': etags[detail]})
+    assert response.status_code == 200
+    assert response.json['users'] == [{'id': member_id, 'username': 'renamed'}]
+    response = client.get(collection, headers={'If-None-Match': etags[collection]})
+    assert response.status_code == 200
+    group = next(group for group in response.json if group['id'] == group_id)
+    assert group['users'] == [{'id': member_id, 'username': 'renamed'}]
+
+
+def test_representations_do_not_share_etags(make_app):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+
+    for urls in ([f'/api/groups/{group_id}', f'/api/groups/{group_id}?fields=id',
+                  f'/api/groups/{group_id}?include=users'],
+                 [f'/api/users/{member_id}', f'/api/users/{member_id}?fields=id'],
+                 ['/api/users', '/api/users?limit=1', '/api/users?fields=id,username']):
+        etags = [client.get(url).headers['ETag'] for url in urls]
+        assert len(set(etags)) == len(urls), urls
+        # A validator of one representation never revalidates another
+        response = client.get(urls[1], headers={'If-None-Match': etags[0]})
+        assert response.status_code == 200
+
+
+def test_if_modified_since_sees_writes_in_the_same_second(make_app):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    client = app.test_client()
+    url = f'/api/groups/{group_id}?fields=id,name'
+    # Later than the data version stamps written by the bootstrap
+    second = (datetime.utcnow() + timedelta(days=1)).replace(microsecond=0)
+
+    def touch(moment):
+        with app.app_context():
+            db.session.execute(db.update(Group).where(Group.id == group_id).values(updated_at=moment))
+            db.session.commit()
+
+    touch(second + timedelta(milliseconds=200))
+    last_modified = client.get(url).headers['Last-Modified']
+    assert last_modified == http_date(second)
+
+    # Second write within the same second: Last-Modified cannot tell them apart
+    touch(second + timedelta(milliseconds=700))
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 200
+    # A copy from after that second is still current
+    later = http_date(second + timedelta(seconds=1))
+    assert client.get(url, headers={'If-Modified-Since': later}).status_code == 304
+    # The ETag tells the two versions apart and takes precedence
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag, 'If-Modified-Since': last_modified}).status_code == 304
@@ -0,0 +1,42 @@
+"""
+Bulk membership endpoints accept JSON integer ids only.
+"""
+import pytest
+
+from app import db
+from app.models import User, Group
+from conftest import login_admin
+
+
+def seed(app):
+    with app.app_context():
+        admin = User(username='admin', email='admin@example.com', is_admin=True, password_hash='x')
+        member = User(username='member', email='member@example.com', password_hash='x')
+        group = Group(name='staff', description='test')
+        db.session.add_all([admin, member, group])
+        db.session.commit()
+        return admin.id, member.id, group.id
+
+
+@pytest.mark.parametrize('ids', [[True], [2.7], ['3'], [None], 'x'])
+def test_non_integer_ids_are_rejected(make_app, ids):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+
+    assert client.post(f'/api/groups/{group_id}/users', json={'user_ids': ids}).status_code == 400
+    assert client.post(f'/api/users/{member_id}/groups', json={'group_ids': ids}).status_code == 400
+    with app.app_context():
+        assert db.session.get(Group, group_id).users == []
+
+
+def test_integer_ids_are_added(make_app):
+    app = make_app()
+    admin_id, member_id, group_id = seed(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+
+    response = client.post(f'/api/groups/{group_id}/users', json={'user_ids': [member_id, admin_id]})
+    assert response.status_code == 200
+    assert response.json == {'added': 2}
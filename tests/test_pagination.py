@@ -0,0 +1,136 @@
+"""
+Keyset pagination of GET /api/users: every sort and filter combination
+walks the whole result exactly once, and malformed cursors are rejected.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import User, Group, user_groups
+from app.pagination import encode_cursor
+from conftest import login_admin
+
+ROWS = 40
+PAGE = 7
+
+SORTS = ['id', '-id', 'username', '-username', 'email', '-email', 'created_at', '-created_at']
+
+FILTERS = [
+    {},
+    {'q': 'user-1'},
+    {'q': 'USER-1'},
+    {'is_active': 'false'},
+    {'is_admin': 'true', 'is_active': 'true'},
+    {'group_id': 'even'},
+    {'group_id': 'even', 'q': 'user-2', 'is_active': 'true'},
+]
+
+
+def seed(app):
+    """ROWS users with shuffled names, shared created_at values and an 'even' group"""
+    start = datetime(2026, 1, 1)
+    with app.app_context():
+        db.session.execute(db.insert(User), [
+            {'username': f'user-{(n * 17) % ROWS:02d}', 'email': f'{(n * 7) % ROWS:02d}@example.com',
+             'password_hash': 'x', 'is_admin': n % 5 == 0, 'is_active': n % 3 != 0,
+             # Groups of four users share a timestamp, so the id breaks ties
+             'created_at': start + timedelta(minutes=n // 4)}
+            for n in range(ROWS)
+        ])
+        group = Group(name='even', description='test')
+        db.session.add(group)
+        db.session.flush()
+        users = db.session.query(User.id, User.username, User.email, User.created_at,
+                                 User.is_active, User.is_admin).all()
+        db.session.execute(user_groups.insert(), [
+            {'user_id': user.id, 'group_id': group.id} for user in users if user.id % 2 == 0
+        ])
+        db.session.commit()
+        admin_id = db.session.query(User.id).filter(User.is_admin, User.is_active).first()[0]
+        return admin_id, group.id, users
+
+
+def expected_ids(users, sort, filters):
+    rows = users
+    q = filters.get('q', '').lower()
+    if q:
+        rows = [u for u in rows if u.username.lower().startswith(q) or u.email.lower().startswith(q)]
+    if 'is_active' in filters:
+        rows = [u for u in rows if u.is_active == (filters['is_active'] == 'true')]
+    if 'is_admin' in filters:
+        rows = [u for u in rows if u.is_admin == (filters['is_admin'] == 'true')]
+    if 'group_id' in filters:
+        rows = [u for u in rows if u.id % 2 == 0]
+    key = sort.lstrip('-')
+    descending = sort.startswith('-')
+    rows = sorted(rows, key=lambda u: (getattr(u, key), u.id), reverse=descending)
+    return [u.id for u in rows]
+
+
+def walk(client, params):
+    """Follow X-Next-Cursor to the end, checking the Link header on the way"""
+    ids = []
+    after = None
+    for _ in range(ROWS):
+        page_params = dict(params, limit=PAGE, fields='id')
+        if after:
+            page_params['after'] = after
+        response = client.get('/api/users', query_string=page_params)
+        assert response.status_code == 200, response.json
+        assert len(response.json) <= PAGE
+        ids += [user['id'] for user in response.json]
+        after = response.headers.get('X-Next-Cursor')
+        if not after:
+            assert 'Link' not in response.headers
+            return ids
+        assert f'after={after}' in response.headers['Link']
+        assert len(response.json) == PAGE
+    raise AssertionError('pagination did not end')
+
+
+@pytest.fixture
+def seeded(make_app):
+    app = make_app()
+    admin_id, group_id, users = seed(app)
+    client = app.test_client()
+    login_admin(client, admin_id)
+    return client, group_id, users
+
+
+@pytest.mark.parametrize('sort', SORTS)
+@pytest.mark.parametrize('filters', FILTERS, ids=lambda f: ','.join(f'{k}={v}' for k, v in f.items()) or 'all')
+def test_cursor_round_trip(seeded, sort, filters):
+    client, group_id, users = seeded
+    params = {key: (group_id if value == 'even' else value) for key, value in filters.items()}
+    params['sort'] = sort
+    assert walk(client, params) == expected_ids(users, sort, filters)
+
+
+def test_empty_result_has_no_cursor(seeded):
+    client, group_id, users = seeded
+    response = client.get('/api/users', query_string={'q': 'nobody'})
+    assert response.status_code == 200
+    assert response.json == []
+    assert 'X-Next-Cursor' not in response.headers
+
+
+@pytest.mark.parametrize('params', [
+    {'after': 'not-a-cursor'},
+    {'after': '!!!'},
+    {'after': encode_cursor(1, 'x')},
+    {'after': encode_cursor(1, True)},
+    # A username cursor replayed on the id order, and the reverse
+    {'after': encode_cursor('user-01', 3)},
+    {'sort': 'username', 'after': encode_cursor(5, 3)},
+    {'sort': 'created_at', 'after': encode_cursor('yesterday', 3)},
+    {'sort': 'password_hash'},
+    {'limit': '0'},
+    {'limit': 'ten'},
+    {'is_active': 'maybe'},
+])
+def test_invalid_parameters_are_rejected(seeded, params):
+    client, group_id, users = seeded
+    response = client.get('/api/users', query_string=params)
+    assert response.status_code == 400
+    assert 'error' in response.json
@@ -0,0 +1,74 @@
+"""
+SQL statement counts of the list endpoints must not grow with the data.
+
+Each endpoint is requested against a database with 10 and with 100 users
+and groups (every user in several groups). The count is read from the
+Server-Timing header written by app.instrumentation; QUERY_BUDGET_STRICT
+also fails any request over its @query_budget.
+"""
+import re
+
+import pytest
+
+from app import db
+from app.models import User, Group, user_groups
+from conftest import login_admin
+
+GROUPS_PER_USER = 3
+
+ENDPOINTS = [
+    '/api/users?limit=500',
+    '/api/users?limit=500&fields=id,username',
+    '/api/groups',
+    '/api/groups/{group_id}/users',
+    '/grupos',
+    '/usuarios',
+]
+
+
+def seed(app, rows):
+    """Create `rows` users and groups, each user in GROUPS_PER_USER groups"""
+    with app.app_context():
+        db.session.execute(db.insert(Group), [
+            {'name': f'group-{n}', 'description': 'test'} for n in range(rows)
+        ])
+        db.session.execute(db.insert(User), [
+            {'username': f'user-{n}', 'email': f'user-{n}@example.com', 'password_hash': 'x',
+             'is_admin': n == 0, 'is_active': True}
+            for n in range(rows)
+        ])
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+        group_ids = [group_id for (group_id,) in db.session.query(Group.id).order_by(Group.id)]
+        db.session.execute(user_groups.insert(), [
+            {'user_id': user_id, 'group_id': group_ids[(i + k) % len(group_ids)]}
+            for i, user_id in enumerate(user_ids)
+            for k in range(GROUPS_PER_USER)
+        ])
+        db.session.commit()
+        # The most populated group: members of the first default group
+        return user_ids[0], group_ids[0]
+
+
+def query_count(response):
+    match = re.search(r'db;[^,]*desc="(\d+) queries"', response.headers.get('Server-Timing', ''))
+    assert match, 'Server-Timing header missing'
+    return int(match.group(1))
+
+
+def measure(app, rows):
+    admin_id, group_id = seed(app, rows)
+    client = app.test_client()
+    login_admin(client, admin_id)
+    counts = {}
+    for endpoint in ENDPOINTS:
+        response = client.get(endpoint.format(group_id=group_id))
+        assert response.status_code == 200, endpoint
+        counts[endpoint] = query_count(response)
+    return counts
+
+
+@pytest.mark.parametrize('small, large', [(10, 100)])
+def test_list_query_count_is_constant(make_app, small, large):
+    small_counts = measure(make_app('small'), small)
+    large_counts = measure(make_app('large'), large)
+    assert small_counts == large_counts
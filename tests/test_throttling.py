@@ -0,0 +1,136 @@
+"""
+Login throttling: sliding windows per IP and per username, exact
+Retry-After values and client IPs taken from X-Forwarded-For only behind
+ProxyFix.
+"""
+import types
+
+import pytest
+
+from app import db, throttling
+from app.models import User
+from app.throttling import login_throttle
+
+WINDOW = 60
+# Start of a fixed window, so offsets below read as seconds into it
+T0 = 1000 * WINDOW
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controlled time.time() for the throttle; fresh in-process counters"""
+    now = [T0]
+    monkeypatch.setattr(throttling, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    monkeypatch.setattr(login_throttle, '_backends', {})
+    return now
+
+
+@pytest.fixture
+def build(make_app):
+    def factory(**overrides):
+        config = {'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000', 'LOGIN_THROTTLE_IP_LIMIT': 3,
+                  'LOGIN_THROTTLE_IP_WINDOW': WINDOW, 'LOGIN_THROTTLE_USER_LIMIT': 3,
+                  'LOGIN_THROTTLE_USER_WINDOW': WINDOW}
+        config.update(overrides)
+        app = make_app(**config)
+        with app.app_context():
+            user = User(username='alice', email='alice@example.com')
+            user.set_password('right')
+            db.session.add(user)
+            db.session.commit()
+        return app
+    return factory
+
+
+def login(app, password='wrong', username='alice', ip='10.0.0.1', forwarded_for=None):
+    headers = {'X-Forwarded-For': forwarded_for} if forwarded_for else {}
+    return app.test_client().post('/login', data={'username': username, 'password': password},
+                                  headers=headers, environ_base={'REMOTE_ADDR': ip})
+
+
+def logged_in(response):
+    return response.status_code == 302 and response.headers['Location'] == '/'
+
+
+def test_ip_limit_and_retry_after(build, clock):
+    app = build(LOGIN_THROTTLE_USER_LIMIT=100)
+    clock[0] = T0 + 10
+    for n in range(3):
+        assert login(app, username=f'user{n}').status_code == 302
+
+    response = login(app, username='user3')
+    assert response.status_code == 429
+    # 4 attempts in this window; the next one fits once the sliding count
+    # is at most 2: (1 - 2/4) of the way through the next window
+    assert response.headers['Retry-After'] == str(T0 + WINDOW + 30 - clock[0])
+
+
+@pytest.mark.parametrize('wait, allowed', [(79, False), (80, True)])
+def test_retry_after_is_exact(build, clock, wait, allowed):
+    app = build(LOGIN_THROTTLE_USER_LIMIT=100)
+    clock[0] = T0 + 10
+    for n in range(4):
+        response = login(app, username=f'user{n}')
+    assert response.headers['Retry-After'] == '80'
+
+    clock[0] += wait
+    assert (login(app, username='user9').status_code != 429) is allowed
+
+
+def test_window_slides(build, clock):
+    app = build(LOGIN_THROTTLE_USER_LIMIT=100)
+    for n in range(3):
+        login(app, username=f'user{n}')
+    assert login(app, username='late').status_code == 429
+    # Two windows later nothing of the old attempts is left
+    clock[0] += 2 * WINDOW
+    for n in range(3):
+        assert login(app, username=f'again{n}').status_code == 302
+
+
+def test_username_failures_are_keyed_by_ip(build, clock):
+    app = build(LOGIN_THROTTLE_IP_LIMIT=100)
+    for _ in range(3):
+        assert login(app).status_code == 302
+
+    throttled = login(app, password='right')
+    assert throttled.status_code == 429
+    # All 3 failures weigh fully until this window ends
+    assert int(throttled.headers['Retry-After']) == WINDOW + 1
+    # The owner logging in from elsewhere is not locked out
+    assert logged_in(login(app, password='right', ip='10.0.0.2'))
+
+    clock[0] += WINDOW
+    assert login(app, password='right').status_code == 429
+    clock[0] += 1
+    assert logged_in(login(app, password='right'))
+
+
+def test_success_clears_username_failures(build, clock):
+    app = build(LOGIN_THROTTLE_IP_LIMIT=100)
+    for _ in range(2):
+        login(app)
+    assert logged_in(login(app, password='right'))
+    for _ in range(2):
+        login(app)
+    assert logged_in(login(app, password='right'))
+
+
+def test_forwarded_for_is_ignored_without_proxy_fix(build, clock):
+    app = build(LOGIN_THROTTLE_USER_LIMIT=100)
+    for n in range(3):
+        login(app, username=f'user{n}', forwarded_for=f'203.0.113.{n}')
+    # Every attempt came from the same socket address
+    assert login(app, username='x', forwarded_for='203.0.113.9').status_code == 429
+
+
+def test_ip_comes_from_the_trusted_proxy_with_proxy_fix(build, clock):
+    app = build(LOGIN_THROTTLE_USER_LIMIT=100, PROXY_FIX_X_FOR=1)
+    for n in range(3):
+        login(app, username=f'user{n}', ip='192.0.2.1', forwarded_for='203.0.113.1')
+    assert login(app, username='x', ip='192.0.2.1', forwarded_for='203.0.113.1').status_code == 429
+    # Another client behind the same proxy has its own counter
+    assert login(app, username='y', ip='192.0.2.1', forwarded_for='203.0.113.2').status_code == 302
+    # Only the address appended by the proxy counts, not one the client sent
+    spoofed = login(app, username='z', ip='192.0.2.1', forwarded_for='198.51.100.7, 203.0.113.1')
+    assert spoofed.status_code == 429
@@ -0,0 +1,143 @@
+"""
+Bearer API tokens: expiry, revocation and the per-process lookup cache.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, tokens
+from app.models import User, ApiToken
+from app.tokens import token_cache, hash_token
+from conftest import login_admin
+
+
+@pytest.fixture
+def seeded(make_app):
+    app = make_app()
+    with app.app_context():
+        admin = User(username='admin', email='admin@example.com', is_admin=True, password_hash='x')
+        plain = User(username='plain', email='plain@example.com', password_hash='x')
+        db.session.add_all([admin, plain])
+        db.session.commit()
+        admin_id, plain_id = admin.id, plain.id
+    token_cache.clear()
+    client = app.test_client()
+    login_admin(client, admin_id)
+    yield app, client, admin_id, plain_id
+    token_cache.clear()
+
+
+def issue(client, **body):
+    response = client.post('/api/tokens', json={'name': 'test', **body})
+    assert response.status_code == 201
+    return response.json['id'], response.json['token']
+
+
+def bearer(app, token, url='/api/stats'):
+    """Request with the token only (no session cookie)"""
+    return app.test_client().get(url, headers={'Authorization': f'Bearer {token}'})
+
+
+def cached(app, token):
+    with app.test_request_context():
+        return token_cache.get(hash_token(token))[0]
+
+
+def test_token_is_shown_once_and_stored_hashed(seeded):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client)
+    assert token.startswith('ukt_')
+    assert bearer(app, token).status_code == 200
+
+    listed = client.get('/api/tokens').json
+    assert [t['id'] for t in listed] == [token_id]
+    assert token not in str(listed)
+    with app.app_context():
+        stored = db.session.get(ApiToken, token_id)
+        assert stored.token_hash != token and token.startswith(stored.prefix)
+
+
+@pytest.mark.parametrize('header', ['Bearer ukt_unknown', 'Bearer other-format', 'Bearer '])
+def test_unknown_tokens_are_rejected(seeded, header):
+    app, client, admin_id, plain_id = seeded
+    response = app.test_client().get('/api/stats', headers={'Authorization': header})
+    assert response.status_code == 401
+
+
+def test_token_of_non_admin_is_forbidden(seeded):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client, user_id=plain_id)
+    assert bearer(app, token).status_code == 403
+
+
+@pytest.mark.parametrize('days', [-1, 1.5, 'x', True])
+def test_invalid_expiry_is_rejected(seeded, days):
+    app, client, admin_id, plain_id = seeded
+    assert client.post('/api/tokens', json={'name': 'x', 'expires_in_days': days}).status_code == 400
+
+
+def test_cached_token_still_expires_on_time(seeded, monkeypatch):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client, expires_in_days=1)
+    assert bearer(app, token).status_code == 200
+    assert cached(app, token)
+
+    class Tomorrow(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(days=1, seconds=1)
+
+    monkeypatch.setattr(tokens, 'datetime', Tomorrow)
+    assert bearer(app, token).status_code == 401
+
+
+def test_token_without_expiry(seeded, monkeypatch):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client, expires_in_days=0)
+    assert client.get('/api/tokens').json[0]['expires_at'] is None
+
+    class NextYear(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(days=365)
+
+    monkeypatch.setattr(tokens, 'datetime', NextYear)
+    assert bearer(app, token).status_code == 200
+
+
+def test_revocation_clears_the_cache(seeded):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client)
+    assert bearer(app, token).status_code == 200
+    assert cached(app, token)
+
+    response = client.delete(f'/api/tokens/{token_id}')
+    assert response.status_code == 200
+    assert response.json['revoked_at'] is not None
+    assert not cached(app, token)
+    assert bearer(app, token).status_code == 401
+
+
+def test_deactivating_the_owner_clears_the_cache(seeded):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client)
+    assert bearer(app, token).status_code == 200
+    assert client.post(f'/api/users/{admin_id}/deactivate').status_code == 200
+    assert bearer(app, token).status_code == 401
+
+
+def test_revocation_by_another_process_waits_for_the_ttl(seeded, monkeypatch):
+    app, client, admin_id, plain_id = seeded
+    token_id, token = issue(client)
+    assert bearer(app, token).status_code == 200
+
+    # Written outside this process's session: no commit hook clears the cache
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(db.update(ApiToken.__table__).where(ApiToken.id == token_id)
+                           .values(revoked_at=datetime.utcnow()))
+    assert bearer(app, token).status_code == 200
+
+    ttl = app.config['API_TOKEN_CACHE_TTL']
+    now = tokens.time.monotonic()
+    monkeypatch.setattr(tokens.time, 'monotonic', lambda: now + ttl + 1)
+    assert bearer(app, token).status_code == 401